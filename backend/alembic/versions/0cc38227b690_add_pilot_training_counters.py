@@ -0,0 +1,55 @@
+"""Add pilot training counters
+
+Revision ID: 0cc38227b690
+Revises: 2155759a5818
+Create Date: 2026-10-18 10:02:17.884310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0cc38227b690'
+down_revision = '2155759a5818'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('pilot_training_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pilot_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('event_type', postgresql.ENUM(name='eventtype', create_type=False), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.Column('hours', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['pilot_id'], ['pilots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pilot_id', 'month', 'event_type', name='uq_pilot_training_counter')
+    )
+    op.create_index(op.f('ix_pilot_training_counters_id'), 'pilot_training_counters', ['id'], unique=False)
+    op.create_index('ix_pilot_training_counters_month_pilot', 'pilot_training_counters', ['month', 'pilot_id'], unique=False)
+
+    # Backfill from existing effective events
+    op.execute("""
+        INSERT INTO pilot_training_counters (pilot_id, month, event_type, event_count, hours, updated_at)
+        SELECT ea.pilot_id,
+               date_trunc('month', e.start_time)::date,
+               e.event_type,
+               count(*),
+               coalesce(sum(extract(epoch FROM e.end_time - e.start_time)) / 3600.0, 0),
+               now()
+        FROM event_assignments ea
+        JOIN events e ON e.id = ea.event_id
+        WHERE e.status = 'EFFECTIVE'
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pilot_training_counters_month_pilot', table_name='pilot_training_counters')
+    op.drop_index(op.f('ix_pilot_training_counters_id'), table_name='pilot_training_counters')
+    op.drop_table('pilot_training_counters')
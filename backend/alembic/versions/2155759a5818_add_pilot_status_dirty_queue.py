@@ -0,0 +1,35 @@
+"""Add pilot status dirty queue
+
+Revision ID: 2155759a5818
+Revises: a0b5b20d1096
+Create Date: 2026-10-18 09:12:41.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2155759a5818'
+down_revision = 'a0b5b20d1096'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('pilot_status_dirty',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pilot_id', sa.Integer(), nullable=False),
+    sa.Column('evaluation_month', sa.Date(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('marked_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['pilot_id'], ['pilots.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pilot_id', 'evaluation_month', name='uq_pilot_status_dirty_month')
+    )
+    op.create_index(op.f('ix_pilot_status_dirty_id'), 'pilot_status_dirty', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_pilot_status_dirty_id'), table_name='pilot_status_dirty')
+    op.drop_table('pilot_status_dirty')
@@ -0,0 +1,36 @@
+"""Add calendar feed versions
+
+Revision ID: 354c5c5e4bc2
+Revises: 0cc38227b690
+Create Date: 2026-10-18 10:48:05.102937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '354c5c5e4bc2'
+down_revision = '0cc38227b690'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('calendar_feed_versions',
+    sa.Column('pilot_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['pilot_id'], ['pilots.id'], ),
+    sa.PrimaryKeyConstraint('pilot_id')
+    )
+
+    # Start every existing feed at version 1
+    op.execute("""
+        INSERT INTO calendar_feed_versions (pilot_id, version, updated_at)
+        SELECT id, 1, now() FROM pilots
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('calendar_feed_versions')
@@ -0,0 +1,26 @@
+"""Track the worker and spooled upload of currency import jobs
+
+Revision ID: 4e7a1c9d3b52
+Revises: 9b4d17e2c6a3
+Create Date: 2026-10-18 17:42:10.903115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e7a1c9d3b52'
+down_revision = '9b4d17e2c6a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('currency_import_jobs', sa.Column('worker', sa.String(), nullable=True))
+    op.add_column('currency_import_jobs', sa.Column('spool_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('currency_import_jobs', 'spool_path')
+    op.drop_column('currency_import_jobs', 'worker')
@@ -0,0 +1,30 @@
+"""Add indexes for hot event, assignment and currency lookups
+
+Revision ID: 5d8f2e6c1a94
+Revises: e3a9c71f0b58
+Create Date: 2026-10-18 12:41:52.206117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8f2e6c1a94'
+down_revision = 'e3a9c71f0b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_event_assignments_pilot_event', 'event_assignments', ['pilot_id', 'event_id'], unique=False)
+    op.create_index(op.f('ix_event_assignments_event_id'), 'event_assignments', ['event_id'], unique=False)
+    op.create_index(op.f('ix_events_end_time'), 'events', ['end_time'], unique=False)
+    op.create_index('ix_currency_records_type_expiration', 'currency_records', ['currency_type', 'expiration_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_currency_records_type_expiration', table_name='currency_records')
+    op.drop_index(op.f('ix_events_end_time'), table_name='events')
+    op.drop_index(op.f('ix_event_assignments_event_id'), table_name='event_assignments')
+    op.drop_index('ix_event_assignments_pilot_event', table_name='event_assignments')
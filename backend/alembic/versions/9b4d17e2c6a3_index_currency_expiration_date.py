@@ -0,0 +1,24 @@
+"""Index currency_records.expiration_date for squadron-wide expiry scans
+
+Revision ID: 9b4d17e2c6a3
+Revises: 5d8f2e6c1a94
+Create Date: 2026-10-18 15:07:33.418265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4d17e2c6a3'
+down_revision = '5d8f2e6c1a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_currency_records_expiration_date'), 'currency_records', ['expiration_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_currency_records_expiration_date'), table_name='currency_records')
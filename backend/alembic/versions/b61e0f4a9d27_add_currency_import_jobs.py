@@ -0,0 +1,43 @@
+"""Add currency import jobs
+
+Revision ID: b61e0f4a9d27
+Revises: 354c5c5e4bc2
+Create Date: 2026-10-18 11:32:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b61e0f4a9d27'
+down_revision = '354c5c5e4bc2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('currency_import_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=True),
+    sa.Column('file_type', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('rows_processed', sa.Integer(), nullable=False),
+    sa.Column('batches', sa.Integer(), nullable=False),
+    sa.Column('imported', sa.Integer(), nullable=False),
+    sa.Column('rejected_count', sa.Integer(), nullable=False),
+    sa.Column('rejected', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_currency_import_jobs_id'), 'currency_import_jobs', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_currency_import_jobs_id'), table_name='currency_import_jobs')
+    op.drop_table('currency_import_jobs')
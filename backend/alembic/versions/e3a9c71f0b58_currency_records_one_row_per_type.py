@@ -0,0 +1,73 @@
+"""Keep one currency record per pilot and type, with history
+
+Revision ID: e3a9c71f0b58
+Revises: b61e0f4a9d27
+Create Date: 2026-10-18 12:06:19.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9c71f0b58'
+down_revision = 'b61e0f4a9d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('currency_record_history',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pilot_id', sa.Integer(), nullable=False),
+    sa.Column('currency_type', sa.String(), nullable=False),
+    sa.Column('last_completed_date', sa.Date(), nullable=True),
+    sa.Column('expiration_date', sa.Date(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('imported_at', sa.DateTime(), nullable=True),
+    sa.Column('superseded_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['pilot_id'], ['pilots.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_currency_record_history_id'), 'currency_record_history', ['id'], unique=False)
+    op.create_index('ix_currency_record_history_pilot_type', 'currency_record_history', ['pilot_id', 'currency_type'], unique=False)
+
+    op.add_column('currency_records', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+    # Move all but the newest row per (pilot, type) into history, then
+    # enforce one row per key. content_hash starts NULL; the next import
+    # of each row falls back to comparing dates.
+    op.execute("""
+        CREATE TEMPORARY TABLE superseded_currency_records AS
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY pilot_id, currency_type
+                ORDER BY imported_at DESC NULLS LAST, id DESC
+            ) AS rank
+            FROM currency_records
+        ) ranked
+        WHERE rank > 1
+    """)
+    op.execute("""
+        INSERT INTO currency_record_history
+            (pilot_id, currency_type, last_completed_date, expiration_date, status, imported_at, superseded_at)
+        SELECT pilot_id, currency_type, last_completed_date, expiration_date, status, imported_at, now()
+        FROM currency_records
+        WHERE id IN (SELECT id FROM superseded_currency_records)
+    """)
+    op.execute("DELETE FROM currency_records WHERE id IN (SELECT id FROM superseded_currency_records)")
+    op.execute("DROP TABLE superseded_currency_records")
+    op.create_unique_constraint('uq_currency_record_pilot_type', 'currency_records', ['pilot_id', 'currency_type'])
+
+    for column in ('inserted', 'updated', 'unchanged'):
+        op.add_column('currency_import_jobs', sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    for column in ('unchanged', 'updated', 'inserted'):
+        op.drop_column('currency_import_jobs', column)
+    op.drop_constraint('uq_currency_record_pilot_type', 'currency_records', type_='unique')
+    op.drop_column('currency_records', 'content_hash')
+    op.drop_index('ix_currency_record_history_pilot_type', table_name='currency_record_history')
+    op.drop_index(op.f('ix_currency_record_history_id'), table_name='currency_record_history')
+    op.drop_table('currency_record_history')
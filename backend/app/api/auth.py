@@ -1,9 +1,11 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from ..core.database import get_db
-from ..core.security import verify_password, get_password_hash, create_access_token
+from ..core.security import PasswordHasherBusy, get_password_hash, create_access_token, login_limiter, password_hasher
 from ..core.config import settings
 from ..core.dependencies import get_current_active_user
 from ..models.user import User, UserRole
@@ -35,21 +37,57 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 
+def _get_user(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _store_rehash(db: Session, user: User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.commit()
+
+
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    """
+    bcrypt runs on the bounded password hasher, and the database calls on
+    the threadpool, so a login burst can't stall the rest of the API.
+    """
+    retry_after = login_limiter.retry_after(form_data.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    user = await run_in_threadpool(_get_user, db, form_data.username)
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await password_hasher.verify_and_rehash(form_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many logins in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+    if not verified:
+        login_limiter.record_failure(form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_limiter.reset(form_data.username)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if new_hash:
+        # Upgrade hashes from an older cost factor while we have the password
+        await run_in_threadpool(_store_rehash, db, user, new_hash)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role.value},
+        data={"sub": user.username, "role": user.role.value, "uid": user.id},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,18 +1,50 @@
-from fastapi import APIRouter, Depends, Response
+import re
+from contextlib import nullcontext
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timezone
 from ..core.database import get_db
-from ..core.dependencies import get_current_active_user
-from ..models.user import User
+from ..core.config import settings
+from ..core.dependencies import get_current_active_user, require_role
+from ..models.user import User, UserRole
 from ..models.pilot import Pilot
-from ..services.calendar import generate_ics_for_pilot
+from ..services.calendar import (
+    get_feed_version,
+    stream_pilot_feed,
+    feed_etag,
+    iter_pilot_feeds,
+    iter_squadron_ics,
+    stream_zip,
+    export_pool,
+)
 
 router = APIRouter(prefix="/api/calendar", tags=["calendar"])
 
 
+def _not_modified(request: Request, etag: str, last_modified: datetime = None) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
 @router.get("/pilot/{pilot_id}/ics")
 def get_pilot_calendar(
     pilot_id: int,
+    request: Request,
     start_date: datetime = None,
     end_date: datetime = None,
     db: Session = Depends(get_db),
@@ -21,26 +53,46 @@ def get_pilot_calendar(
     """
     Get ICS calendar file for a pilot
     Can be accessed by the pilot themselves or schedulers/admins
+    Responses carry ETag/Last-Modified and conditional requests get 304
+    until the pilot's assignments or events change
     """
     # Check permissions
     if current_user.role.value not in ['admin', 'scheduler']:
         # Pilots can only access their own calendar
         pilot = db.query(Pilot).filter(Pilot.user_id == current_user.id).first()
         if not pilot or pilot.id != pilot_id:
-            from fastapi import HTTPException, status
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You can only access your own calendar"
             )
     
-    ics_content = generate_ics_for_pilot(db, pilot_id, start_date, end_date)
+    version, updated_at = get_feed_version(db, pilot_id)
+    # A pilot that was never bumped may not exist; answer 404 rather than 304
+    if updated_at is None and current_user.role.value in ['admin', 'scheduler']:
+        if db.query(Pilot.id).filter(Pilot.id == pilot_id).first() is None:
+            raise HTTPException(status_code=404, detail=f"Pilot {pilot_id} not found")
+    etag = feed_etag(pilot_id, version, start_date, end_date)
+    last_modified = updated_at.replace(tzinfo=timezone.utc) if updated_at else None
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return Response(
-        content=ics_content,
+    try:
+        ics_chunks = stream_pilot_feed(db, pilot_id, version, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    headers["Content-Disposition"] = f"attachment; filename=pilot_{pilot_id}_schedule.ics"
+    return StreamingResponse(
+        ics_chunks,
         media_type="text/calendar",
-        headers={
-            "Content-Disposition": f"attachment; filename=pilot_{pilot_id}_schedule.ics"
-        }
+        headers=headers
     )
 
 
@@ -66,3 +118,45 @@ def get_pilot_calendar_url(
         "calendar_url": calendar_url,
         "instructions": "Add this URL to your calendar application (Google Calendar, Outlook, Apple Calendar) as a calendar subscription"
     }
+
+
+@router.get("/export")
+def export_squadron_calendars(
+    export_format: str = Query("zip", alias="format"),
+    start_date: datetime = None,
+    end_date: datetime = None,
+    parallel: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """
+    Export every active pilot's calendar
+    format=zip streams a zip with one ICS file per pilot; format=merged
+    streams a single squadron calendar with ATTENDEE lines per pilot.
+    parallel=true renders events on a shared process pool for large ranges.
+    """
+    if export_format not in ("zip", "merged"):
+        raise HTTPException(status_code=400, detail="format must be 'zip' or 'merged'")
+    
+    def body():
+        with (export_pool.acquire() if parallel else nullcontext()) as executor:
+            if export_format == "merged":
+                yield from iter_squadron_ics(db, start_date, end_date, executor=executor)
+            else:
+                entries = (
+                    (f"pilot_{pilot.id}_{re.sub(r'[^A-Za-z0-9_-]', '_', pilot.call_sign or 'schedule')}.ics", chunks)
+                    for pilot, chunks in iter_pilot_feeds(db, start_date, end_date, executor=executor)
+                )
+                yield from stream_zip(entries)
+    
+    if export_format == "merged":
+        return StreamingResponse(
+            body(),
+            media_type="text/calendar",
+            headers={"Content-Disposition": "attachment; filename=squadron_schedule.ics"}
+        )
+    return StreamingResponse(
+        body(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=squadron_calendars.zip"}
+    )
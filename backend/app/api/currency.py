@@ -1,63 +1,70 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, UploadFile, File
 from sqlalchemy.orm import Session
-import tempfile
 import os
+from datetime import date, timedelta
+from ..core.config import settings
 from ..core.database import get_db
 from ..core.dependencies import get_current_active_user, require_role
 from ..models.user import User, UserRole
+from ..models.currency import CurrencyImportJob, CurrencyRecord, CurrencyRecordHistory, EXPIRING_WINDOW_DAYS
 from ..models.pilot import Pilot
-from ..services.currency import import_currency_records
-from ..schemas.currency import CurrencyRecordResponse
+from ..services.currency import DEFAULT_COLUMN_MAPPING, get_call_sign_mapping, import_currency_records
+from ..services.currency_jobs import import_queue
+from ..schemas.currency import CurrencyRecordResponse, ExpiringCurrencyResponse, CurrencyRecordHistoryResponse, CurrencyImportResult, CurrencyImportJobResponse
 
 router = APIRouter(prefix="/api/currency", tags=["currency"])
 
 
-@router.post("/import", response_model=List[CurrencyRecordResponse])
+@router.post("/import", response_model=Union[CurrencyImportJobResponse, CurrencyImportResult])
 def import_currency(
+    response: Response,
     file: UploadFile = File(...),
     file_type: str = "excel",  # "excel" or "csv"
+    background: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
 ):
     """
     Import currency data from spreadsheet
+
+    With background=true the file is queued and a job is returned straight
+    away (202); poll /api/currency/import/jobs/{job_id} for progress.
     Note: This is a simplified version. In production, you'd want to:
     - Accept column mapping configuration
     - Accept pilot mapping configuration
     - Handle file validation better
     """
-    # Save uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_type}") as tmp_file:
-        content = file.file.read()
-        tmp_file.write(content)
-        tmp_file_path = tmp_file.name
+    if file_type not in ("excel", "csv"):
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_type}")
+
+    # Spool the upload to disk in fixed-size chunks
+    tmp_file_path = import_queue.spool(file.file, file_type)
+    
+    if background:
+        # The job owns the spooled file from here on
+        job = import_queue.submit(
+            db,
+            file_path=tmp_file_path,
+            file_type=file_type,
+            file_name=file.filename,
+            created_by=current_user.id
+        )
+        response.status_code = status.HTTP_202_ACCEPTED
+        return job
     
     try:
-        # Get all pilots for mapping (simplified - in production, use provided mapping)
-        pilots = db.query(Pilot).all()
-        pilot_mapping = {}
-        for pilot in pilots:
-            if pilot.call_sign:
-                pilot_mapping[pilot.call_sign] = pilot.id
-        
-        # Default column mapping (should be configurable)
-        column_mapping = {
-            'call_sign': 'call_sign',  # Adjust based on your spreadsheet
-            'currency_type': 'currency_type',
-            'last_completed_date': 'last_completed_date',
-            'expiration_date': 'expiration_date'
-        }
-        
-        records = import_currency_records(
+        result = import_currency_records(
             db=db,
             file_path=tmp_file_path,
             file_type=file_type,
-            pilot_mapping=pilot_mapping,
-            column_mapping=column_mapping
+            pilot_mapping=get_call_sign_mapping(db),
+            column_mapping=DEFAULT_COLUMN_MAPPING,
+            batch_size=settings.CURRENCY_IMPORT_BATCH_SIZE,
+            max_rejects=settings.CURRENCY_IMPORT_MAX_REJECTS
         )
         
-        return records
+        return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error importing currency: {str(e)}")
     finally:
@@ -66,13 +73,98 @@ def import_currency(
             os.unlink(tmp_file_path)
 
 
+@router.get("/import/jobs", response_model=List[CurrencyImportJobResponse])
+def list_import_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
+):
+    """Most recent background imports first"""
+    return db.query(CurrencyImportJob).order_by(CurrencyImportJob.id.desc()).limit(limit).all()
+
+
+@router.get("/import/jobs/{job_id}", response_model=CurrencyImportJobResponse)
+def get_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
+):
+    job = db.query(CurrencyImportJob).filter(CurrencyImportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/expiring", response_model=List[ExpiringCurrencyResponse])
+def get_expiring_currency(
+    days: int = Query(EXPIRING_WINDOW_DAYS, ge=0, le=366),
+    currency_type: Optional[str] = None,
+    include_expired: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Active pilots' currency expiring within the next `days` days (and
+    already expired, unless include_expired=false), soonest first.
+
+    One range scan of the expiration index: (currency_type,
+    expiration_date) when a type is given, expiration_date otherwise.
+    """
+    today = date.today()
+    query = (
+        db.query(
+            CurrencyRecord.pilot_id,
+            Pilot.call_sign,
+            CurrencyRecord.currency_type,
+            CurrencyRecord.last_completed_date,
+            CurrencyRecord.expiration_date,
+            CurrencyRecord.current_status
+        )
+        .join(Pilot, Pilot.id == CurrencyRecord.pilot_id)
+        .filter(
+            CurrencyRecord.expiration_date <= today + timedelta(days=days),
+            Pilot.is_active == True
+        )
+    )
+    if not include_expired:
+        query = query.filter(CurrencyRecord.expiration_date >= today)
+    if currency_type:
+        query = query.filter(CurrencyRecord.currency_type == currency_type)
+
+    return [
+        ExpiringCurrencyResponse(
+            pilot_id=pilot_id,
+            call_sign=call_sign,
+            currency_type=currency,
+            last_completed_date=completed,
+            expiration_date=expires,
+            status=current_status,
+            days_remaining=(expires - today).days
+        )
+        for pilot_id, call_sign, currency, completed, expires, current_status in
+        query.order_by(CurrencyRecord.expiration_date, CurrencyRecord.pilot_id).all()
+    ]
+
+
 @router.get("/pilot/{pilot_id}", response_model=List[CurrencyRecordResponse])
 def get_pilot_currency(
     pilot_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    from ..models.currency import CurrencyRecord
-    
     records = db.query(CurrencyRecord).filter(CurrencyRecord.pilot_id == pilot_id).all()
     return records
+
+
+@router.get("/pilot/{pilot_id}/history", response_model=List[CurrencyRecordHistoryResponse])
+def get_pilot_currency_history(
+    pilot_id: int,
+    currency_type: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Values superseded by later imports, newest first"""
+    query = db.query(CurrencyRecordHistory).filter(CurrencyRecordHistory.pilot_id == pilot_id)
+    if currency_type:
+        query = query.filter(CurrencyRecordHistory.currency_type == currency_type)
+    return query.order_by(CurrencyRecordHistory.superseded_at.desc(), CurrencyRecordHistory.id.desc()).all()
@@ -1,46 +1,165 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+import base64
+import json
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
 from datetime import datetime
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import ReadSession, get_db, get_read_db
 from ..core.dependencies import get_current_active_user, require_role
 from ..models.user import User, UserRole
 from ..models.event import Event, EventAssignment, EventStatus
-from ..schemas.event import EventCreate, EventUpdate, EventResponse, EventAssignmentCreate, EventAssignmentResponse
+from ..schemas.event import EventCreate, EventUpdate, EventResponse, EventAssignmentCreate, EventAssignmentResponse, EventBulkRequest, EventBulkResponse, EventConflict
+from ..services.status_maintenance import EventSnapshot, mark_event_changed
+from ..services.calendar import bump_feed_versions, bump_event_feeds
+from ..services.conflicts import EventConflictError, check_conflicts, find_conflicts
+from ..services.events import BulkValidationError, bulk_apply, event_statement, events_page_statement
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
 
+# Fields a caller can ask for with ?fields=; id is always returned
+EVENT_FIELDS = set(EventResponse.model_fields)
+
+
+class EventPage:
+    """
+    One page of /api/events, keyset-paginated on (start_time, id).
+
+    The next page's cursor goes out in the X-Next-Cursor header so the
+    body stays a plain list. With fields= only those columns are selected
+    (and assignments only loaded when asked for).
+    """
+
+    def __init__(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        event_type: Optional[str],
+        cursor: Optional[str],
+        fields: Optional[str],
+        skip: int,
+        limit: int
+    ):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.event_type = event_type
+        self.after = self._decode_cursor(cursor) if cursor else None
+        self.fields = self._parse_fields(fields) if fields else None
+        self.skip = skip
+        self.limit = limit
+
+    @staticmethod
+    def _parse_fields(fields: str) -> List[str]:
+        requested = ["id"] + [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(requested) - EVENT_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        return list(dict.fromkeys(requested))
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            start_time, event_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(start_time), int(event_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    @staticmethod
+    def _encode_cursor(start_time: datetime, event_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([start_time.isoformat(), event_id]).encode()).decode()
+
+    @property
+    def projected(self) -> bool:
+        return self.fields is not None and "assignments" not in self.fields
+
+    def statement(self):
+        return events_page_statement(
+            self.start_date, self.end_date, self.event_type, self.after, self.fields, self.skip, self.limit
+        )
+
+    def render(self, result, response: Response):
+        rows = result.all() if self.projected else result.scalars().all()
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            response.headers["X-Next-Cursor"] = self._encode_cursor(rows[-1].start_time, rows[-1].id)
+        if self.fields is None:
+            return rows
+        
+        items = []
+        for row in rows:
+            item = {field: getattr(row, field) for field in self.fields if field != "assignments"}
+            if "assignments" in self.fields:
+                item["assignments"] = [
+                    EventAssignmentResponse.model_validate(assignment).model_dump()
+                    for assignment in row.assignments
+                ]
+            items.append(item)
+        return JSONResponse(jsonable_encoder(items), headers=dict(response.headers))
+
+
+# Event fields whose change can create a double-booking
+SCHEDULE_FIELDS = {"start_time", "end_time", "status", "aircraft_id", "simulator_id"}
+
+
+def _reject_conflicts(db: Session, event_ids: List[int], allow_conflicts: bool) -> None:
+    """Roll back and answer 409 with the details if the events are double-booked"""
+    if allow_conflicts:
+        return
+    try:
+        check_conflicts(db, event_ids)
+    except EventConflictError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": str(e), "conflicts": jsonable_encoder(e.conflicts)}
+        )
+
+
+@router.get("/conflicts", response_model=List[EventConflict])
+def get_conflicts(
+    start_date: datetime,
+    end_date: datetime,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Every pilot, aircraft and simulator double-booking overlapping a date range"""
+    if end_date <= start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+    return find_conflicts(db, start_date, end_date)
+
+
 @router.get("/", response_model=List[EventResponse])
-def get_events(
+async def get_events(
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     event_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1, le=500),
+    db: ReadSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Event)
-    
-    if start_date:
-        query = query.filter(Event.start_time >= start_date)
-    if end_date:
-        query = query.filter(Event.start_time <= end_date)
-    if event_type:
-        query = query.filter(Event.event_type == event_type)
-    
-    events = query.options(joinedload(Event.assignments)).order_by(Event.start_time).offset(skip).limit(limit).all()
-    return events
+    """
+    Events ordered by start time. Pass the X-Next-Cursor response header
+    back as cursor= for the next page; fields=id,event_type,start_time,...
+    trims each event to those fields.
+    """
+    page = EventPage(start_date, end_date, event_type, cursor, fields, skip, limit)
+    return page.render(await db.execute(page.statement()), response)
 
 
 @router.get("/{event_id}", response_model=EventResponse)
-def get_event(
+async def get_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: ReadSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    event = db.query(Event).options(joinedload(Event.assignments)).filter(Event.id == event_id).first()
+    event = (await db.execute(event_statement(event_id))).scalars().first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
@@ -49,6 +168,7 @@ def get_event(
 @router.post("/", response_model=EventResponse, status_code=status.HTTP_201_CREATED)
 def create_event(
     event_data: EventCreate,
+    allow_conflicts: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
 ):
@@ -65,15 +185,51 @@ def create_event(
         )
         db.add(assignment)
     
+    _reject_conflicts(db, [db_event.id], allow_conflicts)
+    bump_feed_versions(db, [a.pilot_id for a in event_data.assignments])
     db.commit()
     db.refresh(db_event)
     return db_event
 
 
+@router.post("/bulk", response_model=EventBulkResponse)
+def bulk_events(
+    request: EventBulkRequest,
+    allow_conflicts: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
+):
+    """
+    Create many events (with their crews) and/or replace the crews of
+    existing events in a single transaction, e.g. to publish a month's
+    schedule. Nothing is written if any item is invalid (400) or, unless
+    allow_conflicts, if the result double-books anyone or anything (409);
+    either response lists every problem found.
+    """
+    if len(request.create) + len(request.assignments) > settings.EVENTS_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.EVENTS_BULK_MAX_ITEMS} items per request"
+        )
+    
+    try:
+        created_ids, updated_event_ids = bulk_apply(db, request.create, request.assignments, allow_conflicts)
+    except BulkValidationError as e:
+        raise HTTPException(status_code=400, detail=e.errors)
+    except EventConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": str(e), "conflicts": jsonable_encoder(e.conflicts)}
+        )
+    
+    return {"created_ids": created_ids, "updated_event_ids": updated_event_ids}
+
+
 @router.put("/{event_id}", response_model=EventResponse)
 def update_event(
     event_id: int,
     event_data: EventUpdate,
+    allow_conflicts: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
 ):
@@ -81,11 +237,16 @@ def update_event(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    before = EventSnapshot(event)
     update_data = event_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(event, field, value)
     
     event.updated_at = datetime.utcnow()
+    if SCHEDULE_FIELDS.intersection(update_data) and event.status != EventStatus.CANCELLED:
+        _reject_conflicts(db, [event.id], allow_conflicts)
+    mark_event_changed(db, event, before, changed_fields=update_data.keys())
+    bump_event_feeds(db, event)
     db.commit()
     db.refresh(event)
     return event
@@ -101,7 +262,10 @@ def delete_event(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    before = EventSnapshot(event)
+    bump_event_feeds(db, event)
     db.delete(event)
+    mark_event_changed(db, event, before, deleted=True)
     db.commit()
     return None
 
@@ -110,6 +274,7 @@ def delete_event(
 def add_assignment(
     event_id: int,
     assignment_data: EventAssignmentCreate,
+    allow_conflicts: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
 ):
@@ -123,6 +288,11 @@ def add_assignment(
         position=assignment_data.position
     )
     db.add(assignment)
+    if event.status != EventStatus.CANCELLED:
+        _reject_conflicts(db, [event_id], allow_conflicts)
+    if event.status == EventStatus.EFFECTIVE:
+        mark_event_changed(db, event, extra_pilot_ids=[assignment_data.pilot_id])
+    bump_event_feeds(db, event, [assignment_data.pilot_id])
     db.commit()
     db.refresh(assignment)
     return assignment
@@ -132,6 +302,7 @@ def add_assignment(
 def update_event_status(
     event_id: int,
     new_status: str,
+    allow_conflicts: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SCHEDULER]))
 ):
@@ -139,12 +310,19 @@ def update_event_status(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    before = EventSnapshot(event)
+    previous_status = event.status
     try:
         event.status = EventStatus(new_status)
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid status: {new_status}")
     
     event.updated_at = datetime.utcnow()
+    if previous_status == EventStatus.CANCELLED and event.status != EventStatus.CANCELLED:
+        # Reinstating an event can collide with what was booked meanwhile
+        _reject_conflicts(db, [event.id], allow_conflicts)
+    mark_event_changed(db, event, before, changed_fields=["status"])
+    bump_event_feeds(db, event)
     db.commit()
     db.refresh(event)
     return event
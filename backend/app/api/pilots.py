@@ -1,33 +1,38 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from ..core.database import get_db
+from ..core.database import ReadSession, get_db, get_read_db
 from ..core.dependencies import get_current_active_user, require_role
 from ..models.user import User, UserRole
 from ..models.pilot import Pilot
 from ..schemas.pilot import PilotCreate, PilotUpdate, PilotResponse
+from ..services.calendar import bump_feed_versions
 
 router = APIRouter(prefix="/api/pilots", tags=["pilots"])
 
 
+def _pilots_statement(skip: int, limit: int):
+    return select(Pilot).where(Pilot.is_active == True).order_by(Pilot.id).offset(skip).limit(limit)
+
+
 @router.get("/", response_model=List[PilotResponse])
-def get_pilots(
+async def get_pilots(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: ReadSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    pilots = db.query(Pilot).filter(Pilot.is_active == True).offset(skip).limit(limit).all()
-    return pilots
+    return (await db.execute(_pilots_statement(skip, limit))).scalars().all()
 
 
 @router.get("/{pilot_id}", response_model=PilotResponse)
-def get_pilot(
+async def get_pilot(
     pilot_id: int,
-    db: Session = Depends(get_db),
+    db: ReadSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    pilot = db.query(Pilot).filter(Pilot.id == pilot_id).first()
+    pilot = (await db.execute(select(Pilot).where(Pilot.id == pilot_id))).scalars().first()
     if not pilot:
         raise HTTPException(status_code=404, detail="Pilot not found")
     return pilot
@@ -64,6 +69,9 @@ def update_pilot(
     for field, value in update_data.items():
         setattr(pilot, field, value)
     
+    if "call_sign" in update_data:
+        # The call sign names the pilot's calendar feed
+        bump_feed_versions(db, [pilot_id])
     db.commit()
     db.refresh(pilot)
     return pilot
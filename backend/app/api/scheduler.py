@@ -32,12 +32,17 @@ def optimize(
 ):
     """
     Optimize pilot assignments for given events
+    Set constraints.engine to "cp" for the constraint solver and
+    constraints.time_limit to bound its run time in seconds
     """
     events = db.query(Event).filter(Event.id.in_(request.event_ids)).all()
     if len(events) != len(request.event_ids):
         raise HTTPException(status_code=404, detail="Some events not found")
     
-    assignments = optimize_schedule(db, events, request.constraints)
+    try:
+        assignments = optimize_schedule(db, events, request.constraints)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"assignments": assignments}
 
 
@@ -50,11 +55,14 @@ def suggest(
     """
     Suggest an optimized schedule for a date range
     """
-    suggested_events = suggest_schedule(
-        db,
-        request.start_date,
-        request.end_date,
-        request.event_type,
-        request.constraints
-    )
+    try:
+        suggested_events = suggest_schedule(
+            db,
+            request.start_date,
+            request.end_date,
+            request.event_type,
+            request.constraints
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"suggested_events": suggested_events}
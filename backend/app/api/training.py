@@ -1,13 +1,16 @@
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import date
 from ..core.database import get_db
 from ..core.dependencies import get_current_active_user, require_role
 from ..models.user import User, UserRole
+from ..models.pilot import Pilot
 from ..models.training import TrainingRequirement, PilotStatus
-from ..schemas.training import TrainingRequirementCreate, TrainingRequirementResponse, PilotStatusResponse
-from ..services.cmr_bmc import evaluate_pilot_status, evaluate_all_pilots
+from ..schemas.training import TrainingRequirementCreate, TrainingRequirementResponse, PilotStatusResponse, PilotTrainingCounterResponse
+from ..services.cmr_bmc import evaluate_pilot_status, evaluate_all_pilots, preview_pilot_status
+from ..services.status_maintenance import mark_requirements_changed
+from ..services.training_counters import get_counters
 
 router = APIRouter(prefix="/api/training", tags=["training"])
 
@@ -36,6 +39,8 @@ def create_requirement(
     
     db_requirement = TrainingRequirement(**requirement_data.dict())
     db.add(db_requirement)
+    # Stored statuses were judged against the old requirement set
+    mark_requirements_changed(db)
     db.commit()
     db.refresh(db_requirement)
     return db_requirement
@@ -48,14 +53,28 @@ def get_pilot_status(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    """
+    A pilot's stored CMR/BMC status for a month.
+
+    Stored statuses are kept current by the status worker from event and
+    requirement changes. A month with nothing stored yet is evaluated
+    inline from the monthly counters (two queries) as a deliberate
+    exception to worker-only evaluation, so the route keeps answering 200
+    rather than a 404 clients would read as "pilot not found". That result
+    is not saved, and its id is null: PilotStatusResponse.id is nullable
+    for this case.
+    """
     status_obj = db.query(PilotStatus).filter(
         PilotStatus.pilot_id == pilot_id,
         PilotStatus.evaluation_month == evaluation_month.replace(day=1)
     ).first()
     
     if not status_obj:
-        # Evaluate if not exists
-        status_obj = evaluate_pilot_status(db, pilot_id, evaluation_month)
+        # Nothing stored for the month yet (the status worker fills months
+        # dirtied by event writes); evaluate it without saving
+        if not db.query(Pilot.id).filter(Pilot.id == pilot_id).first():
+            raise HTTPException(status_code=404, detail="Pilot not found")
+        status_obj = preview_pilot_status(db, pilot_id, evaluation_month)
     
     return status_obj
 
@@ -79,3 +98,20 @@ def evaluate_all(
 ):
     statuses = evaluate_all_pilots(db, evaluation_month)
     return {"evaluated": len(statuses), "statuses": statuses}
+
+
+@router.get("/counters", response_model=List[PilotTrainingCounterResponse])
+def get_training_counters(
+    start_month: date,
+    end_month: date,
+    pilot_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Monthly effective event counts and hours per pilot and event type,
+    for trend reporting over any range of months
+    """
+    if end_month < start_month:
+        raise HTTPException(status_code=400, detail="end_month must not be before start_month")
+    return get_counters(db, [pilot_id] if pilot_id is not None else None, start_month, end_month)
@@ -4,9 +4,62 @@ from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Connection pool (ignored for SQLite); statement timeout applies to PostgreSQL, 0 disables it
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    # Optional async engine for read-heavy async routes, e.g. postgresql+asyncpg://...
+    ASYNC_DATABASE_URL: Optional[str] = None
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Authenticated users kept in memory per worker; role checks trust signed token claims
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_USER_CACHE_SIZE: int = 1024
+    AUTH_ROLE_FROM_TOKEN: bool = True
+    # Password hashing runs on a small dedicated pool; logins beyond the backlog get a 503
+    AUTH_BCRYPT_ROUNDS: int = 12  # Stored hashes with fewer rounds are upgraded on login
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_HASH_MAX_PENDING: int = 32
+    # Failed logins allowed per username within the window before 429s
+    AUTH_LOGIN_MAX_FAILURES: int = 5
+    AUTH_LOGIN_WINDOW_SECONDS: int = 300
+    AUTH_LOGIN_MAX_TRACKED: int = 10000  # Usernames with recent failures kept; the stalest are dropped first
+    # Schedule optimizer time budget (seconds) for the "cp" engine
+    SCHEDULER_TIME_LIMIT_SECONDS: float = 10.0
+    SCHEDULER_MAX_TIME_LIMIT_SECONDS: float = 60.0
+    # Max events plus assignment sets in one POST /api/events/bulk
+    EVENTS_BULK_MAX_ITEMS: int = 2000
+    # Hard caps for /api/scheduler/suggest
+    SCHEDULER_MAX_SUGGESTIONS: int = 200
+    SCHEDULER_MAX_SUGGEST_DAYS: int = 366
+    # Background recomputation of dirty CMR/BMC pilot months
+    STATUS_WORKER_ENABLED: bool = True
+    STATUS_WORKER_INTERVAL_SECONDS: float = 5.0
+    # Rendered ICS feeds kept in memory per worker
+    CALENDAR_FEED_CACHE_SIZE: int = 512
+    CALENDAR_FEED_CACHE_MAX_BYTES: int = 262144  # Larger feeds are streamed, not cached
+    CALENDAR_EXPORT_WORKERS: int = 4  # Process pool size for parallel squadron exports
+    CALENDAR_EXPORT_MAX_PARALLEL: int = 2  # Exports sharing that pool at once; more render in their own thread
+    # Currency spreadsheet imports are spooled and processed in batches
+    CURRENCY_UPLOAD_CHUNK_BYTES: int = 1048576
+    CURRENCY_IMPORT_BATCH_SIZE: int = 1000
+    CURRENCY_IMPORT_MAX_REJECTS: int = 1000  # Rejects beyond this are counted, not returned
+    CURRENCY_IMPORT_WORKERS: int = 2  # Thread pool size for background imports
+    CURRENCY_IMPORT_SPOOL_DIR: Optional[str] = None  # Default: currency-imports under the system temp dir
+    CURRENCY_IMPORT_JOB_TIMEOUT_SECONDS: int = 3600  # Queued or running jobs older than this are failed
+    # Request metrics at /api/metrics; when METRICS_TOKEN is set scrapers must send it as a bearer token
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    # Requests slower than the threshold are counted; SLOW_REQUEST_LOG_SQL also logs their statements
+    SLOW_REQUEST_THRESHOLD_MS: int = 1000
+    SLOW_REQUEST_LOG_SQL: bool = False
+    SLOW_REQUEST_MAX_STATEMENTS: int = 50  # Distinct statements per logged request
+    # Raise when a @query_budget service function runs more statements than declared (tests, CI)
+    QUERY_BUDGETS_ENFORCED: bool = False
     
     class Config:
         env_file = ".env"
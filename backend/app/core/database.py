@@ -1,11 +1,49 @@
+from typing import Any, Dict
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Result, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+
+def engine_options(database_url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Pool and connection settings for create_engine / create_async_engine"""
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    backend = make_url(database_url).get_backend_name()
+    if backend == "sqlite":
+        # SQLite picks its own pool class; sizing options don't apply
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Only created when ASYNC_DATABASE_URL is set
+async_engine = (
+    create_async_engine(settings.ASYNC_DATABASE_URL, **engine_options(settings.ASYNC_DATABASE_URL, is_async=True))
+    if settings.ASYNC_DATABASE_URL else None
+)
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    if async_engine is not None else None
+)
+
 Base = declarative_base()
 
 
@@ -15,3 +53,56 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("ASYNC_DATABASE_URL is not configured")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class ReadSession:
+    """
+    Runs read-only statements for async routes on whichever engine is
+    configured: awaited on the async engine when ASYNC_DATABASE_URL is set,
+    otherwise on a sync session in the threadpool. Either way the result
+    comes back fully buffered, eager loads included.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, statement) -> Result:
+        if isinstance(self.session, AsyncSession):
+            return await self.session.execute(statement)
+        frozen = await run_in_threadpool(lambda: self.session.execute(statement).freeze())
+        return frozen()
+
+
+async def get_read_db():
+    """ReadSession for lookups served by async routes"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield ReadSession(db)
+        return
+    db = SessionLocal()
+    try:
+        yield ReadSession(db)
+    finally:
+        await run_in_threadpool(db.close)
+
+
+def get_upsert_insert(db):
+    """
+    Dialect-specific insert() that supports ON CONFLICT for the session's
+    database, or None when the backend has no upsert.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
@@ -1,8 +1,13 @@
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 from jose import JWTError
+from .config import settings
 from .database import get_db
 from .security import decode_access_token
 from ..models.user import User, UserRole
@@ -10,10 +15,107 @@ from ..models.user import User, UserRole
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+class AuthenticatedUser:
+    """
+    Detached snapshot of the fields routes read from current_user, safe to
+    share between requests. Built from a users row or, for role checks,
+    from verified token claims alone (email and full_name are then None).
+    """
+
+    __slots__ = ("id", "username", "email", "full_name", "role", "is_active")
+
+    def __init__(self, id: int, username: str, role: UserRole, is_active: bool = True,
+                 email: Optional[str] = None, full_name: Optional[str] = None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.full_name = full_name
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(user.id, user.username, user.role, user.is_active, user.email, user.full_name)
+
+
+class UserCache:
+    """
+    Short-TTL LRU of authenticated users keyed by username.
+
+    invalidate() drops a user and remembers when, so tokens issued before
+    a deactivation or role change are no longer trusted on their claims:
+    a token is only trusted if its iat is strictly after the last change.
+    Both are sub-second; tokens from before fractional iat carry whole
+    seconds, which only errs toward rejecting them.
+    Both are per process: other workers pick the change up when their
+    entry expires, and claim-only checks there when the token does.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._changed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return user
+
+    def put(self, user: AuthenticatedUser) -> None:
+        with self._lock:
+            self._entries[user.username] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._entries.pop(username, None)
+            self._changed_at[username] = now
+            # Tokens older than their lifetime are rejected anyway
+            horizon = now - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for name in [name for name, at in self._changed_at.items() if at < horizon]:
+                del self._changed_at[name]
+
+    def changed_since(self, username: str, issued_at: float) -> bool:
+        with self._lock:
+            changed_at = self._changed_at.get(username)
+        return changed_at is not None and changed_at >= issued_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._changed_at.clear()
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_TTL_SECONDS, settings.AUTH_USER_CACHE_SIZE)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in ("role", "is_active", "username")):
+        user_cache.invalidate(target.username)
+        for old_username in state.attrs["username"].history.deleted or ():
+            user_cache.invalidate(old_username)
+
+
+def invalidate_user(username: str) -> None:
+    """Drop a user's cached auth, e.g. after a change made outside the ORM"""
+    user_cache.invalidate(username)
+
+
+def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -28,23 +130,65 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
+    issued_at = payload.get("iat")
+    if issued_at is not None and user_cache.changed_since(username, issued_at):
+        raise credentials_exception
+    
+    return payload
+
+
+async def get_current_user(
+    claims: dict = Depends(get_token_claims),
+    db: Session = Depends(get_db)
+) -> AuthenticatedUser:
+    username: str = claims["sub"]
+    cached = user_cache.get(username)
+    if cached is not None:
+        return cached
+    
     user = db.query(User).filter(User.username == username).first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return user
+    current_user = AuthenticatedUser.from_user(user)
+    user_cache.put(current_user)
+    return current_user
 
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
+async def get_token_user(
+    claims: dict = Depends(get_token_claims),
+    db: Session = Depends(get_db)
+) -> AuthenticatedUser:
+    """
+    The caller as stated by their verified token, without a database read.
+    Tokens without the uid/role/iat claims (or with AUTH_ROLE_FROM_TOKEN
+    off) fall back to the cached user lookup.
+    """
+    if settings.AUTH_ROLE_FROM_TOKEN and "uid" in claims and "iat" in claims:
+        try:
+            role = UserRole(claims.get("role"))
+        except ValueError:
+            role = None
+        if role is not None:
+            return AuthenticatedUser(claims["uid"], claims["sub"], role)
+    
+    return await get_current_active_user(await get_current_user(claims, db))
+
+
 def require_role(allowed_roles: list[UserRole]):
-    async def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+    async def role_checker(current_user: AuthenticatedUser = Depends(get_token_user)) -> AuthenticatedUser:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
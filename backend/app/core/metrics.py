@@ -0,0 +1,323 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+MetricsMiddleware times every request and, through SQLAlchemy engine
+events, counts the SQL statements it runs and the time they take. Pool
+checkout waits are timed on the engines' pools, and the threadpool that
+runs sync routes is sampled when /api/metrics is scraped. Requests slower
+than SLOW_REQUEST_THRESHOLD_MS are counted and, with SLOW_REQUEST_LOG_SQL,
+logged with their statements grouped by text, so N+1 patterns show up as
+one statement run many times.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+CHECKOUT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Distinct statements kept per request for the slow-request log, and how much of each is logged
+MAX_TRACKED_STATEMENTS = 200
+MAX_LOGGED_STATEMENT_CHARS = 1000
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        # [count per bucket..., +Inf count, sum]
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{base} {series[-1]}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _gauge(name: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {value}")
+    return lines
+
+
+class RequestStats:
+    """SQL issued while serving one request"""
+
+    __slots__ = ("statements", "sql_seconds", "by_statement")
+
+    def __init__(self, track_statements: bool):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # statement text -> [count, seconds], only kept for the slow-request log
+        self.by_statement: Optional[Dict[str, List[float]]] = {} if track_statements else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.sql_seconds += seconds
+        if self.by_statement is None:
+            return
+        totals = self.by_statement.get(statement)
+        if totals is None:
+            if len(self.by_statement) >= MAX_TRACKED_STATEMENTS:
+                return
+            totals = self.by_statement[statement] = [0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class MetricsRegistry:
+    """Process-wide metrics; every update takes one lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Time to serve a request, including a streamed body.",
+            ("method", "route", "status"), LATENCY_BUCKETS
+        )
+        self.request_statements = Histogram(
+            "http_request_sql_statements", "SQL statements executed per request.",
+            ("method", "route"), STATEMENT_BUCKETS
+        )
+        self.request_sql_seconds = Counter(
+            "http_request_sql_seconds_total", "Time spent executing SQL while serving requests.",
+            ("method", "route")
+        )
+        self.statements = Counter(
+            "db_statements_total", "SQL statements executed, in requests or in background work.",
+            ("context",)
+        )
+        self.pool_checkout = Histogram(
+            "db_pool_checkout_seconds", "Time waiting to check a connection out of the pool.",
+            ("engine",), CHECKOUT_BUCKETS
+        )
+        self.slow_requests = Counter(
+            "http_slow_requests_total", "Requests slower than SLOW_REQUEST_THRESHOLD_MS.",
+            ("method", "route")
+        )
+        self._engines: Dict[str, Engine] = {}
+
+    # Requests
+
+    def start_request(self, track_statements: bool) -> Tuple[RequestStats, object]:
+        stats = RequestStats(track_statements)
+        return stats, _current_request.set(stats)
+
+    def finish_request(self, token, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        _current_request.reset(token)
+        with self._lock:
+            self.request_latency.observe((method, route, str(status)), seconds)
+            self.request_statements.observe((method, route), stats.statements)
+            self.request_sql_seconds.inc((method, route), stats.sql_seconds)
+
+    def record_slow_request(self, method: str, route: str) -> None:
+        with self._lock:
+            self.slow_requests.inc((method, route))
+
+    # Engines
+
+    def instrument_engine(self, engine: Engine, name: str) -> None:
+        """Count statements and time pool checkouts on an engine (sync, or an async engine's sync_engine)"""
+        if name in self._engines:
+            return
+        self._engines[name] = engine
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", _discard_query_start)
+
+        pool = engine.pool
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                waited = time.perf_counter() - started
+                with self._lock:
+                    self.pool_checkout.observe((name,), waited)
+
+        pool.connect = timed_connect
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.get("metrics_query_start")
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        stats = _current_request.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+        with self._lock:
+            self.statements.inc(("request" if stats is not None else "background",))
+
+    # Exposition
+
+    def render(self, threadpool: Optional[Dict[str, float]] = None) -> str:
+        with self._lock:
+            lines = []
+            for metric in (
+                self.request_latency, self.request_statements, self.request_sql_seconds,
+                self.slow_requests, self.statements, self.pool_checkout
+            ):
+                lines.extend(metric.render())
+
+            pools = []
+            for name, engine in sorted(self._engines.items()):
+                pool = engine.pool
+                for field in ("size", "checkedout"):
+                    if hasattr(pool, field):
+                        pools.append(({"engine": name, "state": field}, getattr(pool, field)()))
+        if pools:
+            lines.extend(_gauge("db_pool_connections", "Connection pool size and connections checked out.", pools))
+        for field, value in (threadpool or {}).items():
+            lines.extend(_gauge(
+                f"threadpool_{field}", f"Worker threadpool for sync routes: {field.replace('_', ' ')}.", [({}, value)]
+            ))
+        return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _discard_query_start(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_query_start"):
+        conn.info["metrics_query_start"].pop()
+
+
+def threadpool_stats() -> Dict[str, float]:
+    """Occupancy of the anyio threadpool sync routes run on; call from the event loop"""
+    from anyio.to_thread import current_default_thread_limiter
+
+    limiter = current_default_thread_limiter()
+    return {
+        "capacity": limiter.total_tokens,
+        "in_use": limiter.borrowed_tokens,
+        "waiting": limiter.statistics().tasks_waiting,
+    }
+
+
+def log_slow_request(method: str, path: str, seconds: float, stats: RequestStats, max_statements: int) -> None:
+    """Log a slow request with its statements, most executed first"""
+    lines = [
+        f"Slow request {method} {path}: {seconds * 1000:.0f} ms, "
+        f"{stats.statements} SQL statements in {stats.sql_seconds * 1000:.0f} ms"
+    ]
+    ranked = sorted((stats.by_statement or {}).items(), key=lambda item: (-item[1][0], -item[1][1]))
+    for statement, (count, statement_seconds) in ranked[:max_statements]:
+        text = " ".join(statement.split())[:MAX_LOGGED_STATEMENT_CHARS]
+        lines.append(f"  {int(count)}x {statement_seconds * 1000:.1f} ms  {text}")
+    logger.warning("\n".join(lines))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request until its last body chunk is
+    sent, so streamed responses (calendar feeds, exports) count in full.
+    """
+
+    def __init__(
+        self,
+        app,
+        registry: MetricsRegistry,
+        slow_request_ms: int = 1000,
+        log_slow_sql: bool = False,
+        max_logged_statements: int = 50
+    ):
+        self.app = app
+        self.registry = registry
+        self.slow_request_seconds = slow_request_ms / 1000
+        self.log_slow_sql = log_slow_sql
+        self.max_logged_statements = max_logged_statements
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats, token = self.registry.start_request(track_statements=self.log_slow_sql)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = time.perf_counter() - started
+            route = scope.get("route")
+            # Label by path template, never the raw path, to bound the series count
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            self.registry.finish_request(token, method, route_path, status, seconds, stats)
+            if seconds >= self.slow_request_seconds:
+                self.registry.record_slow_request(method, route_path)
+                if self.log_slow_sql:
+                    log_slow_request(method, scope.get("path", ""), seconds, stats, self.max_logged_statements)
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,129 @@
+"""
+Count SQL statements and fail when a block or function goes over budget,
+to catch N+1 query regressions.
+
+count_queries() and assert_max_queries() are context managers for tests
+and scripts. @query_budget(n) marks a service function's budget and is
+enforced only when QUERY_BUDGETS_ENFORCED is set (tests, CI, staging), so
+production pays one settings check per call.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+F = TypeVar("F", bound=Callable)
+
+
+class QueryLog:
+    """Statements seen while counting"""
+
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def format(self) -> str:
+        return "\n".join(f"  {i}. {' '.join(statement.split())}" for i, statement in enumerate(self.statements, 1))
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, label: str, max_queries: int, log: QueryLog):
+        self.max_queries = max_queries
+        self.log = log
+        super().__init__(f"{label} ran {log.count} SQL statements, budget is {max_queries}:\n{log.format()}")
+
+
+# Logs counting statements issued from the current context (thread or task)
+_context_logs: ContextVar[Tuple[QueryLog, ...]] = ContextVar("query_budget_logs", default=())
+_instrumented = set()
+
+
+def _record_context(conn, cursor, statement, parameters, context, executemany) -> None:
+    for log in _context_logs.get():
+        log.statements.append(statement)
+
+
+def _default_engine() -> Engine:
+    from .database import engine
+    return engine
+
+
+@contextmanager
+def count_queries(engine: Optional[Engine] = None, local: bool = False) -> Iterator[QueryLog]:
+    """
+    Collect the statements run on engine (default: the app engine) inside
+    the block.
+
+    By default every statement on the engine counts, whichever thread runs
+    it, which is what a test driving the app through TestClient needs.
+    With local=True only statements from the current thread or task count,
+    so concurrent requests don't inflate a function's count.
+    """
+    engine = engine or _default_engine()
+    log = QueryLog()
+
+    if local:
+        if id(engine) not in _instrumented:
+            event.listen(engine, "before_cursor_execute", _record_context)
+            _instrumented.add(id(engine))
+        token = _context_logs.set(_context_logs.get() + (log,))
+        try:
+            yield log
+        finally:
+            _context_logs.reset(token)
+        return
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def assert_max_queries(
+    max_queries: int,
+    engine: Optional[Engine] = None,
+    local: bool = False,
+    label: str = "Block"
+) -> Iterator[QueryLog]:
+    """Raise QueryBudgetExceeded, listing the statements, if the block runs more than max_queries"""
+    with count_queries(engine, local=local) as log:
+        yield log
+    if log.count > max_queries:
+        raise QueryBudgetExceeded(label, max_queries, log)
+
+
+def query_budget(max_queries: int) -> Callable[[F], F]:
+    """
+    Declare the most statements a service function may run. Checked, with
+    QueryBudgetExceeded on overrun, only when QUERY_BUDGETS_ENFORCED is on;
+    the budget is also kept on the function as `query_budget`.
+    """
+    def decorate(func: F) -> F:
+        label = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not settings.QUERY_BUDGETS_ENFORCED:
+                return func(*args, **kwargs)
+            with assert_max_queries(max_queries, local=True, label=label):
+                return func(*args, **kwargs)
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorate
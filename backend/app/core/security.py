@@ -1,10 +1,20 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Deque, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.AUTH_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.AUTH_BCRYPT_ROUNDS
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -15,13 +25,126 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_rehash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, if it matches a hash below the current cost
+    (or a deprecated scheme), return a fresh hash to store in its place.
+    """
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
+
+class PasswordHasherBusy(Exception):
+    """More password checks are queued than the hasher accepts"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on its own small thread pool so a login burst uses at most
+    `workers` cores and never ties up the request threadpool. Calls beyond
+    `max_pending` in flight are refused with PasswordHasherBusy.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def verify_and_rehash(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy()
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, verify_and_rehash, plain_password, hashed_password)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.AUTH_HASH_WORKERS, settings.AUTH_HASH_MAX_PENDING)
+
+
+class LoginRateLimiter:
+    """
+    Sliding window of failed logins per username, kept per process.
+
+    Usernames are ordered by their latest failure, so the ones whose window
+    has passed sit at the front and are pruned on each failure; past
+    max_tracked, the stalest are dropped as well. Only the last
+    max_failures timestamps of a username are kept.
+    """
+
+    def __init__(self, max_failures: int, window_seconds: int, max_tracked: int):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.max_tracked = max_tracked
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retry_after(self, username: str) -> int:
+        """Seconds until the user may try again, 0 if not limited"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(username)
+            if not failures:
+                return 0
+            while failures and failures[0] <= now - self.window_seconds:
+                failures.popleft()
+            if not failures:
+                del self._failures[username]
+                return 0
+            if len(failures) < self.max_failures:
+                return 0
+            return max(int(failures[0] + self.window_seconds - now) + 1, 1)
+
+    def record_failure(self, username: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(username)
+            if failures is None:
+                failures = self._failures[username] = deque(maxlen=self.max_failures)
+            else:
+                self._failures.move_to_end(username)
+            failures.append(now)
+            while self._failures:
+                oldest = next(iter(self._failures.values()))
+                if oldest[-1] > now - self.window_seconds and len(self._failures) <= self.max_tracked:
+                    break
+                self._failures.popitem(last=False)
+
+    def reset(self, username: str) -> None:
+        with self._lock:
+            self._failures.pop(username, None)
+
+
+login_limiter = LoginRateLimiter(
+    settings.AUTH_LOGIN_MAX_FAILURES, settings.AUTH_LOGIN_WINDOW_SECONDS, settings.AUTH_LOGIN_MAX_TRACKED
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # Sub-second iat (a JWT NumericDate may be fractional) so a token issued
+    # just before a role change in the same second is still caught
+    to_encode.update({"exp": expire, "iat": round(time.time(), 6)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
@@ -1,6 +1,14 @@
-from fastapi import FastAPI
+import hmac
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .core.config import settings
+from .core.database import SessionLocal, engine, async_engine
+from .core.metrics import MetricsMiddleware, metrics, threadpool_stats
+from .core.security import password_hasher
+from .services.status_maintenance import StatusMaintenanceWorker
+from .services.currency_jobs import import_queue
+from .services.calendar import export_pool
 from .api import auth, pilots, events, currency, training, scheduler, calendar
 
 app = FastAPI(title="Squadron Scheduler API", version="1.0.0")
@@ -12,8 +20,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Per-route latency and SQL counts, served at /api/metrics
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine, "sync")
+    if async_engine is not None:
+        metrics.instrument_engine(async_engine.sync_engine, "async")
+    app.add_middleware(
+        MetricsMiddleware,
+        registry=metrics,
+        slow_request_ms=settings.SLOW_REQUEST_THRESHOLD_MS,
+        log_slow_sql=settings.SLOW_REQUEST_LOG_SQL,
+        max_logged_statements=settings.SLOW_REQUEST_MAX_STATEMENTS,
+    )
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(pilots.router)
@@ -23,6 +45,29 @@ app.include_router(training.router)
 app.include_router(scheduler.router)
 app.include_router(calendar.router)
 
+# Recomputes CMR/BMC status for pilot months dirtied by event changes
+status_worker = StatusMaintenanceWorker(SessionLocal, settings.STATUS_WORKER_INTERVAL_SECONDS)
+
+
+@app.on_event("startup")
+def start_background_workers():
+    # Import jobs and spooled uploads left behind by a previous process
+    db = SessionLocal()
+    try:
+        import_queue.recover(db)
+    finally:
+        db.close()
+    if settings.STATUS_WORKER_ENABLED:
+        status_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    status_worker.stop()
+    import_queue.shutdown(wait=False)
+    export_pool.shutdown()
+    password_hasher.shutdown()
+
 
 @app.get("/")
 def root():
@@ -32,3 +77,18 @@ def root():
 @app.get("/api/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/api/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus text exposition of this worker's request, SQL, pool and threadpool metrics"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(
+        metrics.render(threadpool_stats()),
+        media_type="text/plain; version=0.0.4"
+    )
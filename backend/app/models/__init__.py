@@ -3,9 +3,10 @@ from .pilot import Pilot
 from .aircraft import Aircraft
 from .simulator import Simulator
 from .event import Event, EventAssignment
-from .currency import CurrencyRecord
-from .training import TrainingRequirement, PilotStatus
+from .currency import CurrencyRecord, CurrencyRecordHistory, CurrencyImportJob
+from .training import TrainingRequirement, PilotStatus, PilotStatusDirty, PilotTrainingCounter
 from .schedule import ScheduleVersion
+from .calendar import CalendarFeedVersion
 
 __all__ = [
     "User",
@@ -15,7 +16,12 @@ __all__ = [
     "Event",
     "EventAssignment",
     "CurrencyRecord",
+    "CurrencyRecordHistory",
+    "CurrencyImportJob",
     "TrainingRequirement",
     "PilotStatus",
+    "PilotStatusDirty",
+    "PilotTrainingCounter",
     "ScheduleVersion",
+    "CalendarFeedVersion",
 ]
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from datetime import datetime
+from ..core.database import Base
+
+
+class CalendarFeedVersion(Base):
+    """Version counter per pilot calendar feed, bumped whenever its content may change"""
+    __tablename__ = "calendar_feed_versions"
+
+    pilot_id = Column(Integer, ForeignKey("pilots.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
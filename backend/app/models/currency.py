@@ -1,20 +1,105 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, JSON, DateTime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, JSON, DateTime, Text, Index, UniqueConstraint, case
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from ..core.database import Base
 
 
+# Days before expiration at which currency counts as "expiring"
+EXPIRING_WINDOW_DAYS = 30
+
+
+def currency_status(expiration_date, today: date = None) -> str:
+    """"expired", "expiring" or "current" for an expiration date as of today"""
+    today = today or date.today()
+    if expiration_date is None:
+        return "current"
+    if expiration_date < today:
+        return "expired"
+    if expiration_date <= today + timedelta(days=EXPIRING_WINDOW_DAYS):
+        return "expiring"
+    return "current"
+
+
 class CurrencyRecord(Base):
+    """Current currency per pilot and currency type; superseded values move to CurrencyRecordHistory"""
     __tablename__ = "currency_records"
+    __table_args__ = (
+        UniqueConstraint("pilot_id", "currency_type", name="uq_currency_record_pilot_type"),
+        Index("ix_currency_records_type_expiration", "currency_type", "expiration_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     pilot_id = Column(Integer, ForeignKey("pilots.id"), nullable=False)
     currency_type = Column(String, nullable=False)  # Type of currency requirement
     last_completed_date = Column(Date, nullable=True)
-    expiration_date = Column(Date, nullable=True)
-    status = Column(String, nullable=True)  # "current", "expiring", "expired"
+    expiration_date = Column(Date, nullable=True, index=True)
+    status = Column(String, nullable=True)  # As classified at import time; current_status is always up to date
     raw_data = Column(JSON, default=dict)  # Store original spreadsheet data
+    content_hash = Column(String(64), nullable=True)  # sha256 of raw_data, to skip unchanged re-imports
     imported_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     pilot = relationship("Pilot", back_populates="currency_records")
+
+    @hybrid_property
+    def current_status(self):
+        """Status derived from expiration_date as of today, in Python or SQL"""
+        return currency_status(self.expiration_date)
+
+    @current_status.expression
+    def current_status(cls):
+        today = date.today()
+        return case(
+            (cls.expiration_date < today, "expired"),
+            (cls.expiration_date <= today + timedelta(days=EXPIRING_WINDOW_DAYS), "expiring"),
+            else_="current"
+        )
+
+
+class CurrencyRecordHistory(Base):
+    """Dates a currency record held before an import changed them"""
+    __tablename__ = "currency_record_history"
+    __table_args__ = (
+        Index("ix_currency_record_history_pilot_type", "pilot_id", "currency_type"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    pilot_id = Column(Integer, ForeignKey("pilots.id"), nullable=False)
+    currency_type = Column(String, nullable=False)
+    last_completed_date = Column(Date, nullable=True)
+    expiration_date = Column(Date, nullable=True)
+    status = Column(String, nullable=True)
+    imported_at = Column(DateTime, nullable=True)  # When the superseded values were imported
+    superseded_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CurrencyImportJob(Base):
+    """A spreadsheet import run in the background, polled for progress"""
+    __tablename__ = "currency_import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    file_name = Column(String, nullable=True)
+    file_type = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # "queued", "running", "completed", "failed"
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    worker = Column(String, nullable=True)  # "host:pid" of the process that queued the job
+    spool_path = Column(String, nullable=True)  # Spooled upload on that host, deleted when the job ends
+    rows_processed = Column(Integer, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    unchanged = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+    rejected = Column(JSON, default=list)  # First CURRENCY_IMPORT_MAX_REJECTS rejects
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def duration_seconds(self):
+        if self.started_at is None:
+            return None
+        return ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
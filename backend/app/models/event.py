@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -20,6 +20,21 @@ class EventStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+# Event types flown in the simulator; every other type uses an aircraft
+SIMULATOR_EVENT_TYPES = frozenset({EventType.WST})
+FLIGHT_EVENT_TYPES = frozenset(t for t in EventType if t not in SIMULATOR_EVENT_TYPES)
+
+# Pilot requirement column each event type counts toward, and how many
+# sorties it credits (OB2/OB3 are multi-sortie T-38 events, Maddog is not credited)
+EVENT_REQUIREMENT_CREDITS = {
+    EventType.B2: ("b2_requirement", 1),
+    EventType.LOCAL: ("t38_requirement", 1),
+    EventType.OB2: ("t38_requirement", 2),
+    EventType.OB3: ("t38_requirement", 3),
+    EventType.WST: ("wst_requirement", 1),
+}
+
+
 class Event(Base):
     __tablename__ = "events"
 
@@ -27,7 +42,7 @@ class Event(Base):
     event_type = Column(Enum(EventType), nullable=False)
     title = Column(String, nullable=False)
     start_time = Column(DateTime, nullable=False, index=True)
-    end_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False, index=True)
     status = Column(Enum(EventStatus), default=EventStatus.SCHEDULED)
     aircraft_id = Column(Integer, ForeignKey("aircraft.id"), nullable=True)
     simulator_id = Column(Integer, ForeignKey("simulators.id"), nullable=True)
@@ -44,9 +59,13 @@ class Event(Base):
 
 class EventAssignment(Base):
     __tablename__ = "event_assignments"
+    __table_args__ = (
+        # Per-pilot lookups (availability, calendars, counters) join out to events
+        Index('ix_event_assignments_pilot_event', 'pilot_id', 'event_id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False, index=True)
     pilot_id = Column(Integer, ForeignKey("pilots.id"), nullable=False)
     position = Column(String, nullable=False)  # e.g., "pilot", "co-pilot", "instructor"
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Date, DateTime, Enum, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Date, DateTime, Enum, Boolean, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
 from ..core.database import Base
+from .event import EventType
 
 
 class QualificationStatus(str, enum.Enum):
@@ -40,3 +41,34 @@ class PilotStatus(Base):
     
     # Relationships
     pilot = relationship("Pilot", back_populates="pilot_statuses")
+
+
+class PilotStatusDirty(Base):
+    """Pilot months whose PilotStatus must be recomputed by the status worker"""
+    __tablename__ = "pilot_status_dirty"
+    __table_args__ = (
+        UniqueConstraint('pilot_id', 'evaluation_month', name='uq_pilot_status_dirty_month'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    pilot_id = Column(Integer, ForeignKey("pilots.id"), nullable=False)
+    evaluation_month = Column(Date, nullable=False)
+    version = Column(Integer, nullable=False, default=1)  # Bumped on every re-mark
+    marked_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PilotTrainingCounter(Base):
+    """Effective event count and hours per pilot, month and event type"""
+    __tablename__ = "pilot_training_counters"
+    __table_args__ = (
+        UniqueConstraint('pilot_id', 'month', 'event_type', name='uq_pilot_training_counter'),
+        Index('ix_pilot_training_counters_month_pilot', 'month', 'pilot_id'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    pilot_id = Column(Integer, ForeignKey("pilots.id"), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month
+    event_type = Column(Enum(EventType), nullable=False)
+    event_count = Column(Integer, nullable=False, default=0)
+    hours = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
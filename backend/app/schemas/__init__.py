@@ -1,10 +1,10 @@
 from .user import UserCreate, UserResponse, Token, Login
 from .pilot import PilotCreate, PilotUpdate, PilotResponse
-from .event import EventCreate, EventUpdate, EventResponse, EventAssignmentCreate, EventAssignmentResponse
+from .event import EventCreate, EventUpdate, EventResponse, EventAssignmentCreate, EventAssignmentResponse, EventAssignmentsReplace, EventBulkRequest, EventBulkResponse, EventConflict
 from .aircraft import AircraftCreate, AircraftResponse
 from .simulator import SimulatorCreate, SimulatorResponse
-from .currency import CurrencyRecordCreate, CurrencyRecordResponse
-from .training import TrainingRequirementCreate, TrainingRequirementResponse, PilotStatusResponse
+from .currency import CurrencyRecordCreate, CurrencyRecordResponse, ExpiringCurrencyResponse, CurrencyRecordHistoryResponse, CurrencyImportReject, CurrencyImportResult, CurrencyImportJobResponse
+from .training import TrainingRequirementCreate, TrainingRequirementResponse, PilotStatusResponse, PilotTrainingCounterResponse
 
 __all__ = [
     "UserCreate",
@@ -19,13 +19,23 @@ __all__ = [
     "EventResponse",
     "EventAssignmentCreate",
     "EventAssignmentResponse",
+    "EventAssignmentsReplace",
+    "EventBulkRequest",
+    "EventBulkResponse",
+    "EventConflict",
     "AircraftCreate",
     "AircraftResponse",
     "SimulatorCreate",
     "SimulatorResponse",
     "CurrencyRecordCreate",
     "CurrencyRecordResponse",
+    "ExpiringCurrencyResponse",
+    "CurrencyRecordHistoryResponse",
+    "CurrencyImportReject",
+    "CurrencyImportResult",
+    "CurrencyImportJobResponse",
     "TrainingRequirementCreate",
     "TrainingRequirementResponse",
     "PilotStatusResponse",
+    "PilotTrainingCounterResponse",
 ]
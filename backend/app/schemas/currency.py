@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import AliasChoices, BaseModel, Field
+from typing import Optional, Dict, Any, List
 from datetime import date, datetime
 
 
@@ -18,9 +18,77 @@ class CurrencyRecordResponse(BaseModel):
     currency_type: str
     last_completed_date: Optional[date]
     expiration_date: Optional[date]
-    status: Optional[str]
+    # Derived from expiration_date when read, not the value stored at import
+    status: Optional[str] = Field(validation_alias=AliasChoices("current_status", "status"))
     raw_data: Dict[str, Any]
     imported_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class ExpiringCurrencyResponse(BaseModel):
+    pilot_id: int
+    call_sign: Optional[str]
+    currency_type: str
+    last_completed_date: Optional[date]
+    expiration_date: date
+    status: str
+    days_remaining: int  # Negative once expired
+
+    class Config:
+        from_attributes = True
+
+
+class CurrencyRecordHistoryResponse(BaseModel):
+    id: int
+    pilot_id: int
+    currency_type: str
+    last_completed_date: Optional[date]
+    expiration_date: Optional[date]
+    status: Optional[str]
+    imported_at: Optional[datetime]
+    superseded_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CurrencyImportReject(BaseModel):
+    row: int  # Spreadsheet row number; the header is row 1
+    reason: str
+    data: Dict[str, Any] = {}
+
+
+class CurrencyImportResult(BaseModel):
+    rows_processed: int = 0
+    batches: int = 0
+    imported: int  # inserted + updated
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected_count: int = 0
+    rejected: List[CurrencyImportReject] = []  # Capped at CURRENCY_IMPORT_MAX_REJECTS
+
+
+class CurrencyImportJobResponse(BaseModel):
+    id: int
+    file_name: Optional[str]
+    file_type: str
+    status: str
+    rows_processed: int
+    batches: int
+    imported: int
+    inserted: int
+    updated: int
+    unchanged: int
+    rejected_count: int
+    rejected: List[CurrencyImportReject] = []
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    duration_seconds: Optional[float]
+
+    class Config:
+        from_attributes = True
@@ -58,3 +58,28 @@ class EventResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class EventAssignmentsReplace(BaseModel):
+    event_id: int
+    assignments: List[EventAssignmentCreate] = []  # The event's full crew; replaces what is there
+
+
+class EventBulkRequest(BaseModel):
+    create: List[EventCreate] = []
+    assignments: List[EventAssignmentsReplace] = []
+
+
+class EventBulkResponse(BaseModel):
+    created_ids: List[int]
+    updated_event_ids: List[int]
+
+
+class EventConflict(BaseModel):
+    kind: str  # "pilot", "aircraft" or "simulator"
+    resource_id: int
+    event_id: int
+    conflicting_event_id: int
+    conflicting_title: str
+    overlap_start: datetime
+    overlap_end: datetime
@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 from datetime import date, datetime
 from ..models.training import QualificationStatus
+from ..models.event import EventType
 
 
 class TrainingRequirementCreate(BaseModel):
@@ -28,7 +29,7 @@ class TrainingRequirementResponse(BaseModel):
 
 
 class PilotStatusResponse(BaseModel):
-    id: int
+    id: Optional[int]  # None for a month evaluated on read and not yet stored
     pilot_id: int
     qualification_status: QualificationStatus
     evaluation_month: date
@@ -38,3 +39,14 @@ class PilotStatusResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class PilotTrainingCounterResponse(BaseModel):
+    pilot_id: int
+    month: date
+    event_type: EventType
+    event_count: int
+    hours: float
+
+    class Config:
+        from_attributes = True
@@ -1,11 +1,177 @@
-from icalendar import Calendar, Event as ICalEvent
-from typing import List, Dict
+import hashlib
+import io
+import multiprocessing
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from icalendar import Calendar, Event as ICalEvent, vCalAddress
+from typing import Any, List, Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
+from ..core.config import settings
+from ..core.database import get_upsert_insert
+from ..models.calendar import CalendarFeedVersion
 from ..models.event import Event, EventAssignment
 from ..models.pilot import Pilot
 
 
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+
+
+def _calendar_header(name: str) -> str:
+    """VCALENDAR properties up to (not including) the first VEVENT"""
+    cal = Calendar()
+    cal.add('prodid', '-//Squadron Scheduler//Squadron Scheduler//EN')
+    cal.add('version', '2.0')
+    cal.add('X-WR-CALNAME', name)
+    cal.add('X-WR-TIMEZONE', 'UTC')
+    
+    content = cal.to_ical().decode('utf-8')
+    return content[:content.rindex(CALENDAR_FOOTER)]
+
+
+def _pilot_calendar_name(pilot: Pilot) -> str:
+    return f'Schedule - {pilot.call_sign or f"Pilot {pilot.id}"}'
+
+
+def _event_fields(event: Event, attendees: Optional[List[Tuple[str, str, str]]] = None) -> Dict[str, Any]:
+    """Plain, picklable values needed to render an event's VEVENT"""
+    return {
+        "id": event.id,
+        "title": event.title,
+        "start_time": event.start_time,
+        "end_time": event.end_time,
+        "event_type": event.event_type.value,
+        "notes": event.notes,
+        "location": f"{event.aircraft.tail_number if event.aircraft else ''}{event.simulator.simulator_id if event.simulator else ''}",
+        # Stamp with the event's own modification time so the feed is byte-stable
+        "dtstamp": event.updated_at or event.created_at or event.start_time,
+        "attendees": attendees or [],
+    }
+
+
+def render_event_fields(fields: Dict[str, Any]) -> str:
+    """One folded VEVENT block from _event_fields() output"""
+    ical_event = ICalEvent()
+    ical_event.add('summary', fields["title"])
+    ical_event.add('dtstart', fields["start_time"])
+    ical_event.add('dtend', fields["end_time"])
+    ical_event.add('description', f"Event Type: {fields['event_type']}\n{fields['notes'] or ''}")
+    ical_event.add('location', fields["location"])
+    ical_event.add('uid', f"event-{fields['id']}@squadron-scheduler")
+    ical_event.add('dtstamp', fields["dtstamp"])
+    for address, name, position in fields["attendees"]:
+        attendee = vCalAddress(address)
+        attendee.params['cn'] = name
+        attendee.params['role'] = 'REQ-PARTICIPANT'
+        attendee.params['X-POSITION'] = position
+        ical_event.add('attendee', attendee, encode=0)
+    return ical_event.to_ical().decode('utf-8')
+
+
+def render_vevent(event: Event) -> str:
+    """One folded VEVENT block for an event"""
+    return render_event_fields(_event_fields(event))
+
+
+def _render_batch(batch: List[Dict[str, Any]]) -> str:
+    # Module level so process pool workers can unpickle it
+    return "".join(render_event_fields(fields) for fields in batch)
+
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _render_stream(
+    fields: Iterable[Dict[str, Any]],
+    chunk_events: int,
+    executor: Optional[Executor] = None,
+    max_in_flight: int = 8
+) -> Iterator[str]:
+    """
+    Render event fields into VEVENT text chunks, in order. With an executor,
+    batches render in parallel with at most max_in_flight pending so memory
+    stays bounded.
+    """
+    if executor is None:
+        for batch in _batches(fields, chunk_events):
+            yield _render_batch(batch)
+        return
+    
+    pending = deque()
+    for batch in _batches(fields, chunk_events):
+        pending.append(executor.submit(_render_batch, batch))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _stream_calendar(
+    header: str,
+    fields: Iterable[Dict[str, Any]],
+    chunk_events: int,
+    executor: Optional[Executor] = None
+) -> Iterator[str]:
+    yield header
+    yield from _render_stream(fields, chunk_events, executor)
+    yield CALENDAR_FOOTER
+
+
+def _filter_range(query, start_date: datetime = None, end_date: datetime = None):
+    if start_date:
+        query = query.filter(Event.start_time >= start_date)
+    if end_date:
+        query = query.filter(Event.start_time <= end_date)
+    return query
+
+
+def _pilot_events_query(db: Session, pilot_id: int, start_date: datetime = None, end_date: datetime = None):
+    query = (
+        db.query(Event)
+        .join(EventAssignment)
+        .filter(EventAssignment.pilot_id == pilot_id)
+    )
+    
+    return (
+        _filter_range(query, start_date, end_date)
+        .options(joinedload(Event.aircraft), joinedload(Event.simulator))
+        .order_by(Event.start_time, Event.id)
+    )
+
+
+def iter_ics_for_pilot(
+    db: Session,
+    pilot_id: int,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    chunk_events: int = 100
+) -> Iterator[str]:
+    """
+    Stream a pilot's ICS calendar as text chunks of up to chunk_events
+    VEVENTs. Events come from a server-side cursor (yield_per) with aircraft
+    and simulator joined in, so memory stays flat however long the range.
+    Raises ValueError up front if the pilot does not exist.
+    """
+    pilot = db.query(Pilot).filter(Pilot.id == pilot_id).first()
+    if not pilot:
+        raise ValueError(f"Pilot {pilot_id} not found")
+    
+    events = _pilot_events_query(db, pilot_id, start_date, end_date).yield_per(chunk_events)
+    fields = (_event_fields(event) for event in events)
+    return _stream_calendar(_calendar_header(_pilot_calendar_name(pilot)), fields, chunk_events)
+
+
 def generate_ics_for_pilot(
     db: Session,
     pilot_id: int,
@@ -15,46 +181,89 @@ def generate_ics_for_pilot(
     """
     Generate ICS calendar file for a specific pilot
     """
-    # Get pilot
-    pilot = db.query(Pilot).filter(Pilot.id == pilot_id).first()
-    if not pilot:
-        raise ValueError(f"Pilot {pilot_id} not found")
+    return "".join(iter_ics_for_pilot(db, pilot_id, start_date, end_date))
+
+
+def iter_pilot_feeds(
+    db: Session,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    chunk_events: int = 100,
+    executor: Optional[Executor] = None
+) -> Iterator[Tuple[Pilot, Iterator[str]]]:
+    """
+    Yield (pilot, ICS chunk iterator) for every active pilot from a single
+    event/assignment query ordered by pilot. Each pilot's chunks must be
+    consumed before advancing to the next pilot.
+    """
+    pilots = db.query(Pilot).filter(Pilot.is_active == True).order_by(Pilot.id).all()
     
-    # Get events for this pilot
     query = (
-        db.query(Event)
-        .join(EventAssignment)
-        .filter(EventAssignment.pilot_id == pilot_id)
+        db.query(EventAssignment.pilot_id, Event)
+        .join(Event, Event.id == EventAssignment.event_id)
+        .join(Pilot, Pilot.id == EventAssignment.pilot_id)
+        .filter(Pilot.is_active == True)
     )
+    rows = iter(
+        _filter_range(query, start_date, end_date)
+        .options(joinedload(Event.aircraft), joinedload(Event.simulator))
+        .order_by(EventAssignment.pilot_id, Event.start_time, Event.id)
+        .yield_per(chunk_events)
+    )
+    current = [next(rows, None)]
     
-    if start_date:
-        query = query.filter(Event.start_time >= start_date)
-    if end_date:
-        query = query.filter(Event.start_time <= end_date)
-    
-    events = query.order_by(Event.start_time).all()
+    def pilot_fields(pilot_id: int) -> Iterator[Dict[str, Any]]:
+        while current[0] is not None and current[0][0] < pilot_id:
+            current[0] = next(rows, None)
+        while current[0] is not None and current[0][0] == pilot_id:
+            yield _event_fields(current[0][1])
+            current[0] = next(rows, None)
     
-    # Create calendar
-    cal = Calendar()
-    cal.add('prodid', '-//Squadron Scheduler//Squadron Scheduler//EN')
-    cal.add('version', '2.0')
-    cal.add('X-WR-CALNAME', f'Schedule - {pilot.call_sign or f"Pilot {pilot_id}"}')
-    cal.add('X-WR-TIMEZONE', 'UTC')
+    for pilot in pilots:
+        header = _calendar_header(_pilot_calendar_name(pilot))
+        yield pilot, _stream_calendar(header, pilot_fields(pilot.id), chunk_events, executor)
+
+
+def iter_squadron_ics(
+    db: Session,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    chunk_events: int = 100,
+    executor: Optional[Executor] = None
+) -> Iterator[str]:
+    """
+    Stream one merged squadron calendar. Every event appears once with an
+    ATTENDEE line per assigned pilot.
+    """
+    pilots = {
+        pilot.id: pilot
+        for pilot in db.query(Pilot).options(joinedload(Pilot.user)).all()
+    }
     
-    # Add events
-    for event in events:
-        ical_event = ICalEvent()
-        ical_event.add('summary', event.title)
-        ical_event.add('dtstart', event.start_time)
-        ical_event.add('dtend', event.end_time)
-        ical_event.add('description', f"Event Type: {event.event_type.value}\n{event.notes or ''}")
-        ical_event.add('location', f"{event.aircraft.tail_number if event.aircraft else ''}{event.simulator.simulator_id if event.simulator else ''}")
-        ical_event.add('uid', f"event-{event.id}@squadron-scheduler")
-        ical_event.add('dtstamp', datetime.utcnow())
-        
-        cal.add_component(ical_event)
+    def attendees(event: Event) -> List[Tuple[str, str, str]]:
+        result = []
+        for assignment in event.assignments:
+            pilot = pilots.get(assignment.pilot_id)
+            call_sign = (pilot.call_sign if pilot else None) or f"Pilot {assignment.pilot_id}"
+            if pilot is not None and pilot.user is not None and pilot.user.email:
+                address = f"mailto:{pilot.user.email}"
+            else:
+                address = f"urn:squadron-scheduler:pilot:{assignment.pilot_id}"
+            result.append((address, call_sign, assignment.position))
+        return result
     
-    return cal.to_ical().decode('utf-8')
+    events = (
+        _filter_range(db.query(Event), start_date, end_date)
+        .options(
+            joinedload(Event.aircraft),
+            joinedload(Event.simulator),
+            selectinload(Event.assignments)
+        )
+        .order_by(Event.start_time, Event.id)
+        .yield_per(chunk_events)
+    )
+    fields = (_event_fields(event, attendees(event)) for event in events)
+    return _stream_calendar(_calendar_header("Squadron Schedule"), fields, chunk_events, executor)
 
 
 def generate_ics_for_all_pilots(
@@ -66,15 +275,207 @@ def generate_ics_for_all_pilots(
     Generate ICS files for all pilots
     Returns dictionary mapping pilot_id to ICS content
     """
-    pilots = db.query(Pilot).filter(Pilot.is_active == True).all()
-    ics_files = {}
-    
-    for pilot in pilots:
+    return {
+        pilot.id: "".join(chunks)
+        for pilot, chunks in iter_pilot_feeds(db, start_date, end_date)
+    }
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self._chunks = self._chunks, []
+        yield from chunks
+
+
+def stream_zip(entries: Iterable[Tuple[str, Iterable[str]]]) -> Iterator[bytes]:
+    """
+    Write (filename, text chunks) entries into a zip archive on the fly,
+    yielding archive bytes as they are produced
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in entries:
+            with archive.open(name, mode="w") as member:
+                for chunk in chunks:
+                    member.write(chunk.encode("utf-8"))
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def bump_feed_versions(db: Session, pilot_ids: Iterable[int]) -> None:
+    """
+    Bump the calendar feed version of each pilot so cached feeds and ETags
+    are invalidated. Does not commit, so the bump lands with the change.
+    """
+    pilot_ids = sorted(set(pilot_ids))
+    if not pilot_ids:
+        return
+
+    now = datetime.utcnow()
+    rows = [{"pilot_id": pilot_id, "version": 1, "updated_at": now} for pilot_id in pilot_ids]
+
+    insert = get_upsert_insert(db)
+    if insert is None:
+        for row in rows:
+            feed_version = db.get(CalendarFeedVersion, row["pilot_id"])
+            if not feed_version:
+                db.add(CalendarFeedVersion(**row))
+            else:
+                feed_version.version += 1
+                feed_version.updated_at = now
+        return
+
+    stmt = insert(CalendarFeedVersion.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["pilot_id"],
+        set_={
+            "version": CalendarFeedVersion.__table__.c.version + 1,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    db.execute(stmt)
+
+
+def bump_event_feeds(db: Session, event: Event, extra_pilot_ids: Iterable[int] = ()) -> None:
+    """Bump the feeds of every pilot assigned to an event, plus any extras"""
+    bump_feed_versions(db, {a.pilot_id for a in event.assignments} | set(extra_pilot_ids))
+
+
+def get_feed_version(db: Session, pilot_id: int) -> Tuple[int, Optional[datetime]]:
+    """Current (version, last modified) of a pilot's feed; (0, None) if never bumped"""
+    row = (
+        db.query(CalendarFeedVersion.version, CalendarFeedVersion.updated_at)
+        .filter(CalendarFeedVersion.pilot_id == pilot_id)
+        .first()
+    )
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def feed_etag(pilot_id: int, version: int, start_date: datetime = None, end_date: datetime = None) -> str:
+    """Strong ETag for a pilot feed at a version over a date range"""
+    key = f"{pilot_id}:{version}:{start_date.isoformat() if start_date else ''}:{end_date.isoformat() if end_date else ''}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+class FeedCache:
+    """Thread-safe LRU of rendered feeds keyed by (pilot, range) and tagged with a version"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, version: int, content: str) -> None:
+        with self._lock:
+            self._entries[key] = (version, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+feed_cache = FeedCache(settings.CALENDAR_FEED_CACHE_SIZE)
+
+
+class ExportRenderPool:
+    """
+    One process pool shared by parallel squadron exports, started on first
+    use. Workers are spawned, not forked, since forking a threaded server
+    can leave locks held in the child. At most `max_exports` exports use
+    the pool at once; others render in their own thread.
+    """
+
+    def __init__(self, workers: int, max_exports: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_exports)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Optional[Executor]]:
+        """The shared pool for the block, or None when max_exports already hold it"""
+        if not self._slots.acquire(blocking=False):
+            yield None
+            return
         try:
-            ics_content = generate_ics_for_pilot(db, pilot.id, start_date, end_date)
-            ics_files[pilot.id] = ics_content
-        except Exception as e:
-            print(f"Error generating ICS for pilot {pilot.id}: {e}")
-            continue
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                executor = self._executor
+            yield executor
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+export_pool = ExportRenderPool(settings.CALENDAR_EXPORT_WORKERS, settings.CALENDAR_EXPORT_MAX_PARALLEL)
+
+
+def stream_pilot_feed(
+    db: Session,
+    pilot_id: int,
+    version: int,
+    start_date: datetime = None,
+    end_date: datetime = None
+) -> Iterator[str]:
+    """
+    ICS feed for a pilot as a chunk iterator. Served from the cache when
+    this version was already rendered; otherwise streamed from the database
+    and cached afterwards if it fits in CALENDAR_FEED_CACHE_MAX_BYTES.
+    Raises ValueError up front if the pilot does not exist.
+    """
+    key = (pilot_id, start_date, end_date)
+    content = feed_cache.get(key, version)
+    if content is not None:
+        return iter([content])
+    
+    chunks = iter_ics_for_pilot(db, pilot_id, start_date, end_date)
+    
+    def tee() -> Iterator[str]:
+        kept: Optional[List[str]] = []
+        size = 0
+        for chunk in chunks:
+            if kept is not None:
+                size += len(chunk)
+                if size > settings.CALENDAR_FEED_CACHE_MAX_BYTES:
+                    kept = None
+                else:
+                    kept.append(chunk)
+            yield chunk
+        if kept is not None:
+            feed_cache.put(key, version, "".join(kept))
     
-    return ics_files
+    return tee()
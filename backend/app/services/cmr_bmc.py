@@ -1,134 +1,280 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from sqlalchemy.orm import Session
 from datetime import date, datetime, timedelta
-from ..models.training import TrainingRequirement, PilotStatus, QualificationStatus
+from ..core.database import get_upsert_insert
+from ..core.query_budget import query_budget
+from ..models.training import TrainingRequirement, PilotStatus, PilotTrainingCounter, QualificationStatus
 from ..models.pilot import Pilot
-from ..models.event import Event, EventAssignment, EventType, EventStatus
+from ..models.event import FLIGHT_EVENT_TYPES, SIMULATOR_EVENT_TYPES
+from .training_counters import add_months
 
 
-def evaluate_pilot_status(
-    db: Session,
-    pilot_id: int,
-    evaluation_month: date
-) -> PilotStatus:
-    """
-    Evaluate a pilot's CMR/BMC status for a given month
-    """
-    pilot = db.query(Pilot).filter(Pilot.id == pilot_id).first()
-    if not pilot:
-        raise ValueError(f"Pilot {pilot_id} not found")
-    
-    # Get all active training requirements
-    requirements = db.query(TrainingRequirement).filter(
-        TrainingRequirement.is_active == True
-    ).all()
-    
-    # Calculate month start and end
+def get_month_bounds(evaluation_month: date) -> Tuple[date, date]:
+    """First and last day of the month containing evaluation_month"""
     month_start = date(evaluation_month.year, evaluation_month.month, 1)
     if evaluation_month.month == 12:
         month_end = date(evaluation_month.year + 1, 1, 1) - timedelta(days=1)
     else:
         month_end = date(evaluation_month.year, evaluation_month.month + 1, 1) - timedelta(days=1)
-    
-    # Get events for this pilot in the evaluation month
-    events = db.query(Event).join(EventAssignment).filter(
-        EventAssignment.pilot_id == pilot_id,
-        Event.start_time >= datetime.combine(month_start, datetime.min.time()),
-        Event.start_time <= datetime.combine(month_end, datetime.max.time()),
-        Event.status == EventStatus.EFFECTIVE
-    ).all()
-    
-    # Count events by type
-    flight_count = sum(1 for e in events if e.event_type == EventType.FLIGHT)
-    sim_count = sum(1 for e in events if e.event_type == EventType.SIMULATOR)
-    
-    # Evaluate each requirement
+    return month_start, month_end
+
+
+# Trailing windows, in months before the evaluation month, that each
+# requirement type looks at (the evaluation month itself is always included)
+QUARTER_LOOKBACK_MONTHS = 3
+ANNUAL_LOOKBACK_MONTHS = 11
+
+WINDOWS = {
+    "month": 0,
+    "quarter": QUARTER_LOOKBACK_MONTHS,
+    "annual": ANNUAL_LOOKBACK_MONTHS,
+}
+
+
+def count_effective_events(
+    db: Session,
+    pilot_ids: List[int],
+    evaluation_month: date
+) -> Dict[int, Dict[str, Dict[str, int]]]:
+    """
+    Count effective events per pilot for the evaluation month, the trailing
+    quarter and the trailing year from the monthly training counters.
+
+    One indexed lookup of at most twelve counter months per pilot; returns
+    {pilot_id: {"month" | "quarter" | "annual": {"flight": n, "simulator": n}}}
+    """
+    month_start, _ = get_month_bounds(evaluation_month)
+
+    counts = {
+        pilot_id: {window: {"flight": 0, "simulator": 0} for window in WINDOWS}
+        for pilot_id in pilot_ids
+    }
+    if not pilot_ids:
+        return counts
+
+    rows = (
+        db.query(
+            PilotTrainingCounter.pilot_id,
+            PilotTrainingCounter.month,
+            PilotTrainingCounter.event_type,
+            PilotTrainingCounter.event_count
+        )
+        .filter(
+            PilotTrainingCounter.pilot_id.in_(pilot_ids),
+            PilotTrainingCounter.month >= add_months(month_start, -ANNUAL_LOOKBACK_MONTHS),
+            PilotTrainingCounter.month <= month_start
+        )
+        .all()
+    )
+
+    window_starts = {window: add_months(month_start, -lookback) for window, lookback in WINDOWS.items()}
+    for pilot_id, month, event_type, event_count in rows:
+        if event_type in SIMULATOR_EVENT_TYPES:
+            category = "simulator"
+        elif event_type in FLIGHT_EVENT_TYPES:
+            category = "flight"
+        else:
+            continue
+        for window, window_start in window_starts.items():
+            if month >= window_start:
+                counts[pilot_id][window][category] += event_count
+
+    return counts
+
+
+def _count_for(requirement: TrainingRequirement, counts: Dict[str, int]) -> int:
+    if requirement.event_type == "flight":
+        return counts["flight"]
+    elif requirement.event_type == "simulator":
+        return counts["simulator"]
+    elif requirement.event_type == "both":
+        return counts["flight"] + counts["simulator"]
+    return 0
+
+
+def evaluate_requirements(
+    requirements: List[TrainingRequirement],
+    counts: Dict[str, Dict[str, int]]
+) -> Tuple[QualificationStatus, Dict[str, bool], List[str]]:
+    """
+    Evaluate requirements against a pilot's event counts
+    Returns (qualification_status, requirements_met, deficiencies)
+    """
     requirements_met = {}
     deficiencies = []
-    
+
     for requirement in requirements:
         met = False
-        
+
         if requirement.requirement_type == "monthly":
             # Check if requirement is met this month
-            if requirement.event_type == "flight":
-                met = flight_count >= requirement.required_count
-            elif requirement.event_type == "simulator":
-                met = sim_count >= requirement.required_count
-            elif requirement.event_type == "both":
-                met = (flight_count + sim_count) >= requirement.required_count
+            met = _count_for(requirement, counts["month"]) >= requirement.required_count
         elif requirement.requirement_type == "quarterly":
-            # Check last 3 months
-            quarter_start = month_start - timedelta(days=90)
-            quarter_events = db.query(Event).join(EventAssignment).filter(
-                EventAssignment.pilot_id == pilot_id,
-                Event.start_time >= datetime.combine(quarter_start, datetime.min.time()),
-                Event.start_time <= datetime.combine(month_end, datetime.max.time()),
-                Event.status == EventStatus.EFFECTIVE
-            ).all()
-            
-            quarter_flight_count = sum(1 for e in quarter_events if e.event_type == EventType.FLIGHT)
-            quarter_sim_count = sum(1 for e in quarter_events if e.event_type == EventType.SIMULATOR)
-            
-            if requirement.event_type == "flight":
-                met = quarter_flight_count >= requirement.required_count
-            elif requirement.event_type == "simulator":
-                met = quarter_sim_count >= requirement.required_count
-            elif requirement.event_type == "both":
-                met = (quarter_flight_count + quarter_sim_count) >= requirement.required_count
-        
+            # Check the month and the 3 before it
+            met = _count_for(requirement, counts["quarter"]) >= requirement.required_count
+        elif requirement.requirement_type == "annual":
+            # Check the month and the 11 before it
+            met = _count_for(requirement, counts["annual"]) >= requirement.required_count
+
         requirements_met[requirement.requirement_name] = met
-        
+
         if not met:
             deficiencies.append(requirement.requirement_name)
-    
+
     # Determine qualification status
     # CMR requires all requirements met
     # BMC requires core requirements met (can be configured)
     qualification_status = QualificationStatus.NOT_QUALIFIED
-    
+
     if all(requirements_met.values()):
         qualification_status = QualificationStatus.CMR
     elif len(deficiencies) <= 1:  # Allow one deficiency for BMC (configurable)
         qualification_status = QualificationStatus.BMC
-    
-    # Get or create pilot status
-    pilot_status = db.query(PilotStatus).filter(
-        PilotStatus.pilot_id == pilot_id,
-        PilotStatus.evaluation_month == month_start
-    ).first()
-    
-    if not pilot_status:
-        pilot_status = PilotStatus(
-            pilot_id=pilot_id,
-            qualification_status=qualification_status,
-            evaluation_month=month_start,
-            requirements_met=requirements_met,
-            deficiencies=deficiencies
+
+    return qualification_status, requirements_met, deficiencies
+
+
+def upsert_pilot_statuses(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Write PilotStatus rows with one INSERT ... ON CONFLICT against
+    uq_pilot_evaluation_month. Does not commit.
+    """
+    if not rows:
+        return
+
+    insert = get_upsert_insert(db)
+    if insert is None:
+        # No portable upsert; fall back to get-or-create per row
+        for row in rows:
+            pilot_status = db.query(PilotStatus).filter(
+                PilotStatus.pilot_id == row["pilot_id"],
+                PilotStatus.evaluation_month == row["evaluation_month"]
+            ).first()
+            if not pilot_status:
+                db.add(PilotStatus(**row))
+            else:
+                for field, value in row.items():
+                    setattr(pilot_status, field, value)
+        return
+
+    stmt = insert(PilotStatus.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["pilot_id", "evaluation_month"],
+        set_={
+            "qualification_status": stmt.excluded.qualification_status,
+            "requirements_met": stmt.excluded.requirements_met,
+            "deficiencies": stmt.excluded.deficiencies,
+            "last_updated": stmt.excluded.last_updated,
+        }
+    )
+    db.execute(stmt)
+
+
+def _status_rows(
+    db: Session,
+    pilot_ids: List[int],
+    evaluation_month: date,
+    requirements: List[TrainingRequirement] = None
+) -> List[Dict[str, Any]]:
+    """PilotStatus column values for each pilot, in two queries and without writing"""
+    month_start, _ = get_month_bounds(evaluation_month)
+
+    if requirements is None:
+        # Get all active training requirements
+        requirements = db.query(TrainingRequirement).filter(
+            TrainingRequirement.is_active == True
+        ).all()
+
+    counts = count_effective_events(db, pilot_ids, evaluation_month)
+    now = datetime.utcnow()
+    rows = []
+    for pilot_id in pilot_ids:
+        qualification_status, requirements_met, deficiencies = evaluate_requirements(
+            requirements, counts[pilot_id]
         )
-        db.add(pilot_status)
-    else:
-        pilot_status.qualification_status = qualification_status
-        pilot_status.requirements_met = requirements_met
-        pilot_status.deficiencies = deficiencies
-        pilot_status.last_updated = datetime.utcnow()
-    
+        rows.append({
+            "pilot_id": pilot_id,
+            "qualification_status": qualification_status,
+            "evaluation_month": month_start,
+            "requirements_met": requirements_met,
+            "deficiencies": deficiencies,
+            "last_updated": now,
+        })
+    return rows
+
+
+@query_budget(3)
+def evaluate_pilots(
+    db: Session,
+    pilot_ids: List[int],
+    evaluation_month: date,
+    requirements: List[TrainingRequirement] = None
+) -> None:
+    """
+    Evaluate and upsert CMR/BMC status for a set of pilots in a fixed
+    number of queries. Does not commit.
+    """
+    upsert_pilot_statuses(db, _status_rows(db, pilot_ids, evaluation_month, requirements))
+
+
+@query_budget(2)
+def preview_pilot_status(db: Session, pilot_id: int, evaluation_month: date) -> PilotStatus:
+    """
+    A pilot's CMR/BMC status for a month, evaluated but not saved, for
+    reads of a month that has no stored status yet. The result has no id
+    and is not added to the session.
+    """
+    return PilotStatus(**_status_rows(db, [pilot_id], evaluation_month)[0])
+
+
+def evaluate_pilot_status(
+    db: Session,
+    pilot_id: int,
+    evaluation_month: date
+) -> PilotStatus:
+    """
+    Evaluate a pilot's CMR/BMC status for a given month
+    """
+    pilot = db.query(Pilot).filter(Pilot.id == pilot_id).first()
+    if not pilot:
+        raise ValueError(f"Pilot {pilot_id} not found")
+
+    month_start, _ = get_month_bounds(evaluation_month)
+    evaluate_pilots(db, [pilot_id], month_start)
     db.commit()
-    db.refresh(pilot_status)
-    return pilot_status
+
+    return db.query(PilotStatus).filter(
+        PilotStatus.pilot_id == pilot_id,
+        PilotStatus.evaluation_month == month_start
+    ).populate_existing().first()
 
 
+@query_budget(5)
 def evaluate_all_pilots(db: Session, evaluation_month: date) -> List[PilotStatus]:
-    """Evaluate status for all active pilots"""
-    pilots = db.query(Pilot).filter(Pilot.is_active == True).all()
-    statuses = []
-    
-    for pilot in pilots:
-        try:
-            status = evaluate_pilot_status(db, pilot.id, evaluation_month)
-            statuses.append(status)
-        except Exception as e:
-            print(f"Error evaluating pilot {pilot.id}: {e}")
-            continue
-    
-    return statuses
+    """
+    Evaluate status for all active pilots
+
+    Requirements are loaded once, event counts come from one lookup of the
+    monthly training counters and all PilotStatus rows are written with one upsert and a single commit.
+    """
+    month_start, _ = get_month_bounds(evaluation_month)
+    pilot_ids = [
+        pilot_id for (pilot_id,) in
+        db.query(Pilot.id).filter(Pilot.is_active == True).order_by(Pilot.id).all()
+    ]
+    if not pilot_ids:
+        return []
+
+    evaluate_pilots(db, pilot_ids, month_start)
+    db.commit()
+
+    return (
+        db.query(PilotStatus)
+        .filter(
+            PilotStatus.pilot_id.in_(pilot_ids),
+            PilotStatus.evaluation_month == month_start
+        )
+        .order_by(PilotStatus.pilot_id)
+        .populate_existing()
+        .all()
+    )
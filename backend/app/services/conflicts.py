@@ -0,0 +1,174 @@
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import and_, literal, select, text, union_all
+from sqlalchemy.orm import Session, aliased
+from datetime import datetime
+from ..core.query_budget import query_budget
+from ..models.event import Event, EventAssignment, EventStatus
+
+
+class EventConflictError(ValueError):
+    """A write would double-book pilots, aircraft or simulators"""
+
+    def __init__(self, conflicts: List[Dict[str, Any]]):
+        super().__init__(f"{len(conflicts)} scheduling conflict(s)")
+        self.conflicts = conflicts
+
+
+def _conflicts_statement(
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    event_ids: Optional[List[int]]
+):
+    """
+    One UNION ALL of three overlap self-joins (pilot, aircraft, simulator).
+    Each side is narrowed by the indexed start/end columns before joining,
+    and cancelled events never conflict.
+    """
+    e1 = aliased(Event, name="e1")
+    e2 = aliased(Event, name="e2")
+
+    def scoped(stmt):
+        stmt = stmt.where(
+            e1.id != e2.id,
+            e1.start_time < e2.end_time,
+            e2.start_time < e1.end_time,
+            e1.status != EventStatus.CANCELLED,
+            e2.status != EventStatus.CANCELLED
+        )
+        if event_ids is not None:
+            stmt = stmt.where(e1.id.in_(event_ids))
+        else:
+            # Each pair once
+            stmt = stmt.where(e1.id < e2.id)
+        for event in (e1, e2):
+            if start_date:
+                stmt = stmt.where(event.end_time > start_date)
+            if end_date:
+                stmt = stmt.where(event.start_time < end_date)
+        return stmt
+
+    columns = [
+        e1.id.label("event_id"), e1.start_time.label("start_time"), e1.end_time.label("end_time"),
+        e2.id.label("conflicting_event_id"), e2.title.label("conflicting_title"),
+        e2.start_time.label("conflicting_start_time"), e2.end_time.label("conflicting_end_time"),
+    ]
+
+    a1 = aliased(EventAssignment, name="a1")
+    a2 = aliased(EventAssignment, name="a2")
+    pilots = scoped(
+        select(literal("pilot").label("kind"), a1.pilot_id.label("resource_id"), *columns)
+        .select_from(a1)
+        .join(e1, e1.id == a1.event_id)
+        .join(a2, and_(a2.pilot_id == a1.pilot_id, a2.event_id != a1.event_id))
+        .join(e2, e2.id == a2.event_id)
+    )
+    aircraft = scoped(
+        select(literal("aircraft").label("kind"), e1.aircraft_id.label("resource_id"), *columns)
+        .select_from(e1)
+        .join(e2, e2.aircraft_id == e1.aircraft_id)
+    )
+    simulators = scoped(
+        select(literal("simulator").label("kind"), e1.simulator_id.label("resource_id"), *columns)
+        .select_from(e1)
+        .join(e2, e2.simulator_id == e1.simulator_id)
+    )
+    return union_all(pilots, aircraft, simulators)
+
+
+@query_budget(1)
+def find_conflicts(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    event_ids: Optional[Iterable[int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Double-bookings in one query, either among all events overlapping a
+    date range or involving the given events (each pair reported once).
+    Sees unflushed writes only after a flush.
+
+    Returns [{"kind", "resource_id", "event_id", "conflicting_event_id",
+    "conflicting_title", "overlap_start", "overlap_end"}] ordered by time.
+    """
+    if event_ids is not None:
+        event_ids = sorted(set(event_ids))
+        if not event_ids:
+            return []
+
+    conflicts = []
+    seen = set()
+    for row in db.execute(_conflicts_statement(start_date, end_date, event_ids)):
+        key = (row.kind, row.resource_id, frozenset((row.event_id, row.conflicting_event_id)))
+        if key in seen:
+            continue
+        seen.add(key)
+        conflicts.append({
+            "kind": row.kind,
+            "resource_id": row.resource_id,
+            "event_id": row.event_id,
+            "conflicting_event_id": row.conflicting_event_id,
+            "conflicting_title": row.conflicting_title,
+            "overlap_start": max(row.start_time, row.conflicting_start_time),
+            "overlap_end": min(row.end_time, row.conflicting_end_time),
+        })
+
+    conflicts.sort(key=lambda c: (c["overlap_start"], c["kind"], c["resource_id"], c["event_id"]))
+    return conflicts
+
+
+# pg_advisory_xact_lock(kind, resource_id) namespaces, one per bookable resource
+RESOURCE_LOCK_KINDS = {"pilot": 7301, "aircraft": 7302, "simulator": 7303}
+
+
+def _resources_statement(event_ids: List[int]):
+    """(kind, resource_id) of everything the events book"""
+    return union_all(
+        select(literal("pilot").label("kind"), EventAssignment.pilot_id.label("resource_id"))
+        .where(EventAssignment.event_id.in_(event_ids)),
+        select(literal("aircraft"), Event.aircraft_id)
+        .where(Event.id.in_(event_ids), Event.aircraft_id.isnot(None)),
+        select(literal("simulator"), Event.simulator_id)
+        .where(Event.id.in_(event_ids), Event.simulator_id.isnot(None)),
+    )
+
+
+def lock_resources(db: Session, event_ids: List[int]) -> None:
+    """
+    Take a transaction-scoped advisory lock on every pilot, aircraft and
+    simulator the events book, in (kind, id) order so two writers cannot
+    deadlock. Call after the flush; the locks are released at commit or
+    rollback.
+    """
+    keys = sorted({
+        (RESOURCE_LOCK_KINDS[row.kind], row.resource_id)
+        for row in db.execute(_resources_statement(event_ids))
+    })
+    if not keys:
+        return
+    db.execute(
+        text(
+            "SELECT pg_advisory_xact_lock(kind, resource_id) "
+            "FROM unnest(CAST(:kinds AS integer[]), CAST(:resource_ids AS integer[])) AS keys(kind, resource_id)"
+        ),
+        {"kinds": [kind for kind, _ in keys], "resource_ids": [resource_id for _, resource_id in keys]}
+    )
+
+
+def check_conflicts(db: Session, event_ids: Iterable[int]) -> None:
+    """
+    Flush, then raise EventConflictError if any of the events is double-booked.
+
+    On PostgreSQL the booked resources are locked first, so a concurrent
+    write booking the same pilot, aircraft or simulator waits for this
+    transaction to end and its check (a new READ COMMITTED statement) then
+    sees the committed booking. Other databases, SQLite included, only run
+    the check, without that guarantee: two concurrent writes can both pass
+    it and commit.
+    """
+    db.flush()
+    event_ids = sorted(set(event_ids))
+    if db.get_bind().dialect.name == "postgresql" and event_ids:
+        lock_resources(db, event_ids)
+    conflicts = find_conflicts(db, event_ids=event_ids)
+    if conflicts:
+        raise EventConflictError(conflicts)
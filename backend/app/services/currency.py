@@ -1,59 +1,307 @@
+import hashlib
+import json
+import numpy as np
+import openpyxl
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Iterator, Optional, Callable
+from sqlalchemy import insert, update
 from sqlalchemy.orm import Session
 from datetime import datetime, date
-from ..models.currency import CurrencyRecord
+from ..core.database import get_upsert_insert
+from ..models.currency import CurrencyRecord, CurrencyRecordHistory, EXPIRING_WINDOW_DAYS
 from ..models.pilot import Pilot
 
 
-def parse_excel_file(file_path: str) -> pd.DataFrame:
-    """Parse Excel file and return DataFrame"""
-    try:
-        df = pd.read_excel(file_path)
-        return df
-    except Exception as e:
-        raise ValueError(f"Error parsing Excel file: {str(e)}")
+# Our fields -> spreadsheet columns used when the caller doesn't supply a mapping
+DEFAULT_COLUMN_MAPPING = {
+    'call_sign': 'call_sign',
+    'currency_type': 'currency_type',
+    'last_completed_date': 'last_completed_date',
+    'expiration_date': 'expiration_date'
+}
 
+# Identifier columns tried, in order, when mapping a row to a pilot
+PILOT_IDENTIFIER_FIELDS = ['call_sign', 'name', 'pilot_name', 'pilot_id', 'id']
 
-def parse_csv_file(file_path: str) -> pd.DataFrame:
-    """Parse CSV file and return DataFrame"""
-    try:
-        df = pd.read_csv(file_path)
-        return df
-    except Exception as e:
-        raise ValueError(f"Error parsing CSV file: {str(e)}")
+def get_call_sign_mapping(db: Session) -> Dict[str, int]:
+    """Map every pilot call sign to its pilot ID"""
+    return {
+        call_sign: pilot_id
+        for pilot_id, call_sign in db.query(Pilot.id, Pilot.call_sign).filter(Pilot.call_sign.isnot(None))
+    }
+
+
+def _parse_dates(column: pd.Series) -> pd.Series:
+    """Parse a column to dates, None where empty or unparseable"""
+    parsed = pd.to_datetime(column, errors='coerce')
+    # A column with mixed formats fails format inference; retry those cells one by one
+    retry = parsed.isna() & column.notna()
+    if retry.any():
+        parsed.loc[retry] = pd.to_datetime(column[retry], errors='coerce', format='mixed')
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def _json_safe(frame: pd.DataFrame) -> pd.DataFrame:
+    """Make every cell JSON serializable for raw_data (NaN -> None, timestamps -> ISO strings)"""
+    safe = frame.astype(object)
+    for column in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[column]):
+            safe[column] = frame[column].map(lambda v: v.isoformat() if pd.notna(v) else None)
+        else:
+            safe[column] = safe[column].map(lambda v: v.isoformat() if isinstance(v, (datetime, date)) else v)
+    return safe.where(frame.notna(), None)
 
 
-def map_pilot_from_spreadsheet(row: Dict[str, Any], pilot_mapping: Dict[str, int]) -> int:
+def prepare_currency_frame(
+    df: pd.DataFrame,
+    pilot_mapping: Dict[str, int],
+    column_mapping: Dict[str, str],
+    today: date = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    Map spreadsheet row to pilot ID
-    pilot_mapping should map spreadsheet identifiers (call_sign, name, etc.) to pilot IDs
+    Map, validate and classify a spreadsheet frame with whole-column operations
+
+    The frame is indexed by spreadsheet row number (header is row 1), as
+    iter_currency_batches yields it. Returns (rows ready for
+    upsert_currency_rows, rejects); each reject carries its row number and
+    a reason.
     """
-    # Try to find pilot by various identifiers
-    for identifier_key in ['call_sign', 'name', 'pilot_name', 'pilot_id', 'id']:
-        if identifier_key in row:
-            identifier = str(row[identifier_key]).strip()
-            if identifier in pilot_mapping:
-                return pilot_mapping[identifier]
+    today = today or date.today()
+    
+    # Column mapping
+    mapped = pd.DataFrame(
+        {our_field: df[column] for our_field, column in column_mapping.items() if column in df.columns},
+        index=df.index
+    )
+    row_numbers = pd.Series(df.index, index=df.index)
+    
+    # Pilot lookup: first identifier column whose value is a known pilot
+    pilot_ids = pd.Series(np.nan, index=df.index)
+    for identifier_field in PILOT_IDENTIFIER_FIELDS:
+        if identifier_field in mapped.columns:
+            identifiers = mapped[identifier_field].astype(str).str.strip()
+            pilot_ids = pilot_ids.fillna(identifiers.map(pilot_mapping))
+    
+    # Dates
+    empty = pd.Series([None] * len(df), index=df.index, dtype=object)
+    last_completed = _parse_dates(mapped['last_completed_date']) if 'last_completed_date' in mapped.columns else empty
+    expiration = _parse_dates(mapped['expiration_date']) if 'expiration_date' in mapped.columns else empty
+    
+    # Status as of the import; reads use CurrencyRecord.current_status
+    expiration_ts = pd.to_datetime(expiration.where(expiration.notna(), None))
+    days_left = (expiration_ts - pd.Timestamp(today)).dt.days
+    status = pd.Series(
+        np.select(
+            [days_left < 0, days_left <= EXPIRING_WINDOW_DAYS],
+            ["expired", "expiring"],
+            default="current"
+        ),
+        index=df.index
+    )
+    
+    if 'currency_type' in mapped.columns:
+        currency_type = mapped['currency_type'].where(mapped['currency_type'].notna(), 'unknown').astype(str)
+    else:
+        currency_type = pd.Series('unknown', index=df.index)
+    
+    raw_data = _json_safe(mapped).to_dict('records')
+    content_hashes = [content_hash(raw) for raw in raw_data]
     
-    raise ValueError(f"Could not map row to pilot: {row}")
+    rows = []
+    rejects = []
+    valid = pilot_ids.notna()
+    for position, (is_valid, row_number) in enumerate(zip(valid.tolist(), row_numbers.tolist())):
+        if not is_valid:
+            rejects.append({
+                "row": row_number,
+                "reason": "Could not map row to pilot",
+                "data": raw_data[position],
+            })
+    
+    valid_positions = [position for position, ok in enumerate(valid.tolist()) if ok]
+    for position, pilot_id, currency, completed, expires, row_status in zip(
+        valid_positions,
+        pilot_ids[valid].astype(int).tolist(),
+        currency_type[valid].tolist(),
+        last_completed[valid].tolist(),
+        expiration[valid].tolist(),
+        status[valid].tolist()
+    ):
+        rows.append({
+            "pilot_id": pilot_id,
+            "currency_type": currency,
+            "last_completed_date": completed,
+            "expiration_date": expires,
+            "status": row_status,
+            "raw_data": raw_data[position],
+            "content_hash": content_hashes[position],
+        })
+    
+    return rows, rejects
+
 
+def content_hash(raw_data: Dict[str, Any]) -> str:
+    """Stable hash of a row's spreadsheet data"""
+    return hashlib.sha256(json.dumps(raw_data, sort_keys=True, default=str).encode()).hexdigest()
 
-def extract_currency_data(df: pd.DataFrame, column_mapping: Dict[str, str]) -> List[Dict[str, Any]]:
+
+def upsert_currency_rows(db: Session, rows: List[Dict[str, Any]]) -> Dict[str, int]:
     """
-    Extract currency data from DataFrame using column mapping
-    column_mapping: maps spreadsheet columns to our data model
+    Write prepared rows keyed on (pilot_id, currency_type), keeping one
+    current row per pilot and currency. Does not commit.
+
+    Rows whose raw_data hash matches the stored one are skipped without
+    comparing anything else. When the dates change, the old values are
+    copied to currency_record_history first. Rows with the same dates
+    count as unchanged and only get the new raw_data and content_hash, so
+    the next import can skip them; status is derived from expiration_date
+    when read.
+    Within a batch the last row for a key wins.
+
+    Returns {"inserted", "updated", "unchanged"}.
     """
-    currency_records = []
-    
-    for _, row in df.iterrows():
-        record = {}
-        for our_field, spreadsheet_column in column_mapping.items():
-            if spreadsheet_column in row:
-                record[our_field] = row[spreadsheet_column]
-        currency_records.append(record)
-    
-    return currency_records
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    latest = {(row["pilot_id"], row["currency_type"]): row for row in rows}
+    counts["unchanged"] = len(rows) - len(latest)
+    if not latest:
+        return counts
+
+    existing = {
+        (record.pilot_id, record.currency_type): record
+        for record in db.query(
+            CurrencyRecord.id,
+            CurrencyRecord.pilot_id,
+            CurrencyRecord.currency_type,
+            CurrencyRecord.last_completed_date,
+            CurrencyRecord.expiration_date,
+            CurrencyRecord.status,
+            CurrencyRecord.content_hash,
+            CurrencyRecord.imported_at
+        ).filter(
+            CurrencyRecord.pilot_id.in_(sorted({pilot_id for pilot_id, _ in latest})),
+            CurrencyRecord.currency_type.in_(sorted({currency for _, currency in latest}))
+        )
+    }
+
+    now = datetime.utcnow()
+    inserts, updates, history, rehashed = [], [], [], []
+    for key, row in latest.items():
+        current = existing.get(key)
+        if current is None:
+            inserts.append({**row, "imported_at": now})
+            continue
+        if current.content_hash == row["content_hash"]:
+            counts["unchanged"] += 1
+            continue
+
+        dates_changed = (
+            current.last_completed_date != row["last_completed_date"]
+            or current.expiration_date != row["expiration_date"]
+        )
+        if not dates_changed:
+            counts["unchanged"] += 1
+            rehashed.append({"id": current.id, "raw_data": row["raw_data"], "content_hash": row["content_hash"]})
+            continue
+        history.append({
+            "pilot_id": current.pilot_id,
+            "currency_type": current.currency_type,
+            "last_completed_date": current.last_completed_date,
+            "expiration_date": current.expiration_date,
+            "status": current.status,
+            "imported_at": current.imported_at,
+            "superseded_at": now,
+        })
+        updates.append({**row, "id": current.id, "imported_at": now})
+
+    if history:
+        db.execute(insert(CurrencyRecordHistory.__table__), history)
+    if updates:
+        db.execute(update(CurrencyRecord), updates)
+    if rehashed:
+        db.execute(update(CurrencyRecord), rehashed)
+    if inserts:
+        upsert = get_upsert_insert(db)
+        if upsert is None:
+            db.execute(insert(CurrencyRecord.__table__), inserts)
+        else:
+            # A concurrent import may have created the key since we looked
+            stmt = upsert(CurrencyRecord.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["pilot_id", "currency_type"],
+                set_={
+                    field: stmt.excluded[field]
+                    for field in ("last_completed_date", "expiration_date", "status", "raw_data", "content_hash", "imported_at")
+                }
+            )
+            db.execute(stmt, inserts)
+
+    counts["inserted"] = len(inserts)
+    counts["updated"] = len(updates)
+    return counts
+
+
+def iter_csv_batches(file_path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV in row batches indexed by line number; every column is read
+    as text so types don't vary between batches. Blank lines are read, so
+    the numbering stays right, then dropped.
+    """
+    try:
+        for chunk in pd.read_csv(file_path, chunksize=batch_size, dtype=str, skip_blank_lines=False):
+            chunk.index = chunk.index + 2
+            chunk = chunk.dropna(how="all")
+            if not chunk.empty:
+                yield chunk
+    except Exception as e:
+        raise ValueError(f"Error parsing CSV file: {str(e)}")
+
+
+def _sheet_frame(batch: List[tuple], columns: List[str], row_numbers: List[int]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(batch, columns=columns)
+    frame.index = pd.Index(row_numbers)
+    return frame
+
+
+def iter_excel_batches(file_path: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    """Stream the first sheet of an xlsx workbook row by row, yielding row batches indexed by sheet row"""
+    # Opened by handle so openpyxl doesn't reject the spool file's extension
+    with open(file_path, 'rb') as handle:
+        try:
+            workbook = openpyxl.load_workbook(handle, read_only=True, data_only=True)
+        except Exception as e:
+            raise ValueError(f"Error parsing Excel file: {str(e)}")
+        
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = [str(value).strip() if value is not None else f"column_{i}" for i, value in enumerate(header)]
+            
+            batch = []
+            row_numbers = []
+            # Numbered before blank rows are skipped so rejects point at the real sheet row
+            for row_number, values in enumerate(rows, start=2):
+                if all(value is None for value in values):
+                    continue
+                batch.append(values[:len(columns)])
+                row_numbers.append(row_number)
+                if len(batch) >= batch_size:
+                    yield _sheet_frame(batch, columns, row_numbers)
+                    batch = []
+                    row_numbers = []
+            if batch:
+                yield _sheet_frame(batch, columns, row_numbers)
+        finally:
+            workbook.close()
+
+
+def iter_currency_batches(file_path: str, file_type: str, batch_size: int) -> Iterator[pd.DataFrame]:
+    if file_type == 'excel':
+        return iter_excel_batches(file_path, batch_size)
+    elif file_type == 'csv':
+        return iter_csv_batches(file_path, batch_size)
+    raise ValueError(f"Unsupported file type: {file_type}")
 
 
 def import_currency_records(
@@ -61,73 +309,53 @@ def import_currency_records(
     file_path: str,
     file_type: str,
     pilot_mapping: Dict[str, int],
-    column_mapping: Dict[str, str]
-) -> List[CurrencyRecord]:
+    column_mapping: Dict[str, str],
+    batch_size: int = 1000,
+    max_rejects: int = 1000,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
     """
     Import currency records from spreadsheet file
     
+    Rows are upserted per (pilot, currency type), so re-importing the same
+    sheet leaves the table as it was. The file is read and written in
+    batches of batch_size rows, each
+    committed as it is processed, so memory is bounded by the batch size
+    rather than the file size. After every batch progress (if given) is
+    called with the running totals.
+    
     Args:
         db: Database session
         file_path: Path to the spreadsheet file
         file_type: 'excel' or 'csv'
         pilot_mapping: Maps spreadsheet identifiers to pilot IDs
         column_mapping: Maps our fields to spreadsheet columns
-    """
-    # Parse file
-    if file_type == 'excel':
-        df = parse_excel_file(file_path)
-    elif file_type == 'csv':
-        df = parse_csv_file(file_path)
-    else:
-        raise ValueError(f"Unsupported file type: {file_type}")
     
-    # Extract data
-    raw_records = extract_currency_data(df, column_mapping)
+    Returns:
+        {"rows_processed", "batches", "imported", "inserted", "updated",
+         "unchanged", "rejected_count",
+         "rejected": first max_rejects of [{"row", "reason", "data"}]}
+    """
+    result = {
+        "rows_processed": 0, "batches": 0, "imported": 0, "inserted": 0, "updated": 0,
+        "unchanged": 0, "rejected_count": 0, "rejected": []
+    }
+    today = date.today()
     
-    # Create currency records
-    currency_records = []
-    for raw_record in raw_records:
-        try:
-            pilot_id = map_pilot_from_spreadsheet(raw_record, pilot_mapping)
-            
-            # Parse dates if present
-            last_completed_date = None
-            expiration_date = None
-            if 'last_completed_date' in raw_record and raw_record['last_completed_date']:
-                try:
-                    last_completed_date = pd.to_datetime(raw_record['last_completed_date']).date()
-                except:
-                    pass
-            
-            if 'expiration_date' in raw_record and raw_record['expiration_date']:
-                try:
-                    expiration_date = pd.to_datetime(raw_record['expiration_date']).date()
-                except:
-                    pass
-            
-            # Determine status
-            status = "current"
-            if expiration_date:
-                if expiration_date < date.today():
-                    status = "expired"
-                elif (expiration_date - date.today()).days <= 30:
-                    status = "expiring"
-            
-            currency_record = CurrencyRecord(
-                pilot_id=pilot_id,
-                currency_type=raw_record.get('currency_type', 'unknown'),
-                last_completed_date=last_completed_date,
-                expiration_date=expiration_date,
-                status=status,
-                raw_data=raw_record
-            )
-            
-            db.add(currency_record)
-            currency_records.append(currency_record)
-        except Exception as e:
-            # Log error but continue with other records
-            print(f"Error processing record: {e}")
-            continue
+    for df in iter_currency_batches(file_path, file_type, batch_size):
+        rows, rejects = prepare_currency_frame(df, pilot_mapping, column_mapping, today=today)
+        counts = upsert_currency_rows(db, rows)
+        db.commit()
+        for field, count in counts.items():
+            result[field] += count
+        result["imported"] += counts["inserted"] + counts["updated"]
+        
+        result["rows_processed"] += len(df)
+        result["batches"] += 1
+        result["rejected_count"] += len(rejects)
+        result["rejected"].extend(rejects[:max(max_rejects - len(result["rejected"]), 0)])
+        
+        if progress is not None:
+            progress(result)
     
-    db.commit()
-    return currency_records
+    return result
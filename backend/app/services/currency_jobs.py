@@ -0,0 +1,267 @@
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.currency import CurrencyImportJob
+from .currency import DEFAULT_COLUMN_MAPPING, get_call_sign_mapping, import_currency_records
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+SPOOL_PREFIX = "upload-"
+# Unreferenced spool files younger than this may belong to an upload still in flight
+SPOOL_SWEEP_GRACE_SECONDS = 300
+
+
+class ImportTimedOut(Exception):
+    pass
+
+
+def worker_id() -> str:
+    # Read per call: uvicorn --workers forks after this module is imported
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CurrencyImportQueue:
+    """
+    Runs spreadsheet imports on a local thread pool. Job state lives in
+    currency_import_jobs, so any API worker can answer a status poll.
+
+    A job owns its spooled upload and deletes it when done. Several
+    workers mean a large file never holds up the uploads behind it.
+
+    The pool does not survive a restart, so recover() runs at startup: it
+    fails jobs left behind by a dead process on this host, fails jobs on
+    any host that have been queued or running longer than the timeout,
+    and deletes spool files no active job refers to. A job also stops
+    itself at the timeout between batches.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        max_workers: int,
+        batch_size: int,
+        max_rejects: int,
+        spool_dir: str,
+        timeout_seconds: int
+    ):
+        self.session_factory = session_factory
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.max_rejects = max_rejects
+        self.spool_dir = spool_dir
+        self.timeout_seconds = timeout_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def spool(self, source: BinaryIO, file_type: str) -> str:
+        """Copy an upload into the spool directory in fixed-size chunks and return its path"""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=self.spool_dir, prefix=SPOOL_PREFIX, suffix=f".{file_type}", delete=False
+        ) as spool_file:
+            shutil.copyfileobj(source, spool_file, settings.CURRENCY_UPLOAD_CHUNK_BYTES)
+            return spool_file.name
+
+    def submit(
+        self,
+        db: Session,
+        file_path: str,
+        file_type: str,
+        file_name: Optional[str] = None,
+        created_by: Optional[int] = None
+    ) -> CurrencyImportJob:
+        """Record a queued job and hand it to the pool. Commits."""
+        self.expire_stale(db)
+        job = CurrencyImportJob(
+            file_name=file_name,
+            file_type=file_type,
+            status="queued",
+            created_by=created_by,
+            worker=worker_id(),
+            spool_path=file_path,
+            rows_processed=0,
+            batches=0,
+            imported=0,
+            inserted=0,
+            updated=0,
+            unchanged=0,
+            rejected_count=0,
+            rejected=[]
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="currency-import")
+        self._executor.submit(self._run, job.id, file_path)
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    # Recovery
+
+    def recover(self, db: Session) -> None:
+        """Fail orphaned and timed-out jobs and sweep unreferenced spool files. Commits."""
+        host = socket.gethostname()
+        orphaned = []
+        for job in db.query(CurrencyImportJob).filter(CurrencyImportJob.status.in_(ACTIVE_STATUSES)):
+            job_host, _, pid = (job.worker or "").rpartition(":")
+            # Nothing has been submitted from this process yet, so a job carrying
+            # its pid was left by an earlier process that reused it (e.g. pid 1)
+            if job_host == host and pid.isdigit() and (int(pid) == os.getpid() or not _process_alive(int(pid))):
+                orphaned.append(job)
+        self._fail(db, orphaned, "Interrupted by a server restart")
+        self.expire_stale(db)
+        self.sweep_spool(db)
+
+    def expire_stale(self, db: Session) -> None:
+        """Fail jobs queued or running for longer than the timeout. Commits."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.timeout_seconds)
+        stale = db.query(CurrencyImportJob).filter(
+            or_(
+                (CurrencyImportJob.status == "queued") & (CurrencyImportJob.created_at < cutoff),
+                (CurrencyImportJob.status == "running") & (CurrencyImportJob.started_at < cutoff),
+            )
+        ).all()
+        self._fail(db, stale, f"Timed out after {self.timeout_seconds} seconds")
+
+    def sweep_spool(self, db: Session) -> None:
+        """Delete spool files no queued or running job refers to"""
+        if not os.path.isdir(self.spool_dir):
+            return
+        referenced = {
+            path for (path,) in db.query(CurrencyImportJob.spool_path).filter(
+                CurrencyImportJob.status.in_(ACTIVE_STATUSES),
+                CurrencyImportJob.spool_path.isnot(None)
+            )
+        }
+        cutoff = time.time() - SPOOL_SWEEP_GRACE_SECONDS
+        for entry in os.scandir(self.spool_dir):
+            if not entry.name.startswith(SPOOL_PREFIX) or entry.path in referenced:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _fail(self, db: Session, jobs, error: str) -> None:
+        if not jobs:
+            return
+        host = socket.gethostname()
+        now = datetime.utcnow()
+        for job in jobs:
+            logger.warning("Currency import job %s (%s): %s", job.id, job.status, error)
+            # Only the status change is conditional, so a job finishing meanwhile keeps its result
+            result = db.execute(
+                update(CurrencyImportJob)
+                .where(CurrencyImportJob.id == job.id, CurrencyImportJob.status.in_(ACTIVE_STATUSES))
+                .values(status="failed", error=error, finished_at=now)
+            )
+            if result.rowcount and job.spool_path and (job.worker or "").rpartition(":")[0] == host:
+                _remove(job.spool_path)
+        db.commit()
+
+    # Worker
+
+    def _run(self, job_id: int, file_path: str) -> None:
+        db = self.session_factory()
+        try:
+            started_at = datetime.utcnow()
+            claimed = db.execute(
+                update(CurrencyImportJob)
+                .where(CurrencyImportJob.id == job_id, CurrencyImportJob.status == "queued")
+                .values(status="running", started_at=started_at)
+            ).rowcount
+            db.commit()
+            if not claimed:
+                # Expired while waiting for a worker
+                return
+            job = db.get(CurrencyImportJob, job_id)
+            deadline = time.monotonic() + self.timeout_seconds
+
+            def progress(totals: Dict[str, Any]) -> None:
+                # The import has just committed a batch; record the running totals
+                job.rows_processed = totals["rows_processed"]
+                job.batches = totals["batches"]
+                job.imported = totals["imported"]
+                job.inserted = totals["inserted"]
+                job.updated = totals["updated"]
+                job.unchanged = totals["unchanged"]
+                job.rejected_count = totals["rejected_count"]
+                job.rejected = list(totals["rejected"])
+                db.commit()
+                if time.monotonic() > deadline:
+                    raise ImportTimedOut(f"Timed out after {self.timeout_seconds} seconds")
+
+            import_currency_records(
+                db=db,
+                file_path=file_path,
+                file_type=job.file_type,
+                pilot_mapping=get_call_sign_mapping(db),
+                column_mapping=DEFAULT_COLUMN_MAPPING,
+                batch_size=self.batch_size,
+                max_rejects=self.max_rejects,
+                progress=progress
+            )
+            self._finish(db, job_id, status="completed")
+        except Exception as e:
+            if isinstance(e, ImportTimedOut):
+                logger.warning("Currency import job %s: %s", job_id, e)
+            else:
+                logger.exception("Currency import job %s failed", job_id)
+            db.rollback()
+            self._finish(db, job_id, status="failed", error=str(e))
+        finally:
+            db.close()
+            _remove(file_path)
+
+    def _finish(self, db: Session, job_id: int, **values) -> None:
+        # A job already failed by expire_stale() or recover() stays failed
+        db.execute(
+            update(CurrencyImportJob)
+            .where(CurrencyImportJob.id == job_id, CurrencyImportJob.status == "running")
+            .values(finished_at=datetime.utcnow(), **values)
+        )
+        db.commit()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+import_queue = CurrencyImportQueue(
+    SessionLocal,
+    max_workers=settings.CURRENCY_IMPORT_WORKERS,
+    batch_size=settings.CURRENCY_IMPORT_BATCH_SIZE,
+    max_rejects=settings.CURRENCY_IMPORT_MAX_REJECTS,
+    spool_dir=settings.CURRENCY_IMPORT_SPOOL_DIR or os.path.join(tempfile.gettempdir(), "currency-imports"),
+    timeout_seconds=settings.CURRENCY_IMPORT_JOB_TIMEOUT_SECONDS
+)
@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, insert, select, tuple_
+from sqlalchemy.orm import Session, selectinload
+from datetime import date, datetime
+from ..models.aircraft import Aircraft
+from ..models.event import Event, EventAssignment, EventStatus
+from ..models.pilot import Pilot
+from ..models.simulator import Simulator
+from ..schemas.event import EventAssignmentsReplace, EventCreate
+from .calendar import bump_feed_versions
+from .conflicts import EventConflictError, check_conflicts
+from .status_maintenance import mark_months_changed
+from .training_counters import month_start
+
+
+def event_statement(event_id: int):
+    """One event with its assignments"""
+    return select(Event).options(selectinload(Event.assignments)).where(Event.id == event_id)
+
+
+def events_page_statement(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    fields: Optional[List[str]] = None,
+    skip: int = 0,
+    limit: int = 100
+):
+    """
+    Events ordered by (start_time, id), starting after the keyset `after`.
+    With fields (and no "assignments") only those columns plus start_time
+    are selected; otherwise full events with their assignments. Selects
+    limit + 1 rows so the caller can tell whether there is a next page.
+    """
+    if fields is not None and "assignments" not in fields:
+        columns = [getattr(Event, field) for field in fields]
+        if "start_time" not in fields:
+            columns.append(Event.start_time)  # Needed for the cursor
+        stmt = select(*columns)
+    else:
+        stmt = select(Event).options(selectinload(Event.assignments))
+
+    if start_date:
+        stmt = stmt.where(Event.start_time >= start_date)
+    if end_date:
+        stmt = stmt.where(Event.start_time <= end_date)
+    if event_type:
+        stmt = stmt.where(Event.event_type == event_type)
+    if after:
+        stmt = stmt.where(tuple_(Event.start_time, Event.id) > after)
+
+    stmt = stmt.order_by(Event.start_time, Event.id)
+    if skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit + 1)
+
+
+class BulkValidationError(ValueError):
+    """Every problem found in a bulk request, as [{"item", "error"}]"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} invalid item(s)")
+        self.errors = errors
+
+
+def _existing_ids(db: Session, column, ids: Set[int]) -> Set[int]:
+    if not ids:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(sorted(ids)))))
+
+
+def _validate(
+    db: Session,
+    creates: List[EventCreate],
+    replacements: List[EventAssignmentsReplace]
+) -> Dict[int, Event]:
+    """Check the whole request in a handful of queries; returns the events being re-crewed"""
+    errors = []
+
+    def check_crew(item: str, assignments) -> None:
+        pilot_ids = [a.pilot_id for a in assignments]
+        if len(pilot_ids) != len(set(pilot_ids)):
+            errors.append({"item": item, "error": "Pilot assigned more than once"})
+
+    pilot_ids = {a.pilot_id for e in creates for a in e.assignments}
+    pilot_ids |= {a.pilot_id for r in replacements for a in r.assignments}
+    known_pilots = _existing_ids(db, Pilot.id, pilot_ids)
+    known_aircraft = _existing_ids(db, Aircraft.id, {e.aircraft_id for e in creates if e.aircraft_id})
+    known_simulators = _existing_ids(db, Simulator.id, {e.simulator_id for e in creates if e.simulator_id})
+
+    for i, event_data in enumerate(creates):
+        item = f"create[{i}]"
+        if event_data.end_time <= event_data.start_time:
+            errors.append({"item": item, "error": "end_time must be after start_time"})
+        if event_data.aircraft_id and event_data.aircraft_id not in known_aircraft:
+            errors.append({"item": item, "error": f"Aircraft {event_data.aircraft_id} not found"})
+        if event_data.simulator_id and event_data.simulator_id not in known_simulators:
+            errors.append({"item": item, "error": f"Simulator {event_data.simulator_id} not found"})
+        check_crew(item, event_data.assignments)
+
+    event_ids = [r.event_id for r in replacements]
+    events = {
+        event.id: event
+        for event in db.scalars(
+            select(Event).options(selectinload(Event.assignments)).where(Event.id.in_(sorted(set(event_ids))))
+        )
+    } if event_ids else {}
+    seen = set()
+    for i, replacement in enumerate(replacements):
+        item = f"assignments[{i}]"
+        if replacement.event_id not in events:
+            errors.append({"item": item, "error": f"Event {replacement.event_id} not found"})
+        if replacement.event_id in seen:
+            errors.append({"item": item, "error": f"Event {replacement.event_id} listed more than once"})
+        seen.add(replacement.event_id)
+        check_crew(item, replacement.assignments)
+
+    for item, assignments in (
+        [(f"create[{i}]", e.assignments) for i, e in enumerate(creates)]
+        + [(f"assignments[{i}]", r.assignments) for i, r in enumerate(replacements)]
+    ):
+        for pilot_id in sorted({a.pilot_id for a in assignments} - known_pilots):
+            errors.append({"item": item, "error": f"Pilot {pilot_id} not found"})
+
+    if errors:
+        raise BulkValidationError(errors)
+    return events
+
+
+def bulk_apply(
+    db: Session,
+    creates: List[EventCreate],
+    replacements: List[EventAssignmentsReplace],
+    allow_conflicts: bool = False
+) -> Tuple[List[int], List[int]]:
+    """
+    Create events and replace event crews in one transaction.
+
+    The whole request is validated first and nothing is written if any
+    item is invalid. Events go in with one multi-row INSERT ... RETURNING,
+    assignments with one executemany, replaced crews with one DELETE.
+    Counters, dirty status marks and calendar feed versions are updated
+    once for everything touched. Unless allow_conflicts, the transaction
+    is rolled back with EventConflictError if any created or re-crewed
+    event ends up double-booked. Commits.
+
+    Returns (created event ids in request order, re-crewed event ids).
+    """
+    events = _validate(db, creates, replacements)
+    now = datetime.utcnow()
+    feed_pilots: Set[int] = set()
+    touched: Dict[date, Set[int]] = {}
+
+    created_ids: List[int] = []
+    if creates:
+        event_rows = [
+            {
+                **event_data.dict(exclude={"assignments"}),
+                "status": EventStatus.SCHEDULED,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for event_data in creates
+        ]
+        created_ids = list(db.scalars(
+            insert(Event).returning(Event.id, sort_by_parameter_order=True),
+            event_rows
+        ))
+
+    assignment_rows = [
+        {"event_id": event_id, "pilot_id": a.pilot_id, "position": a.position, "created_at": now}
+        for event_id, event_data in zip(created_ids, creates)
+        for a in event_data.assignments
+    ]
+    feed_pilots.update(row["pilot_id"] for row in assignment_rows)
+
+    if replacements:
+        for replacement in replacements:
+            event = events[replacement.event_id]
+            before = {a.pilot_id for a in event.assignments}
+            after = {a.pilot_id for a in replacement.assignments}
+            feed_pilots |= before | after
+            if event.status == EventStatus.EFFECTIVE and before != after:
+                touched.setdefault(month_start(event.start_time), set()).update(before | after)
+            assignment_rows.extend(
+                {"event_id": event.id, "pilot_id": a.pilot_id, "position": a.position, "created_at": now}
+                for a in replacement.assignments
+            )
+            event.updated_at = now
+        db.execute(delete(EventAssignment).where(EventAssignment.event_id.in_(sorted(events))))
+
+    if assignment_rows:
+        db.execute(insert(EventAssignment), assignment_rows)
+
+    if not allow_conflicts:
+        try:
+            check_conflicts(db, created_ids + sorted(events))
+        except EventConflictError:
+            db.rollback()
+            raise
+
+    mark_months_changed(db, touched)
+    bump_feed_versions(db, feed_pilots)
+    db.commit()
+    return created_ids, sorted(events)
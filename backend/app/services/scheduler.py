@@ -1,11 +1,25 @@
-from typing import List, Dict, Any, Optional
+import time
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import numpy as np
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta
+from ..core.config import settings
+from ..core.query_budget import query_budget
 from ..models.pilot import Pilot
-from ..models.event import Event, EventAssignment, EventType
+from ..models.event import (
+    Event,
+    EventAssignment,
+    EventType,
+    EventStatus,
+    SIMULATOR_EVENT_TYPES,
+    EVENT_REQUIREMENT_CREDITS,
+)
 from ..models.aircraft import Aircraft
 from ..models.simulator import Simulator
 from ..models.currency import CurrencyRecord
+from .solver import AssignmentProblem, solve_assignment
 
 
 def check_pilot_availability(
@@ -38,6 +52,122 @@ def check_pilot_availability(
     return len(conflicting_events) == 0
 
 
+class IntervalSet:
+    """
+    Sorted, non-overlapping set of datetime intervals.
+
+    Overlapping or touching intervals are merged on insert, so an overlap
+    check is a single bisect regardless of how many intervals were added.
+    """
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def add(self, start: datetime, end: datetime) -> None:
+        if end < start:
+            start, end = end, start
+        # Every interval touching [start, end] lies in _starts[lo:hi]
+        lo = bisect_left(self._ends, start)
+        hi = bisect_right(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+
+    def overlaps(self, start: datetime, end: datetime, inclusive: bool = False) -> bool:
+        """
+        Check whether [start, end] intersects any stored interval.
+        With inclusive=False, intervals that merely touch do not count.
+        """
+        if inclusive:
+            idx = bisect_right(self._starts, end)
+            return idx > 0 and self._ends[idx - 1] >= start
+        idx = bisect_left(self._starts, end)
+        return idx > 0 and self._ends[idx - 1] > start
+
+
+def parse_time_off(time_off: Iterable[Any]) -> List[Tuple[datetime, datetime]]:
+    """Parse a pilot's time_off JSON into (start, end) tuples, skipping malformed entries"""
+    periods = []
+    for time_off_period in time_off or []:
+        if not isinstance(time_off_period, dict):
+            continue
+        try:
+            off_start = datetime.fromisoformat(time_off_period.get('start', ''))
+            off_end = datetime.fromisoformat(time_off_period.get('end', ''))
+        except (TypeError, ValueError):
+            continue
+        periods.append((off_start, off_end))
+    return periods
+
+
+class PilotAvailabilityIndex:
+    """
+    Per-run, in-memory index of pilot commitments.
+
+    Built with one bulk query for all assignments in a time window plus the
+    pilots' time off, so availability checks during an optimize run never go
+    back to the database. Assignments made during the run are recorded with
+    add_assignment() so later events see them.
+    """
+
+    def __init__(self):
+        self._busy: Dict[int, IntervalSet] = {}
+        self._time_off: Dict[int, IntervalSet] = {}
+        # Assignments each pilot already had in the window when the index was built
+        self.existing_counts: Dict[int, int] = {}
+
+    @classmethod
+    def build(
+        cls,
+        db: Session,
+        pilots: List[Pilot],
+        window_start: datetime,
+        window_end: datetime
+    ) -> "PilotAvailabilityIndex":
+        index = cls()
+        pilot_ids = [pilot.id for pilot in pilots]
+
+        for pilot in pilots:
+            for off_start, off_end in parse_time_off(pilot.time_off):
+                if off_end >= window_start and off_start <= window_end:
+                    index._time_off.setdefault(pilot.id, IntervalSet()).add(off_start, off_end)
+
+        if pilot_ids:
+            rows = (
+                db.query(EventAssignment.pilot_id, Event.start_time, Event.end_time)
+                .join(Event, Event.id == EventAssignment.event_id)
+                .filter(
+                    EventAssignment.pilot_id.in_(pilot_ids),
+                    Event.start_time < window_end,
+                    Event.end_time > window_start
+                )
+                .all()
+            )
+            for pilot_id, start_time, end_time in rows:
+                index.add_assignment(pilot_id, start_time, end_time)
+                index.existing_counts[pilot_id] = index.existing_counts.get(pilot_id, 0) + 1
+
+        return index
+
+    def add_assignment(self, pilot_id: int, start_time: datetime, end_time: datetime) -> None:
+        self._busy.setdefault(pilot_id, IntervalSet()).add(start_time, end_time)
+
+    def is_available(self, pilot_id: int, start_time: datetime, end_time: datetime) -> bool:
+        time_off = self._time_off.get(pilot_id)
+        if time_off is not None and time_off.overlaps(start_time, end_time, inclusive=True):
+            return False
+        busy = self._busy.get(pilot_id)
+        if busy is not None and busy.overlaps(start_time, end_time):
+            return False
+        return True
+
+
 def get_pilots_needing_currency(
     db: Session,
     currency_type: str,
@@ -46,79 +176,177 @@ def get_pilots_needing_currency(
     """Get pilots who need currency training"""
     cutoff_date = date.today() + timedelta(days=days_until_expiration)
     
-    # Get pilots with expired or expiring currency
-    currency_records = db.query(CurrencyRecord).filter(
+    # Pilots with expired or expiring currency, via the (currency_type, expiration_date) index
+    needing = select(CurrencyRecord.pilot_id).where(
         CurrencyRecord.currency_type == currency_type,
         CurrencyRecord.expiration_date <= cutoff_date
-    ).all()
-    
-    pilot_ids = [cr.pilot_id for cr in currency_records]
+    )
     pilots = db.query(Pilot).filter(
-        Pilot.id.in_(pilot_ids),
+        Pilot.id.in_(needing),
         Pilot.is_active == True
     ).all()
     
     return pilots
 
 
-def optimize_schedule(
+def required_qualifications(event: Event, position: str) -> set:
+    """
+    Qualifications an event requires for a crew position.
+
+    crew_composition['qualifications'] is either a list applied to every
+    position or a dict mapping position names to a qualification or list.
+    """
+    qualifications = (event.crew_composition or {}).get('qualifications', {})
+    if isinstance(qualifications, dict):
+        qualifications = qualifications.get(position, [])
+    if isinstance(qualifications, str):
+        qualifications = [qualifications]
+    return set(qualifications or [])
+
+
+def is_qualified(pilot: Pilot, event: Event, position: str) -> bool:
+    return required_qualifications(event, position) <= set(pilot.qualifications or [])
+
+
+def currency_priorities(constraints: Dict[str, Any]) -> Dict[str, float]:
+    """
+    {currency_type: weight} the constraints ask to prioritize.
+
+    currency_types may be a list of types or a {type: weight} dict; a
+    single legacy currency_type is also accepted. Types without their own
+    weight use currency_weight (default 5.0).
+    """
+    if not constraints.get('prioritize_currency', False):
+        return {}
+
+    default_weight = float(constraints.get('currency_weight', 5.0))
+    currency_types = constraints.get('currency_types')
+    if currency_types is None:
+        currency_types = [constraints.get('currency_type', '')]
+    if isinstance(currency_types, str):
+        currency_types = [currency_types]
+    if isinstance(currency_types, dict):
+        return {str(currency_type): float(weight) for currency_type, weight in currency_types.items()}
+    return {str(currency_type): default_weight for currency_type in currency_types}
+
+
+@query_budget(1)
+def get_currency_needs(
     db: Session,
+    currency_types: Iterable[str],
+    days_until_expiration: int = 30
+) -> Dict[str, set]:
+    """
+    {currency_type: pilot_ids} with that currency expired or expiring
+    within the window, for several types in one indexed query
+    """
+    currency_types = sorted(set(currency_types))
+    needs = {currency_type: set() for currency_type in currency_types}
+    if not currency_types:
+        return needs
+
+    cutoff_date = date.today() + timedelta(days=days_until_expiration)
+    rows = db.query(CurrencyRecord.currency_type, CurrencyRecord.pilot_id).filter(
+        CurrencyRecord.currency_type.in_(currency_types),
+        CurrencyRecord.expiration_date <= cutoff_date
+    )
+    for currency_type, pilot_id in rows:
+        needs[currency_type].add(pilot_id)
+    return needs
+
+
+class OptimizerContext:
+    """
+    Everything an optimize run looks up about its pilots, computed once.
+
+    Holds the availability index, each pilot's qualifications, the
+    currency priority weights (summed over every prioritized currency type
+    the pilot needs) and the workload each pilot starts the run with, so
+    the engines never query the database per event.
+    """
+
+    def __init__(
+        self,
+        pilots: List[Pilot],
+        availability: PilotAvailabilityIndex,
+        currency_weights: Optional[Dict[int, float]] = None,
+        base_workload: Optional[Dict[int, int]] = None
+    ):
+        self.pilots = pilots
+        self.pilots_by_id = {pilot.id: pilot for pilot in pilots}
+        self.availability = availability
+        self.qualifications = {pilot.id: frozenset(pilot.qualifications or []) for pilot in pilots}
+        self.currency_weights = currency_weights or {}
+        self.base_workload = base_workload or {}
+
+    @classmethod
+    def build(
+        cls,
+        db: Session,
+        events: List[Event],
+        pilots: List[Pilot],
+        constraints: Dict[str, Any]
+    ) -> "OptimizerContext":
+        # Preload every commitment in the optimize window once
+        availability = PilotAvailabilityIndex.build(
+            db,
+            pilots,
+            min(e.start_time for e in events),
+            max(e.end_time for e in events)
+        )
+
+        currency_weights: Dict[int, float] = {}
+        priorities = currency_priorities(constraints)
+        if priorities:
+            active_ids = {pilot.id for pilot in pilots}
+            needs = get_currency_needs(db, priorities, constraints.get('currency_days', 30))
+            for currency_type, pilot_ids in needs.items():
+                for pilot_id in pilot_ids & active_ids:
+                    currency_weights[pilot_id] = currency_weights.get(pilot_id, 0.0) + priorities[currency_type]
+
+        # Optionally count assignments pilots already have in the window toward fairness
+        base_workload = {}
+        if constraints.get('include_existing_workload', False):
+            base_workload = dict(availability.existing_counts)
+
+        return cls(pilots, availability, currency_weights, base_workload)
+
+    def is_qualified(self, pilot_id: int, event: Event, position: str) -> bool:
+        return required_qualifications(event, position) <= self.qualifications[pilot_id]
+
+
+def _optimize_greedy(
     events: List[Event],
+    context: OptimizerContext,
     constraints: Dict[str, Any]
 ) -> Dict[int, List[int]]:
-    """
-    Optimize schedule by assigning pilots to events
-    
-    Args:
-        db: Database session
-        events: List of events to schedule
-        constraints: Dictionary of constraints (availability, currency, fairness, etc.)
-    
-    Returns:
-        Dictionary mapping event_id to list of pilot_ids
-    """
+    """Single pass in start time order, least-loaded available pilot first"""
     assignments = {}
-    
-    # Get all active pilots
-    pilots = db.query(Pilot).filter(Pilot.is_active == True).all()
+    check_qualifications = constraints.get('check_qualifications', False)
+    availability = context.availability
+    currency_weights = context.currency_weights
     
     # Sort events by priority (e.g., currency requirements first)
     sorted_events = sorted(events, key=lambda e: e.start_time)
     
     # Track pilot workload for fairness
-    pilot_workload = {pilot.id: 0 for pilot in pilots}
+    pilot_workload = {pilot.id: context.base_workload.get(pilot.id, 0) for pilot in context.pilots}
     
     for event in sorted_events:
         available_pilots = []
         
         # Find available pilots
-        for pilot in pilots:
-            if check_pilot_availability(db, pilot, event.start_time, event.end_time):
-                # Check qualifications if needed
-                if constraints.get('check_qualifications', False):
-                    # Add qualification checks here
-                    pass
-                
+        for pilot in context.pilots:
+            if availability.is_available(pilot.id, event.start_time, event.end_time):
                 available_pilots.append(pilot)
         
-        # Sort by workload (fairness) and currency needs
-        if constraints.get('prioritize_currency', False):
-            # Prioritize pilots who need currency training
-            currency_needing = get_pilots_needing_currency(
-                db,
-                constraints.get('currency_type', ''),
-                constraints.get('currency_days', 30)
-            )
-            currency_pilot_ids = {p.id for p in currency_needing}
-            
-            available_pilots.sort(
-                key=lambda p: (
-                    p.id not in currency_pilot_ids,  # Currency needs first
-                    pilot_workload[p.id]  # Then by workload
-                )
+        # Sort by currency needs (highest weight first), then workload (fairness)
+        available_pilots.sort(
+            key=lambda p: (
+                -currency_weights.get(p.id, 0.0),
+                pilot_workload[p.id]
             )
-        else:
-            available_pilots.sort(key=lambda p: pilot_workload[p.id])
+        )
         
         # Assign pilots based on crew composition requirements
         required_positions = event.crew_composition.get('positions', {})
@@ -126,45 +354,344 @@ def optimize_schedule(
         
         for position, count in required_positions.items():
             for _ in range(count):
-                if available_pilots:
-                    pilot = available_pilots.pop(0)
+                # Take the first pilot in priority order who holds the position's qualifications
+                pilot = next(
+                    (
+                        p for p in available_pilots
+                        if not check_qualifications or context.is_qualified(p.id, event, position)
+                    ),
+                    None
+                )
+                if pilot is not None:
+                    available_pilots.remove(pilot)
                     assigned_pilots.append(pilot.id)
                     pilot_workload[pilot.id] += 1
+                    availability.add_assignment(pilot.id, event.start_time, event.end_time)
         
         assignments[event.id] = assigned_pilots
     
     return assignments
 
 
+def _optimize_cp(
+    events: List[Event],
+    context: OptimizerContext,
+    constraints: Dict[str, Any]
+) -> Dict[int, List[int]]:
+    """
+    Model the run as a pilots x events assignment problem and solve it with
+    branch and bound inside a time budget.
+    
+    Overlaps, time off, qualifications and crew_composition positions are
+    hard constraints; fairness and currency needs are soft objectives.
+    """
+    try:
+        fairness_weight = float(constraints.get('fairness_weight', 1.0))
+    except (TypeError, ValueError):
+        fairness_weight = None
+    # The solver's pruning bound assumes the fairness term never lowers the objective
+    if fairness_weight is None or not 0 <= fairness_weight < float('inf'):
+        raise ValueError("fairness_weight must be a number of at least 0")
+    
+    availability = context.availability
+    
+    def is_eligible(event: Event, position: str, pilot_id: int) -> bool:
+        return (
+            availability.is_available(pilot_id, event.start_time, event.end_time)
+            and context.is_qualified(pilot_id, event, position)
+        )
+    
+    problem = AssignmentProblem.build(
+        events,
+        list(context.pilots_by_id),
+        is_eligible,
+        currency_weights=context.currency_weights,
+        fairness_weight=fairness_weight,
+        base_workload=context.base_workload
+    )
+    
+    time_limit = float(constraints.get('time_limit', settings.SCHEDULER_TIME_LIMIT_SECONDS))
+    time_limit = max(0.0, min(time_limit, settings.SCHEDULER_MAX_TIME_LIMIT_SECONDS))
+    
+    result = solve_assignment(problem, time_limit)
+    return result.assignments
+
+
+OPTIMIZER_ENGINES = {
+    "greedy": _optimize_greedy,
+    "cp": _optimize_cp,
+}
+
+
+@query_budget(3)
+def optimize_schedule(
+    db: Session,
+    events: List[Event],
+    constraints: Dict[str, Any]
+) -> Dict[int, List[int]]:
+    """
+    Optimize schedule by assigning pilots to events
+    
+    Args:
+        db: Database session
+        events: List of events to schedule
+        constraints: Dictionary of constraints (availability, currency, fairness, etc.)
+            engine selects the solver: "greedy" (default, fast) or "cp"
+            (constraint model, bounded by time_limit seconds)
+            prioritize_currency with currency_types (a list, or a
+            {type: weight} dict) or a single currency_type favours pilots
+            whose currency expires within currency_days
+            include_existing_workload counts assignments pilots already
+            have in the window toward fairness
+    
+    Returns:
+        Dictionary mapping event_id to list of pilot_ids
+    """
+    engine = constraints.get('engine', 'greedy')
+    if engine not in OPTIMIZER_ENGINES:
+        raise ValueError(f"Unknown optimizer engine: {engine}")
+    
+    if not events:
+        return {}
+    
+    # Get all active pilots
+    pilots = db.query(Pilot).filter(Pilot.is_active == True).all()
+    
+    context = OptimizerContext.build(db, events, pilots, constraints)
+    return OPTIMIZER_ENGINES[engine](events, context, constraints)
+
+
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def _resource_weekdays(availability: Dict[str, Any]) -> Optional[set]:
+    """Weekdays (Mon=0) a resource's availability JSON allows, or None for every day"""
+    weekdays = (availability or {}).get('weekdays')
+    if not weekdays:
+        return None
+    allowed = set()
+    for day in weekdays:
+        if isinstance(day, int):
+            allowed.add(day % 7)
+        elif isinstance(day, str) and day[:3].lower() in WEEKDAY_NAMES:
+            allowed.add(WEEKDAY_NAMES.index(day[:3].lower()))
+    return allowed
+
+
+def _overlap_matrix(
+    slot_starts: np.ndarray,
+    slot_ends: np.ndarray,
+    window_starts: np.ndarray,
+    window_ends: np.ndarray
+) -> np.ndarray:
+    """Boolean (slots x windows) matrix of which windows overlap which slots"""
+    return (slot_starts[:, None] < window_ends[None, :]) & (slot_ends[:, None] > window_starts[None, :])
+
+
+def _to_datetime64(values: List[datetime]) -> np.ndarray:
+    return np.array(values, dtype='datetime64[m]')
+
+
+@query_budget(4)
 def suggest_schedule(
     db: Session,
     start_date: date,
     end_date: date,
     event_type: EventType,
     constraints: Dict[str, Any]
-) -> List[Event]:
+) -> List[Dict[str, Any]]:
     """
     Suggest an optimized schedule for a date range
+    
+    Builds a (time slot x resource) grid over the date range, removes
+    maintenance, unavailable windows and existing bookings with array
+    operations, then repeatedly picks the slot whose available pilots have
+    the most unmet requirement for this event type. Output size and run
+    time are capped.
+    
+    Constraints:
+        start_hours: slot start hours each day (default [8])
+        duration_hours: length of each suggested event (default 4)
+        crew_size: pilots needed per event (default 2)
+        max_suggestions: number of suggestions (capped by settings)
+        time_limit: seconds to spend picking slots (capped by settings)
     """
-    # This is a simplified version - in production, you'd want more sophisticated
-    # constraint satisfaction algorithms
+    started = time.monotonic()
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+    num_days = (end_date - start_date).days + 1
+    if num_days > settings.SCHEDULER_MAX_SUGGEST_DAYS:
+        raise ValueError(f"Date range too long (max {settings.SCHEDULER_MAX_SUGGEST_DAYS} days)")
+    
+    try:
+        start_hours = constraints.get('start_hours', [8])
+        if not isinstance(start_hours, list) or not start_hours or not all(
+            isinstance(h, int) and not isinstance(h, bool) and 0 <= h <= 23 for h in start_hours
+        ):
+            raise ValueError("start_hours must be a list of whole hours between 0 and 23")
+        start_hours = sorted(set(start_hours))
+        duration_hours = float(constraints.get('duration_hours', 4))
+        if not 0 < duration_hours <= 24:
+            raise ValueError("duration_hours must be more than 0 and at most 24")
+        duration = timedelta(hours=duration_hours)
+        crew_size = max(1, int(constraints.get('crew_size', 2)))
+        max_suggestions = min(
+            int(constraints.get('max_suggestions', 20)),
+            settings.SCHEDULER_MAX_SUGGESTIONS
+        )
+        time_limit = float(constraints.get('time_limit', settings.SCHEDULER_TIME_LIMIT_SECONDS))
+    except (TypeError, OverflowError) as e:
+        raise ValueError(f"Invalid constraints: {e}")
+    deadline = started + max(0.0, min(time_limit, settings.SCHEDULER_MAX_TIME_LIMIT_SECONDS))
     
     # Get available resources
-    if event_type == EventType.FLIGHT:
-        resources = db.query(Aircraft).filter(Aircraft.is_active == True).all()
+    is_simulator = event_type in SIMULATOR_EVENT_TYPES
+    if is_simulator:
+        resources = db.query(Simulator).filter(Simulator.is_active == True).order_by(Simulator.id).all()
+        resource_column = Event.simulator_id
     else:
-        resources = db.query(Simulator).filter(Simulator.is_active == True).all()
+        resources = db.query(Aircraft).filter(Aircraft.is_active == True).order_by(Aircraft.id).all()
+        resource_column = Event.aircraft_id
+    if not resources or max_suggestions <= 0:
+        return []
     
-    # Generate suggested events (simplified - would need more logic)
-    suggested_events = []
-    current_date = start_date
+    # Time slots: every start hour of every day in the range
+    slot_times = [
+        datetime.combine(start_date + timedelta(days=d), datetime.min.time()) + timedelta(hours=h)
+        for d in range(num_days)
+        for h in start_hours
+    ]
+    slot_starts = _to_datetime64(slot_times)
+    slot_ends = _to_datetime64([t + duration for t in slot_times])
+    slot_weekdays = np.array([t.weekday() for t in slot_times])
+    range_start = slot_times[0]
+    range_end = slot_times[-1] + duration
     
-    while current_date <= end_date:
-        # Add logic to create suggested events based on:
-        # - Resource availability
-        # - Pilot availability
-        # - Currency requirements
-        # - Training requirements
-        pass
+    # Existing bookings of these resources in the range, one query
+    bookings = (
+        db.query(resource_column, Event.start_time, Event.end_time)
+        .filter(
+            resource_column.isnot(None),
+            Event.status != EventStatus.CANCELLED,
+            Event.start_time < range_end,
+            Event.end_time > range_start
+        )
+        .all()
+    )
+    bookings_by_resource: Dict[int, List[Tuple[datetime, datetime]]] = {}
+    for resource_id, booked_start, booked_end in bookings:
+        bookings_by_resource.setdefault(resource_id, []).append((booked_start, booked_end))
+    
+    # Resource grid: True where the resource can take an event in the slot
+    free = np.ones((len(slot_times), len(resources)), dtype=bool)
+    for r, resource in enumerate(resources):
+        weekdays = _resource_weekdays(resource.availability)
+        if weekdays is not None:
+            free[:, r] &= np.isin(slot_weekdays, list(weekdays))
+        windows = (
+            parse_time_off(resource.maintenance_schedule)
+            + parse_time_off((resource.availability or {}).get('unavailable', []))
+            + bookings_by_resource.get(resource.id, [])
+        )
+        if windows:
+            blocked = _overlap_matrix(
+                slot_starts,
+                slot_ends,
+                _to_datetime64([w[0] for w in windows]),
+                _to_datetime64([w[1] for w in windows])
+            )
+            free[:, r] &= ~blocked.any(axis=1)
+    
+    # Pilot grid: True where the pilot is free for the whole slot
+    pilots = db.query(Pilot).filter(Pilot.is_active == True).order_by(Pilot.id).all()
+    if not pilots:
+        return []
+    pilot_index = {pilot.id: i for i, pilot in enumerate(pilots)}
+    interval_pilots = []
+    interval_starts = []
+    interval_ends = []
+    for pilot in pilots:
+        for off_start, off_end in parse_time_off(pilot.time_off):
+            interval_pilots.append(pilot_index[pilot.id])
+            interval_starts.append(off_start)
+            interval_ends.append(off_end)
+    
+    assignment_rows = (
+        db.query(EventAssignment.pilot_id, Event.event_type, Event.status, Event.start_time, Event.end_time)
+        .join(Event, Event.id == EventAssignment.event_id)
+        .filter(
+            EventAssignment.pilot_id.in_(list(pilot_index)),
+            Event.start_time < range_end,
+            Event.end_time > range_start
+        )
+        .all()
+    )
+    
+    # Unmet requirement for this event type, counting what is already on the books
+    requirement_field, credit = EVENT_REQUIREMENT_CREDITS.get(event_type, (None, 0))
+    need = np.zeros(len(pilots))
+    if requirement_field:
+        need = np.array([getattr(pilot, requirement_field) or 0 for pilot in pilots], dtype=float)
+    
+    for pilot_id, assigned_type, assigned_status, assigned_start, assigned_end in assignment_rows:
+        if assigned_status == EventStatus.CANCELLED:
+            continue
+        interval_pilots.append(pilot_index[pilot_id])
+        interval_starts.append(assigned_start)
+        interval_ends.append(assigned_end)
+        assigned_field, assigned_credit = EVENT_REQUIREMENT_CREDITS.get(assigned_type, (None, 0))
+        if requirement_field and assigned_field == requirement_field:
+            need[pilot_index[pilot_id]] -= assigned_credit
+    need = np.clip(need, 0, None)
+    
+    available = np.ones((len(slot_times), len(pilots)), dtype=bool)
+    if interval_pilots:
+        # Time off is inclusive of its end points; bookings are not, but the
+        # difference only matters for back-to-back slots so treat both alike
+        overlaps = _overlap_matrix(
+            slot_starts,
+            slot_ends,
+            _to_datetime64(interval_starts),
+            _to_datetime64(interval_ends)
+        )
+        owner = np.zeros((len(interval_pilots), len(pilots)), dtype=np.int32)
+        owner[np.arange(len(interval_pilots)), interval_pilots] = 1
+        available &= (overlaps.astype(np.int32) @ owner) == 0
+    
+    # Slots sharing time with each other, so a picked crew and resource are blocked across them
+    slot_conflicts = _overlap_matrix(slot_starts, slot_ends, slot_starts, slot_ends)
+    
+    suggestions = []
+    while len(suggestions) < max_suggestions and time.monotonic() < deadline:
+        feasible = free.any(axis=1) & (available.sum(axis=1) >= crew_size)
+        if not feasible.any():
+            break
+        # Weight each slot by the unmet need of pilots free for it, with a
+        # small bonus for slack so ties go to easier-to-crew slots
+        scores = available @ need + 0.01 * available.sum(axis=1)
+        scores[~feasible] = -np.inf
+        t = int(np.argmax(scores))
+        r = int(np.argmax(free[t]))
+        
+        candidates = np.flatnonzero(available[t])
+        crew = candidates[np.argsort(-need[candidates], kind='stable')[:crew_size]]
+        
+        # The resource is taken for every slot overlapping this one, not just this one
+        free[slot_conflicts[t], r] = False
+        available[np.ix_(slot_conflicts[t], crew)] = False
+        need[crew] = np.clip(need[crew] - credit, 0, None)
+        
+        resource = resources[r]
+        suggestions.append({
+            "event_type": event_type,
+            "title": f"{event_type.value.upper()} - {resource.simulator_id if is_simulator else resource.tail_number}",
+            "start_time": slot_times[t],
+            "end_time": slot_times[t] + duration,
+            "aircraft_id": None if is_simulator else resource.id,
+            "simulator_id": resource.id if is_simulator else None,
+            "suggested_pilot_ids": [pilots[i].id for i in crew],
+            "score": round(float(scores[t]), 2),
+        })
     
-    return suggested_events
+    suggestions.sort(key=lambda s: s["start_time"])
+    return suggestions
@@ -0,0 +1,217 @@
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable
+
+
+# Cost of leaving a required crew position empty. Large enough that any
+# complete crew beats any partial one, whatever the soft objectives say.
+UNFILLED_PENALTY = 1_000_000.0
+
+
+class Slot:
+    """One crew position on one event that needs a pilot"""
+
+    __slots__ = ("event_index", "event_id", "position", "candidates")
+
+    def __init__(self, event_index: int, event_id: int, position: str, candidates: List[int]):
+        self.event_index = event_index
+        self.event_id = event_id
+        self.position = position
+        self.candidates = candidates
+
+
+class AssignmentProblem:
+    """
+    Pilots x events assignment problem.
+
+    Hard constraints are encoded in the model itself: each slot's candidate
+    list only holds pilots that are qualified, not on time off and not
+    already committed elsewhere, and `conflicts` lists the events in the run
+    that overlap each other so a pilot never flies two of them. Soft
+    objectives are fairness (sum of squared workloads) and a bonus for
+    giving events to pilots that need currency.
+    """
+
+    def __init__(
+        self,
+        events: List[Any],
+        slots: List[Slot],
+        conflicts: List[Set[int]],
+        currency_weights: Optional[Dict[int, float]] = None,
+        fairness_weight: float = 1.0,
+        base_workload: Optional[Dict[int, int]] = None
+    ):
+        self.events = events
+        self.slots = slots
+        self.conflicts = conflicts
+        self.currency_weights = currency_weights or {}
+        self.fairness_weight = fairness_weight
+        self.base_workload = base_workload or {}
+
+    @classmethod
+    def build(
+        cls,
+        events: List[Any],
+        pilot_ids: List[int],
+        is_eligible: Callable[[Any, str, int], bool],
+        currency_weights: Optional[Dict[int, float]] = None,
+        fairness_weight: float = 1.0,
+        base_workload: Optional[Dict[int, int]] = None
+    ) -> "AssignmentProblem":
+        """
+        Build the model from events and an eligibility predicate
+        is_eligible(event, position, pilot_id) covering availability and
+        qualifications.
+        """
+        slots = []
+        for event_index, event in enumerate(events):
+            positions = (event.crew_composition or {}).get('positions', {})
+            for position, count in positions.items():
+                candidates = [
+                    pilot_id for pilot_id in pilot_ids
+                    if is_eligible(event, position, pilot_id)
+                ]
+                for _ in range(count):
+                    slots.append(Slot(event_index, event.id, position, list(candidates)))
+
+        # Sweep events by start time to find every overlapping pair
+        conflicts: List[Set[int]] = [set() for _ in events]
+        order = sorted(range(len(events)), key=lambda i: events[i].start_time)
+        active: List[int] = []
+        for i in order:
+            start = events[i].start_time
+            active = [j for j in active if events[j].end_time > start]
+            for j in active:
+                conflicts[i].add(j)
+                conflicts[j].add(i)
+            active.append(i)
+
+        return cls(events, slots, conflicts, currency_weights, fairness_weight, base_workload)
+
+
+class SolverResult:
+    def __init__(self, assignments: Dict[int, List[int]], cost: float, optimal: bool, nodes: int, elapsed: float):
+        self.assignments = assignments
+        self.cost = cost
+        self.optimal = optimal
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+
+_UNSET = object()
+
+
+def solve_assignment(problem: AssignmentProblem, time_limit: float) -> SolverResult:
+    """
+    Depth-first branch and bound over crew slots.
+
+    Slots are visited most-constrained first and values cheapest first, so
+    the first complete solution is a sensible greedy one. The search then
+    backtracks to improve on it until the tree is exhausted (optimal) or
+    time_limit seconds pass, and returns the best solution found so far.
+    """
+    started = time.monotonic()
+    deadline = started + time_limit
+
+    slots = sorted(problem.slots, key=lambda s: len(s.candidates))
+    n = len(slots)
+    fairness = problem.fairness_weight
+    currency = problem.currency_weights
+    conflicts = problem.conflicts
+
+    workload: Dict[int, int] = dict(problem.base_workload)
+    busy: Dict[int, Set[int]] = {}
+
+    # Optimistic cost of filling each slot, summed from the back so a node
+    # at depth d can bound the cost of everything still open
+    remaining_bound = [0.0] * (n + 1)
+    for d in range(n - 1, -1, -1):
+        best_fill = min(
+            (fairness - currency.get(p, 0.0) for p in slots[d].candidates),
+            default=UNFILLED_PENALTY
+        )
+        remaining_bound[d] = remaining_bound[d + 1] + min(UNFILLED_PENALTY, best_fill)
+
+    def options(depth: int) -> List[Tuple[float, Optional[int]]]:
+        slot = slots[depth]
+        clashing = conflicts[slot.event_index]
+        choices = []
+        for pilot_id in slot.candidates:
+            pilot_busy = busy.get(pilot_id)
+            if pilot_busy and (slot.event_index in pilot_busy or not clashing.isdisjoint(pilot_busy)):
+                continue
+            w = workload.get(pilot_id, 0)
+            choices.append((fairness * (2 * w + 1) - currency.get(pilot_id, 0.0), pilot_id))
+        choices.append((UNFILLED_PENALTY, None))
+        choices.sort(key=lambda c: c[0])
+        return choices
+
+    best_cost = float('inf')
+    best_choice: List[Optional[int]] = [None] * n
+    optimal = True
+    nodes = 0
+
+    if n:
+        choice_lists: List[List[Tuple[float, Optional[int]]]] = [[] for _ in range(n)]
+        pointers = [0] * n
+        chosen: List[Any] = [_UNSET] * n
+        costs = [0.0] * n
+        choice_lists[0] = options(0)
+        depth = 0
+        cost = 0.0
+
+        while depth >= 0:
+            nodes += 1
+            if nodes & 1023 == 0 and best_cost < float('inf') and time.monotonic() > deadline:
+                optimal = False
+                break
+
+            # Undo the previous choice made at this depth
+            previous = chosen[depth]
+            if previous is not _UNSET:
+                cost -= costs[depth]
+                if previous is not None:
+                    workload[previous] -= 1
+                    busy[previous].discard(slots[depth].event_index)
+                chosen[depth] = _UNSET
+
+            if pointers[depth] >= len(choice_lists[depth]):
+                depth -= 1
+                continue
+
+            delta, pilot_id = choice_lists[depth][pointers[depth]]
+            pointers[depth] += 1
+            if cost + delta + remaining_bound[depth + 1] >= best_cost:
+                # Choices are sorted by cost, so the rest cannot do better
+                pointers[depth] = len(choice_lists[depth])
+                continue
+
+            chosen[depth] = pilot_id
+            costs[depth] = delta
+            cost += delta
+            if pilot_id is not None:
+                workload[pilot_id] = workload.get(pilot_id, 0) + 1
+                busy.setdefault(pilot_id, set()).add(slots[depth].event_index)
+
+            if depth + 1 == n:
+                best_cost = cost
+                best_choice = list(chosen)
+                continue
+
+            depth += 1
+            choice_lists[depth] = options(depth)
+            pointers[depth] = 0
+    else:
+        best_cost = 0.0
+
+    assignments: Dict[int, List[int]] = {event.id: [] for event in problem.events}
+    for slot, pilot_id in zip(slots, best_choice):
+        if pilot_id is not None:
+            assignments[slot.event_id].append(pilot_id)
+
+    return SolverResult(
+        assignments=assignments,
+        cost=best_cost,
+        optimal=optimal,
+        nodes=nodes,
+        elapsed=time.monotonic() - started
+    )
@@ -0,0 +1,215 @@
+import logging
+import threading
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+from sqlalchemy import bindparam, delete
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from ..core.database import get_upsert_insert
+from ..models.event import Event, EventStatus
+from ..models.training import TrainingRequirement, PilotStatus, PilotStatusDirty
+from .cmr_bmc import evaluate_pilots, ANNUAL_LOOKBACK_MONTHS
+from .training_counters import add_months, month_start, refresh_counters
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change on an effective event can alter pilots' counts
+STATUS_FIELDS = {"start_time", "end_time", "event_type", "status"}
+
+
+def affected_months(event_time: datetime) -> List[date]:
+    """
+    Evaluation months whose counts include an event at event_time: its own
+    month plus every month whose trailing quarter or year reaches back to it.
+    """
+    first = month_start(event_time)
+    return [add_months(first, i) for i in range(ANNUAL_LOOKBACK_MONTHS + 1)]
+
+
+def mark_dirty(db: Session, pilot_ids: Iterable[int], months: Iterable[date]) -> None:
+    """
+    Queue (pilot, month) pairs for re-evaluation. Re-marking a queued pair
+    bumps its version so a worker pass that already read it will not drop
+    the newer mark. Does not commit, so marks land with the event change.
+    """
+    mark_pairs_dirty(db, [(pilot_id, month) for pilot_id in set(pilot_ids) for month in set(months)])
+
+
+def mark_pairs_dirty(db: Session, pairs: Iterable[Tuple[int, date]]) -> None:
+    """Queue arbitrary (pilot_id, month) pairs, as mark_dirty does for a pilots x months grid"""
+    pairs = sorted(set(pairs))
+    if not pairs:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {"pilot_id": pilot_id, "evaluation_month": month, "version": 1, "marked_at": now}
+        for pilot_id, month in pairs
+    ]
+
+    insert = get_upsert_insert(db)
+    if insert is None:
+        for row in rows:
+            dirty = db.query(PilotStatusDirty).filter(
+                PilotStatusDirty.pilot_id == row["pilot_id"],
+                PilotStatusDirty.evaluation_month == row["evaluation_month"]
+            ).first()
+            if not dirty:
+                db.add(PilotStatusDirty(**row))
+            else:
+                dirty.version += 1
+                dirty.marked_at = now
+        return
+
+    stmt = insert(PilotStatusDirty.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["pilot_id", "evaluation_month"],
+        set_={
+            "version": PilotStatusDirty.__table__.c.version + 1,
+            "marked_at": stmt.excluded.marked_at,
+        }
+    )
+    db.execute(stmt)
+
+
+def mark_requirements_changed(db: Session) -> None:
+    """
+    Queue every stored PilotStatus for re-evaluation after the requirement
+    set changes, so no verdict computed under the old set is left standing.
+    Does not commit, so the marks land with the requirement change.
+    """
+    mark_pairs_dirty(db, db.query(PilotStatus.pilot_id, PilotStatus.evaluation_month).all())
+
+
+class EventSnapshot:
+    """What an event counted toward before a write, for diffing afterwards"""
+
+    def __init__(self, event: Event):
+        self.effective = event.status == EventStatus.EFFECTIVE
+        self.start_time = event.start_time
+        self.pilot_ids = {a.pilot_id for a in event.assignments} if self.effective else set()
+
+
+def mark_event_changed(
+    db: Session,
+    event: Event,
+    before: Optional[EventSnapshot] = None,
+    changed_fields: Optional[Iterable[str]] = None,
+    extra_pilot_ids: Iterable[int] = (),
+    deleted: bool = False
+) -> None:
+    """
+    Bring training counters up to date and mark pilots' months dirty after
+    a write to an event, inside the caller's transaction.
+
+    before is a snapshot taken prior to the write (None for a new event).
+    Writes that touch neither an effective event before nor after, or only
+    change fields that don't affect counts, do nothing.
+    """
+    extra_pilot_ids = set(extra_pilot_ids)
+    if changed_fields is not None and not STATUS_FIELDS.intersection(changed_fields) and not extra_pilot_ids:
+        return
+
+    touched: Dict[date, Set[int]] = {}
+    if before is not None and before.effective:
+        touched.setdefault(month_start(before.start_time), set()).update(before.pilot_ids | extra_pilot_ids)
+    if not deleted and event.status == EventStatus.EFFECTIVE:
+        pilot_ids = {a.pilot_id for a in event.assignments} | extra_pilot_ids
+        touched.setdefault(month_start(event.start_time), set()).update(pilot_ids)
+    mark_months_changed(db, touched)
+
+
+def mark_months_changed(db: Session, touched: Dict[date, Set[int]]) -> None:
+    """
+    Refresh counters and mark status dirty for {event month: pilot_ids}
+    whose effective events changed, e.g. gathered over a bulk write.
+    """
+    if not touched:
+        return
+
+    db.flush()
+    refresh_counters(db, touched)
+    for month, pilot_ids in touched.items():
+        mark_dirty(db, pilot_ids, affected_months(month))
+
+
+def process_dirty(db: Session, batch_size: int = 500) -> int:
+    """
+    Recompute PilotStatus for one batch of dirty pilot months and clear
+    those marks, in one transaction. Returns the number of marks handled.
+    """
+    marks = (
+        db.query(PilotStatusDirty.id, PilotStatusDirty.pilot_id, PilotStatusDirty.evaluation_month, PilotStatusDirty.version)
+        .order_by(PilotStatusDirty.marked_at)
+        .limit(batch_size)
+        .all()
+    )
+    if not marks:
+        return 0
+
+    requirements = db.query(TrainingRequirement).filter(
+        TrainingRequirement.is_active == True
+    ).all()
+
+    by_month: Dict[date, List[int]] = {}
+    for _, pilot_id, evaluation_month, _ in marks:
+        by_month.setdefault(evaluation_month, []).append(pilot_id)
+
+    for evaluation_month, pilot_ids in sorted(by_month.items()):
+        evaluate_pilots(db, pilot_ids, evaluation_month, requirements)
+
+    # Only clear marks that were not bumped while we were evaluating
+    table = PilotStatusDirty.__table__
+    db.execute(
+        delete(table).where(
+            table.c.id == bindparam("mark_id"),
+            table.c.version == bindparam("mark_version")
+        ),
+        [{"mark_id": mark_id, "mark_version": version} for mark_id, _, _, version in marks]
+    )
+    db.commit()
+    return len(marks)
+
+
+class StatusMaintenanceWorker:
+    """Background thread that drains the dirty queue every few seconds"""
+
+    def __init__(self, session_factory, interval: float, batch_size: int = 500):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="status-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> int:
+        handled = 0
+        db = self.session_factory()
+        try:
+            while not self._stop.is_set():
+                count = process_dirty(db, self.batch_size)
+                handled += count
+                if count < self.batch_size:
+                    break
+        except Exception:
+            db.rollback()
+            logger.exception("Pilot status maintenance pass failed")
+        finally:
+            db.close()
+        return handled
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
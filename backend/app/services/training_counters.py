@@ -0,0 +1,163 @@
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+from sqlalchemy import and_, delete, or_, select, tuple_
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from ..core.database import get_upsert_insert
+from ..models.event import Event, EventAssignment, EventStatus, EventType
+from ..models.pilot import Pilot
+from ..models.training import PilotTrainingCounter
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Shift a first-of-month date by a (possibly negative) number of months"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _aggregate(rows: Iterable[Tuple[int, EventType, datetime, datetime]]) -> Dict[Tuple[int, date, EventType], List[float]]:
+    """Fold (pilot_id, event_type, start, end) rows into {(pilot, month, type): [count, hours]}"""
+    totals: Dict[Tuple[int, date, EventType], List[float]] = {}
+    for pilot_id, event_type, start_time, end_time in rows:
+        key = (pilot_id, month_start(start_time), event_type)
+        total = totals.setdefault(key, [0, 0.0])
+        total[0] += 1
+        total[1] += max((end_time - start_time).total_seconds(), 0) / 3600.0
+    return totals
+
+
+def _counter_rows(totals: Dict[Tuple[int, date, EventType], List[float]]) -> List[Dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "pilot_id": pilot_id,
+            "month": month,
+            "event_type": event_type,
+            "event_count": int(count),
+            "hours": round(hours, 2),
+            "updated_at": now,
+        }
+        for (pilot_id, month, event_type), (count, hours) in totals.items()
+    ]
+
+
+def _effective_rows_query(db: Session):
+    return (
+        db.query(EventAssignment.pilot_id, Event.event_type, Event.start_time, Event.end_time)
+        .join(Event, Event.id == EventAssignment.event_id)
+        .filter(Event.status == EventStatus.EFFECTIVE)
+    )
+
+
+def _lock_pilots(db: Session, pilot_ids: Iterable[int]) -> None:
+    """
+    Row-lock the pilots, in id order, until the transaction ends, so
+    concurrent counter refreshes for a pilot run one after the other.
+    SQLite allows one writer at a time and needs no lock.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return
+    db.execute(select(Pilot.id).where(Pilot.id.in_(sorted(set(pilot_ids)))).order_by(Pilot.id).with_for_update())
+
+
+def refresh_counters(db: Session, touched: Dict[date, Set[int]]) -> None:
+    """
+    Recompute the counters for the given {month: pilot_ids} from events.
+    Call after the event write has been flushed; does not commit, so the
+    counters change in the same transaction as the events.
+
+    The touched pilots are locked first, so a concurrent write to the same
+    pilot waits for this transaction and then recounts (under READ
+    COMMITTED each statement sees what committed before it). Counters are
+    upserted, and types no longer present are deleted.
+    """
+    touched = {month_start(month): set(pilot_ids) for month, pilot_ids in touched.items() if pilot_ids}
+    if not touched:
+        return
+
+    _lock_pilots(db, set().union(*touched.values()))
+
+    rows = _effective_rows_query(db).filter(or_(*(
+        and_(
+            Event.start_time >= datetime.combine(month, datetime.min.time()),
+            Event.start_time < datetime.combine(add_months(month, 1), datetime.min.time()),
+            EventAssignment.pilot_id.in_(sorted(pilot_ids))
+        )
+        for month, pilot_ids in touched.items()
+    ))).all()
+    totals = _aggregate(rows)
+
+    table = PilotTrainingCounter.__table__
+    insert = get_upsert_insert(db)
+    present: Dict[date, Set[Tuple[int, EventType]]] = {}
+    if insert is not None:
+        for pilot_id, month, event_type in totals:
+            present.setdefault(month, set()).add((pilot_id, event_type))
+
+    # Counters of touched pilot months that are now zero (all of them without upsert)
+    stale = []
+    for month, pilot_ids in touched.items():
+        condition = and_(table.c.month == month, table.c.pilot_id.in_(sorted(pilot_ids)))
+        if present.get(month):
+            condition = and_(condition, tuple_(table.c.pilot_id, table.c.event_type).notin_(sorted(present[month])))
+        stale.append(condition)
+    db.execute(delete(table).where(or_(*stale)))
+
+    counter_rows = _counter_rows(totals)
+    if not counter_rows:
+        return
+    if insert is None:
+        db.execute(table.insert(), counter_rows)
+        return
+    stmt = insert(table).values(counter_rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["pilot_id", "month", "event_type"],
+        set_={
+            "event_count": stmt.excluded.event_count,
+            "hours": stmt.excluded.hours,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    db.execute(stmt)
+
+
+def rebuild_counters(db: Session, since: Optional[date] = None, batch_size: int = 5000) -> int:
+    """
+    Rebuild the counters table from events, optionally only from a month
+    onward. Streams events with a server-side cursor and commits once.
+    Returns the number of counter rows written.
+    """
+    table = PilotTrainingCounter.__table__
+    stmt = delete(table)
+    query = _effective_rows_query(db)
+    if since is not None:
+        since = month_start(since)
+        stmt = stmt.where(table.c.month >= since)
+        query = query.filter(Event.start_time >= datetime.combine(since, datetime.min.time()))
+    db.execute(stmt)
+
+    totals = _aggregate(query.yield_per(batch_size))
+    counter_rows = _counter_rows(totals)
+    for i in range(0, len(counter_rows), batch_size):
+        db.execute(table.insert(), counter_rows[i:i + batch_size])
+    db.commit()
+    return len(counter_rows)
+
+
+def get_counters(
+    db: Session,
+    pilot_ids: Optional[List[int]],
+    start_month: date,
+    end_month: date
+) -> List[PilotTrainingCounter]:
+    """Counter rows between two months inclusive, for some or all pilots"""
+    query = db.query(PilotTrainingCounter).filter(
+        PilotTrainingCounter.month >= month_start(start_month),
+        PilotTrainingCounter.month <= month_start(end_month)
+    )
+    if pilot_ids is not None:
+        query = query.filter(PilotTrainingCounter.pilot_id.in_(pilot_ids))
+    return query.order_by(PilotTrainingCounter.pilot_id, PilotTrainingCounter.month).all()
@@ -0,0 +1,6 @@
+"""
+Microbenchmarks for the scheduler, CMR/BMC evaluation, calendar export and
+currency import services against a seeded synthetic squadron.
+
+Run from backend/ with ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,125 @@
+"""
+Run the service microbenchmarks against a freshly generated synthetic
+squadron and record wall time, query counts and peak memory.
+
+The schema is dropped and recreated before generating, so point
+--database-url only at a scratch database. Without it a temporary SQLite
+file is used.
+
+Usage (from backend/):
+    python -m benchmarks [--size small|squadron|wing] [--seed N]
+                         [--database-url URL --reset-database]
+                         [--case NAME ...] [--rounds N]
+                         [--save baseline.json] [--compare baseline.json]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+def main() -> None:
+    from .sizes import SIZES
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", default=None,
+                        help="Scratch database to use (default: a temporary SQLite file)")
+    parser.add_argument("--reset-database", action="store_true",
+                        help="Confirm that --database-url may be dropped and recreated")
+    parser.add_argument("--case", action="append", dest="cases", metavar="NAME",
+                        help="Only run this case (repeatable); see --list")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--save", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Exit non-zero on regressions against a baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25,
+                        help="Allowed fractional growth of median wall time (default 0.25)")
+    parser.add_argument("--time-floor", type=float, default=0.01,
+                        help="Wall time growth in seconds always allowed, for very fast cases (default 0.01)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25,
+                        help="Allowed fractional growth of peak memory (default 0.25)")
+    args = parser.parse_args()
+
+    if args.database_url and not args.database_url.startswith("sqlite") and not args.reset_database:
+        parser.error("--database-url is dropped and recreated; pass --reset-database to confirm")
+
+    workdir = tempfile.mkdtemp(prefix="scheduling-bench-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+    # Imported only now so the app settings see the database chosen above
+    from app.core.database import Base, SessionLocal, engine
+    import app.models  # noqa: F401  (register every table on Base.metadata)
+    from .cases import CASES, BenchContext
+    from .generator import generate
+    from .harness import QueryCounter, compare, environment, load_baseline, measure, save_baseline
+
+    if args.list:
+        print("\n".join(CASES))
+        return
+    names = args.cases or list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    try:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            squadron = generate(db, SIZES[args.size], seed=args.seed)
+            print(
+                f"Generated {args.size} (seed {args.seed}): {len(squadron.pilot_ids)} pilots, "
+                f"{squadron.event_count} events, {squadron.assignment_count} assignments "
+                f"on {engine.dialect.name} in {time.perf_counter() - started:.1f}s"
+            )
+
+            ctx = BenchContext(db=db, squadron=squadron, workdir=workdir)
+            counter = QueryCounter(engine)
+            results = {}
+            print(f"{'case':<34} {'median ms':>10} {'min ms':>10} {'queries':>8} {'peak MB':>8}")
+            for name in names:
+                bench = CASES[name](ctx)
+                result = measure(bench.run, counter, rounds=args.rounds, warmup=args.warmup, setup=bench.setup)
+                db.rollback()
+                results[name] = result
+                print(
+                    f"{name:<34} {result['median_seconds'] * 1000:>10.1f} {result['min_seconds'] * 1000:>10.1f} "
+                    f"{result['queries']:>8} {result['peak_memory_bytes'] / 1e6:>8.1f}"
+                )
+        finally:
+            db.close()
+    finally:
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    env = environment(engine.dialect.name, args.size, args.seed)
+    if args.save:
+        save_baseline(args.save, env, results)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        regressions = compare(
+            load_baseline(args.compare), env, results,
+            time_tolerance=args.time_tolerance,
+            time_floor=args.time_floor,
+            memory_tolerance=args.memory_tolerance
+        )
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
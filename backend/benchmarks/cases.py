@@ -0,0 +1,126 @@
+"""
+Benchmark cases, one per service entry point. Each case is registered with
+@case and prepares a Case (the timed call plus optional untimed per-round
+setup) from the generated squadron.
+"""
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.models.currency import CurrencyRecord, CurrencyRecordHistory
+from app.models.event import Event, EventAssignment, EventStatus
+from app.services.calendar import generate_ics_for_pilot
+from app.services.cmr_bmc import evaluate_all_pilots
+from app.services.currency import DEFAULT_COLUMN_MAPPING, get_call_sign_mapping, import_currency_records
+from app.services.scheduler import optimize_schedule
+
+from .generator import Squadron, currency_rows, write_currency_spreadsheet
+
+
+@dataclass
+class BenchContext:
+    db: Session
+    squadron: Squadron
+    workdir: str  # Scratch directory for generated spreadsheets
+
+
+@dataclass
+class Case:
+    run: Callable[[], Any]
+    setup: Optional[Callable[[], None]] = None
+
+
+CASES: Dict[str, Callable[[BenchContext], Case]] = {}
+
+
+def case(name: str):
+    def register(factory: Callable[[BenchContext], Case]) -> Callable[[BenchContext], Case]:
+        CASES[name] = factory
+        return factory
+    return register
+
+
+def _window_events(ctx: BenchContext):
+    return (
+        ctx.db.query(Event)
+        .filter(
+            Event.status == EventStatus.SCHEDULED,
+            Event.start_time >= ctx.squadron.window_start,
+            Event.start_time < ctx.squadron.window_end
+        )
+        .order_by(Event.start_time)
+        .all()
+    )
+
+
+def _optimize_case(ctx: BenchContext, constraints: Dict[str, Any]) -> Case:
+    events = _window_events(ctx)
+    constraints = {
+        "prioritize_currency": True,
+        "currency_types": ctx.squadron.currency_types,
+        **constraints,
+    }
+    return Case(run=lambda: optimize_schedule(ctx.db, events, constraints))
+
+
+@case("optimize_schedule[greedy]")
+def optimize_greedy(ctx: BenchContext) -> Case:
+    return _optimize_case(ctx, {"engine": "greedy", "check_qualifications": True})
+
+
+@case("optimize_schedule[cp]")
+def optimize_cp(ctx: BenchContext) -> Case:
+    # A short budget keeps the round time bounded; the search is cut off
+    # at the same point in every round for a given machine
+    return _optimize_case(ctx, {"engine": "cp", "time_limit": 1.0})
+
+
+@case("evaluate_all_pilots")
+def evaluate_pilots(ctx: BenchContext) -> Case:
+    # The last month of flown history
+    last_month = (ctx.squadron.history_end - timedelta(days=1)).date().replace(day=1)
+    return Case(run=lambda: evaluate_all_pilots(ctx.db, last_month))
+
+
+@case("generate_ics_for_pilot")
+def ics_for_pilot(ctx: BenchContext) -> Case:
+    # The pilot with the most events, over all of them
+    pilot_id = ctx.db.scalar(
+        select(EventAssignment.pilot_id)
+        .group_by(EventAssignment.pilot_id)
+        .order_by(func.count().desc(), EventAssignment.pilot_id)
+        .limit(1)
+    )
+    return Case(run=lambda: generate_ics_for_pilot(ctx.db, pilot_id))
+
+
+def _clear_currency(db: Session) -> None:
+    db.execute(delete(CurrencyRecordHistory))
+    db.execute(delete(CurrencyRecord))
+    db.commit()
+
+
+def _import_case(ctx: BenchContext, file_type: str) -> Case:
+    path = os.path.join(ctx.workdir, f"currency.{'xlsx' if file_type == 'excel' else 'csv'}")
+    write_currency_spreadsheet(path, currency_rows(ctx.squadron, ctx.squadron.seed), file_type)
+    pilot_mapping = get_call_sign_mapping(ctx.db)
+
+    def run():
+        return import_currency_records(ctx.db, path, file_type, pilot_mapping, DEFAULT_COLUMN_MAPPING)
+
+    # Every round imports into an empty table, so it measures inserts
+    return Case(run=run, setup=lambda: _clear_currency(ctx.db))
+
+
+@case("import_currency_records[csv]")
+def import_csv(ctx: BenchContext) -> Case:
+    return _import_case(ctx, "csv")
+
+
+@case("import_currency_records[excel]")
+def import_excel(ctx: BenchContext) -> Case:
+    return _import_case(ctx, "excel")
@@ -0,0 +1,226 @@
+"""
+Seeded synthetic squadron data: pilots with qualifications and time off,
+aircraft, simulators, training requirements, months of flown events with
+crews, a week of unassigned events to optimize and currency spreadsheets.
+
+The same size and seed always produce the same rows.
+"""
+import csv
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+import openpyxl
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.aircraft import Aircraft
+from app.models.event import Event, EventAssignment, EventStatus, EventType
+from app.models.pilot import Pilot
+from app.models.simulator import Simulator
+from app.models.training import TrainingRequirement
+from app.services.training_counters import rebuild_counters
+
+from .sizes import Size
+
+
+# Flown history starts here; the optimize window is the week after it ends
+HISTORY_START = datetime(2025, 1, 1)
+OPTIMIZE_WINDOW_DAYS = 7
+
+QUALIFICATIONS = ["IP", "EP", "MC", "FL", "NVG", "AAR"]
+FLIGHT_TYPES = [EventType.B2, EventType.OB2, EventType.OB3, EventType.LOCAL, EventType.MADDOG]
+CURRENCY_TYPES = [
+    "night", "instrument", "landing", "aar", "nvg", "low_level",
+    "formation", "weapons", "egress", "altitude_chamber", "water_survival", "check_ride",
+]
+REQUIREMENTS = [
+    ("Monthly sortie", "monthly", "flight", 1),
+    ("Monthly sim", "monthly", "simulator", 1),
+    ("Quarterly sorties", "quarterly", "flight", 4),
+    ("Quarterly sims", "quarterly", "simulator", 2),
+    ("Annual sorties", "annual", "both", 24),
+]
+
+
+@dataclass
+class Squadron:
+    """What generate() created, for the benchmarks to aim at"""
+    size: Size
+    seed: int
+    pilot_ids: List[int]
+    call_signs: List[str]
+    currency_types: List[str]
+    event_count: int
+    assignment_count: int
+    history_end: datetime
+    window_start: datetime
+    window_end: datetime
+
+
+def _months_later(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _time_off(rng: random.Random, start: datetime, end: datetime) -> List[Dict[str, str]]:
+    periods = []
+    days = max((end - start).days, 1)
+    for _ in range(rng.choice([0, 0, 0, 1, 2])):
+        off_start = start + timedelta(days=rng.randrange(days))
+        off_end = off_start + timedelta(days=rng.randint(2, 14))
+        periods.append({"start": off_start.isoformat(), "end": off_end.isoformat()})
+    return periods
+
+
+def _crew_composition(rng: random.Random) -> Dict[str, Any]:
+    composition: Dict[str, Any] = {"positions": {"pilot": 1, "copilot": 1}}
+    if rng.random() < 0.3:
+        composition["qualifications"] = {"pilot": [rng.choice(QUALIFICATIONS[:3])]}
+    return composition
+
+
+def generate(db: Session, size: Size, seed: int = 1, batch_size: int = 5000) -> Squadron:
+    """
+    Fill an empty schema with a synthetic squadron and commit. Flown events
+    are effective (a few cancelled) and crewed; the week after the history
+    holds scheduled events with no crew for optimize_schedule.
+    """
+    rng = random.Random(seed)
+    history_end = _months_later(HISTORY_START, size.months)
+    window_end = history_end + timedelta(days=OPTIMIZE_WINDOW_DAYS)
+
+    db.execute(insert(TrainingRequirement.__table__), [
+        {"requirement_name": name, "requirement_type": kind, "event_type": event_type,
+         "required_count": count, "rules": {}, "is_active": True, "created_at": HISTORY_START}
+        for name, kind, event_type, count in REQUIREMENTS
+    ])
+
+    call_signs = [f"VIPER{i:03d}" for i in range(1, size.pilots + 1)]
+    db.execute(insert(Pilot.__table__), [
+        {
+            "call_sign": call_sign,
+            "rank": rng.choice(["1st Lt", "Capt", "Maj", "Lt Col"]),
+            "qualifications": rng.sample(QUALIFICATIONS, rng.randint(0, 3)),
+            "availability": {},
+            "time_off": _time_off(rng, HISTORY_START, window_end),
+            "b2_requirement": 0,
+            "t38_requirement": 0,
+            "wst_requirement": 0,
+            "is_active": True,
+        }
+        for call_sign in call_signs
+    ])
+    db.execute(insert(Aircraft.__table__), [
+        {"tail_number": f"AF{i:04d}", "aircraft_type": "B-2A", "availability": {},
+         "maintenance_schedule": [], "is_active": True}
+        for i in range(1, size.aircraft + 1)
+    ])
+    db.execute(insert(Simulator.__table__), [
+        {"simulator_id": f"WST-{i:02d}", "simulator_type": "WST", "availability": {},
+         "maintenance_schedule": [], "is_active": True}
+        for i in range(1, size.simulators + 1)
+    ])
+
+    pilot_ids = list(db.scalars(select(Pilot.id).order_by(Pilot.id)))
+    aircraft_ids = list(db.scalars(select(Aircraft.id).order_by(Aircraft.id)))
+    simulator_ids = list(db.scalars(select(Simulator.id).order_by(Simulator.id)))
+
+    # Events, with the crew each flown one gets, in insertion order
+    events: List[Dict[str, Any]] = []
+    crews: List[List[int]] = []
+    day = HISTORY_START
+    while day < window_end:
+        flown = day < history_end
+        for _ in range(size.events_per_day):
+            start_time = day + timedelta(hours=rng.randint(6, 18), minutes=rng.choice([0, 30]))
+            end_time = start_time + timedelta(hours=rng.randint(2, 6))
+            simulator = rng.random() < 0.25
+            if flown:
+                status = EventStatus.CANCELLED if rng.random() < 0.05 else EventStatus.EFFECTIVE
+            else:
+                status = EventStatus.SCHEDULED
+            events.append({
+                "event_type": EventType.WST if simulator else rng.choice(FLIGHT_TYPES),
+                "title": f"{'SIM' if simulator else 'SORTIE'} {len(events) + 1}",
+                "start_time": start_time,
+                "end_time": end_time,
+                "status": status,
+                "aircraft_id": None if simulator else rng.choice(aircraft_ids),
+                "simulator_id": rng.choice(simulator_ids) if simulator else None,
+                "crew_composition": _crew_composition(rng),
+                "created_at": HISTORY_START,
+                "updated_at": HISTORY_START,
+            })
+            crews.append(rng.sample(pilot_ids, 2) if flown else [])
+        day += timedelta(days=1)
+
+    for i in range(0, len(events), batch_size):
+        db.execute(insert(Event.__table__), events[i:i + batch_size])
+    event_ids = list(db.scalars(select(Event.id).order_by(Event.id)))
+
+    assignments = [
+        {"event_id": event_id, "pilot_id": pilot_id, "position": position, "created_at": HISTORY_START}
+        for event_id, crew in zip(event_ids, crews)
+        for pilot_id, position in zip(crew, ("pilot", "copilot"))
+    ]
+    for i in range(0, len(assignments), batch_size):
+        db.execute(insert(EventAssignment.__table__), assignments[i:i + batch_size])
+    db.commit()
+
+    # Counters are normally kept by the event write paths
+    rebuild_counters(db)
+
+    return Squadron(
+        size=size,
+        seed=seed,
+        pilot_ids=pilot_ids,
+        call_signs=call_signs,
+        currency_types=CURRENCY_TYPES[:size.currency_types],
+        event_count=len(events),
+        assignment_count=len(assignments),
+        history_end=history_end,
+        window_start=history_end,
+        window_end=window_end,
+    )
+
+
+def currency_rows(squadron: Squadron, seed: int = 1) -> List[Dict[str, Any]]:
+    """One spreadsheet row per pilot and currency type, in the default column layout"""
+    rng = random.Random(seed)
+    today = date.today()
+    rows = []
+    for call_sign in squadron.call_signs:
+        for currency_type in squadron.currency_types:
+            completed = today - timedelta(days=rng.randint(0, 400))
+            rows.append({
+                "call_sign": call_sign,
+                "currency_type": currency_type,
+                "last_completed_date": completed.isoformat(),
+                "expiration_date": (completed + timedelta(days=rng.choice([90, 180, 365]))).isoformat(),
+            })
+    # A few rows for pilots the squadron doesn't have, to exercise rejects
+    for i in range(max(len(rows) // 100, 1)):
+        rows.append({"call_sign": f"GHOST{i:03d}", "currency_type": "night",
+                     "last_completed_date": today.isoformat(), "expiration_date": today.isoformat()})
+    return rows
+
+
+def write_currency_spreadsheet(path: str, rows: List[Dict[str, Any]], file_type: str) -> None:
+    """Write currency_rows() as a CSV or xlsx file"""
+    columns = list(rows[0])
+    if file_type == "csv":
+        with open(path, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    elif file_type == "excel":
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(columns)
+        for row in rows:
+            sheet.append([row[column] for column in columns])
+        workbook.save(path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_type}")
@@ -0,0 +1,151 @@
+"""
+Timing, query counting and peak memory for benchmark cases, and saving and
+comparing results against a JSON baseline.
+"""
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Counts statements sent to the database through an engine"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    @contextmanager
+    def counting(self) -> Iterator["QueryCounter"]:
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def measure(
+    run: Callable[[], Any],
+    counter: QueryCounter,
+    rounds: int = 5,
+    warmup: int = 1,
+    setup: Optional[Callable[[], None]] = None
+) -> Dict[str, Any]:
+    """
+    Time run() over several rounds, pytest-benchmark style.
+
+    setup (if given) runs before every round, untimed. Wall times come from
+    plain rounds; queries and peak memory from one extra round traced with
+    tracemalloc, since tracing slows the code down.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        run()
+
+    times: List[float] = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    if setup is not None:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with counter.counting():
+            run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rounds": rounds,
+        "min_seconds": min(times),
+        "median_seconds": statistics.median(times),
+        "mean_seconds": statistics.fmean(times),
+        "max_seconds": max(times),
+        "queries": counter.count,
+        "peak_memory_bytes": peak,
+    }
+
+
+def environment(dialect: str, size: str, seed: int) -> Dict[str, Any]:
+    return {
+        "recorded_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "dialect": dialect,
+        "size": size,
+        "seed": seed,
+    }
+
+
+def save_baseline(path: str, env: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> None:
+    with open(path, "w") as handle:
+        json.dump({"environment": env, "results": results}, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare(
+    baseline: Dict[str, Any],
+    env: Dict[str, Any],
+    results: Dict[str, Dict[str, Any]],
+    time_tolerance: float = 0.25,
+    memory_tolerance: float = 0.25,
+    time_floor: float = 0.01
+) -> List[str]:
+    """
+    Regressions of results against a baseline, as readable lines.
+
+    Median wall time and peak memory may grow by the given fraction, and
+    wall time also by time_floor seconds so millisecond-scale cases don't
+    trip on timer noise. Query counts are deterministic for a size and
+    seed, so any increase counts.
+    """
+    regressions = []
+    base_env = baseline.get("environment", {})
+    for key in ("dialect", "size", "seed"):
+        if base_env.get(key) != env.get(key):
+            regressions.append(f"baseline {key} is {base_env.get(key)!r}, this run is {env.get(key)!r}")
+    if regressions:
+        return regressions
+
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        allowed = max(base["median_seconds"] * (1 + time_tolerance), base["median_seconds"] + time_floor)
+        if result["median_seconds"] > allowed:
+            regressions.append(
+                f"{name}: median {result['median_seconds']:.4f}s vs {base['median_seconds']:.4f}s"
+            )
+        if result["queries"] > base["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries vs {base['queries']}")
+        if result["peak_memory_bytes"] > base["peak_memory_bytes"] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name}: peak memory {result['peak_memory_bytes'] / 1e6:.1f} MB "
+                f"vs {base['peak_memory_bytes'] / 1e6:.1f} MB"
+            )
+    return regressions
@@ -0,0 +1,22 @@
+"""
+Synthetic dataset sizes. Kept apart from the generator so the command line
+can be parsed before the app (and its settings) is imported.
+"""
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Size:
+    pilots: int
+    aircraft: int
+    simulators: int
+    months: int  # Months of flown history before the optimize window
+    events_per_day: int
+    currency_types: int
+
+
+SIZES = {
+    "small": Size(pilots=20, aircraft=4, simulators=2, months=1, events_per_day=4, currency_types=4),
+    "squadron": Size(pilots=60, aircraft=12, simulators=4, months=6, events_per_day=12, currency_types=8),
+    "wing": Size(pilots=240, aircraft=40, simulators=12, months=12, events_per_day=40, currency_types=12),
+}
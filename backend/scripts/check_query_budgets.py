@@ -0,0 +1,284 @@
+"""
+Pin the number of SQL statements every /api route may run.
+
+Seeds a scratch database with the benchmark generator's small squadron,
+calls each route once through the app with the user and feed caches
+cleared (so auth and rendering hit the database every time) and fails if
+any route runs more statements than its budget. Each route is checked
+once against a fixed data set, so a budget only holds if the route's
+query count does not grow with the number of rows, which is what catches
+reintroduced per-row (N+1) lookups. Routes under app/api with no budget
+fail the check too, so new routes have to declare one.
+
+@query_budget service functions are enforced during the run.
+
+Usage (from backend/):
+    python scripts/check_query_budgets.py [--database-url URL --reset-database] [--verbose]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@dataclass
+class Budget:
+    method: str
+    route: str  # Path template as registered on the router
+    max_queries: int
+    url: Callable[[Any], str]  # Concrete URL from the seeded ids
+    kwargs: Callable[[Any], Dict[str, Any]] = field(default=lambda ids: {})
+    sqlite_max_queries: Optional[int] = None  # Where SQLite can't batch what other databases do
+
+    def limit(self, dialect: str) -> int:
+        if dialect == "sqlite" and self.sqlite_max_queries is not None:
+            return self.sqlite_max_queries
+        return self.max_queries
+
+
+def _get(route, max_queries, url=None, **kwargs):
+    return Budget("GET", route, max_queries, url or (lambda ids: route), lambda ids: kwargs)
+
+
+# In the order they run; later writes rely on earlier ones
+BUDGETS: List[Budget] = [
+    # auth
+    Budget("POST", "/api/auth/register", 4, lambda ids: "/api/auth/register", lambda ids: {
+        "json": {"username": "budget_user", "email": "budget@example.com", "password": "budget-pass"}
+    }),
+    Budget("POST", "/api/auth/login", 1, lambda ids: "/api/auth/login", lambda ids: {
+        "data": {"username": "budget_admin", "password": "budget-pass"}
+    }),
+    _get("/api/auth/me", 1),
+
+    # pilots
+    _get("/api/pilots/", 2),
+    _get("/api/pilots/{pilot_id}", 2, lambda ids: f"/api/pilots/{ids.pilot_id}"),
+    Budget("POST", "/api/pilots/", 3, lambda ids: "/api/pilots/", lambda ids: {
+        "json": {"call_sign": "BUDGET", "rank": "Capt", "qualifications": ["IP"]}
+    }),
+    Budget("PUT", "/api/pilots/{pilot_id}", 3, lambda ids: f"/api/pilots/{ids.new_pilot_id()}", lambda ids: {
+        "json": {"rank": "Maj"}
+    }),
+
+    # events
+    _get("/api/events/", 3, params={"limit": 100}),
+    _get("/api/events/conflicts", 2, params={"start_date": "2025-01-01T00:00:00", "end_date": "2025-02-01T00:00:00"}),
+    _get("/api/events/{event_id}", 3, lambda ids: f"/api/events/{ids.event_id}"),
+    Budget("POST", "/api/events/", 6, lambda ids: "/api/events/", lambda ids: {
+        "params": {"allow_conflicts": True},
+        "json": {
+            "event_type": "local", "title": "Budget sortie",
+            "start_time": "2025-03-01T08:00:00", "end_time": "2025-03-01T12:00:00",
+            "crew_composition": {"positions": {"pilot": 1, "copilot": 1}},
+            "assignments": [
+                {"pilot_id": ids.pilot_ids[0], "position": "pilot"},
+                {"pilot_id": ids.pilot_ids[1], "position": "copilot"},
+            ],
+        },
+    }),
+    # SQLite can't return ids in parameter order from a multi-row INSERT, so
+    # SQLAlchemy sends each created event as its own INSERT there
+    Budget("POST", "/api/events/bulk", 8, lambda ids: "/api/events/bulk", lambda ids: {
+        "params": {"allow_conflicts": True},
+        "json": {
+            "create": [
+                {
+                    "event_type": "local", "title": f"Budget bulk {i}",
+                    "start_time": f"2025-03-{2 + i:02d}T08:00:00", "end_time": f"2025-03-{2 + i:02d}T12:00:00",
+                    "status": "effective",
+                    "assignments": [{"pilot_id": ids.pilot_ids[i % len(ids.pilot_ids)], "position": "pilot"}],
+                }
+                for i in range(20)
+            ],
+            "assignments": [
+                {"event_id": event_id, "assignments": [{"pilot_id": ids.pilot_ids[2], "position": "pilot"}]}
+                for event_id in ids.window_event_ids[:5]
+            ],
+        },
+    }, sqlite_max_queries=27),
+    Budget("PUT", "/api/events/{event_id}", 10, lambda ids: f"/api/events/{ids.event_id}", lambda ids: {
+        "params": {"allow_conflicts": True},
+        "json": {"title": "Budget retitled", "end_time": "2025-01-05T23:00:00"},
+    }),
+    Budget("POST", "/api/events/{event_id}/assignments", 9, lambda ids: f"/api/events/{ids.event_id}/assignments",
+           lambda ids: {"params": {"allow_conflicts": True}, "json": {"pilot_id": ids.pilot_ids[3], "position": "instructor"}}),
+    Budget("PATCH", "/api/events/{event_id}/status", 10, lambda ids: f"/api/events/{ids.window_event_ids[0]}/status",
+           lambda ids: {"params": {"new_status": "effective", "allow_conflicts": True}}),
+
+    # currency
+    Budget("POST", "/api/currency/import", 3, lambda ids: "/api/currency/import", lambda ids: {
+        "params": {"file_type": "csv"},
+        "files": {"file": ("currency.csv", open(ids.currency_csv, "rb"), "text/csv")},
+    }),
+    _get("/api/currency/import/jobs", 1),
+    _get("/api/currency/import/jobs/{job_id}", 1, lambda ids: f"/api/currency/import/jobs/{ids.job_id}"),
+    _get("/api/currency/expiring", 2, params={"days": 60}),
+    _get("/api/currency/pilot/{pilot_id}", 2, lambda ids: f"/api/currency/pilot/{ids.pilot_id}"),
+    _get("/api/currency/pilot/{pilot_id}/history", 2, lambda ids: f"/api/currency/pilot/{ids.pilot_id}/history"),
+
+    # training
+    _get("/api/training/requirements", 2),
+    Budget("POST", "/api/training/status/evaluate/{pilot_id}", 5,
+           lambda ids: f"/api/training/status/evaluate/{ids.pilot_id}",
+           lambda ids: {"params": {"evaluation_month": ids.evaluation_month}}),
+    Budget("GET", "/api/training/status/pilot/{pilot_id}", 2, lambda ids: f"/api/training/status/pilot/{ids.pilot_id}",
+           lambda ids: {"params": {"evaluation_month": ids.evaluation_month}}),
+    Budget("POST", "/api/training/status/evaluate-all", 5, lambda ids: "/api/training/status/evaluate-all",
+           lambda ids: {"params": {"evaluation_month": ids.evaluation_month}}),
+    Budget("POST", "/api/training/requirements", 5, lambda ids: "/api/training/requirements", lambda ids: {
+        "json": {"requirement_name": "Budget check", "requirement_type": "monthly", "event_type": "flight"}
+    }),
+    _get("/api/training/counters", 2, params={"start_month": "2025-01-01", "end_month": "2025-12-01"}),
+
+    # scheduler
+    Budget("POST", "/api/scheduler/optimize", 4, lambda ids: "/api/scheduler/optimize", lambda ids: {
+        "json": {"event_ids": ids.window_event_ids, "constraints": {
+            "prioritize_currency": True, "currency_types": ["night", "instrument"], "check_qualifications": True
+        }}
+    }),
+    Budget("POST", "/api/scheduler/suggest", 4, lambda ids: "/api/scheduler/suggest", lambda ids: {
+        "json": {"start_date": "2025-02-01", "end_date": "2025-02-14", "event_type": "local", "constraints": {}}
+    }),
+
+    # calendar
+    _get("/api/calendar/pilot/{pilot_id}/ics", 4, lambda ids: f"/api/calendar/pilot/{ids.pilot_id}/ics"),
+    _get("/api/calendar/pilot/{pilot_id}/calendar-url", 1, lambda ids: f"/api/calendar/pilot/{ids.pilot_id}/calendar-url"),
+    _get("/api/calendar/export", 2, params={"format": "zip"}),
+
+    # deletes last
+    Budget("DELETE", "/api/events/{event_id}", 9, lambda ids: f"/api/events/{ids.event_id}"),
+    Budget("DELETE", "/api/pilots/{pilot_id}", 2, lambda ids: f"/api/pilots/{ids.new_pilot_id()}"),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None,
+                        help="Scratch database to seed (default: a temporary SQLite file)")
+    parser.add_argument("--reset-database", action="store_true",
+                        help="Confirm that --database-url may be dropped and recreated")
+    parser.add_argument("--verbose", action="store_true", help="Print every route's statements")
+    args = parser.parse_args()
+
+    if args.database_url and not args.database_url.startswith("sqlite") and not args.reset_database:
+        parser.error("--database-url is dropped and recreated; pass --reset-database to confirm")
+
+    workdir = tempfile.mkdtemp(prefix="scheduling-budgets-")
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'budgets.db')}"
+    os.environ.setdefault("SECRET_KEY", "query-budgets")
+    os.environ["QUERY_BUDGETS_ENFORCED"] = "true"
+    os.environ["STATUS_WORKER_ENABLED"] = "false"
+    os.environ["METRICS_ENABLED"] = "false"
+
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+
+    from app.core.database import Base, SessionLocal, engine
+    from app.core.dependencies import user_cache
+    from app.core.query_budget import count_queries
+    from app.core.security import create_access_token, get_password_hash
+    from app.main import app as api
+    from app.models.currency import CurrencyImportJob
+    from app.models.event import Event, EventStatus
+    from app.models.pilot import Pilot
+    from app.models.user import User, UserRole
+    from app.services.calendar import feed_cache
+    from benchmarks.generator import currency_rows, generate, write_currency_spreadsheet
+    from benchmarks.sizes import SIZES
+
+    # Every route must have a budget, and every budget a route
+    routes = {
+        (method, route.path)
+        for route in api.routes
+        if isinstance(route, APIRoute) and route.endpoint.__module__.startswith("app.api.")
+        for method in route.methods
+    }
+    pinned = {(budget.method, budget.route) for budget in BUDGETS}
+    problems = [f"no budget for {method} {path}" for method, path in sorted(routes - pinned)]
+    problems += [f"budget for unknown route {method} {path}" for method, path in sorted(pinned - routes)]
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        squadron = generate(db, SIZES["small"], seed=1)
+        admin = User(
+            username="budget_admin", email="admin@example.com",
+            hashed_password=get_password_hash("budget-pass"), role=UserRole.ADMIN
+        )
+        db.add(admin)
+        db.flush()
+        job = CurrencyImportJob(file_name="seed.csv", file_type="csv", status="completed")
+        db.add(job)
+        db.commit()
+
+        currency_csv = os.path.join(workdir, "currency.csv")
+        write_currency_spreadsheet(currency_csv, currency_rows(squadron), "csv")
+
+        class Ids:
+            pilot_ids = squadron.pilot_ids
+            pilot_id = squadron.pilot_ids[0]
+            event_id = db.query(Event.id).filter(Event.status == EventStatus.EFFECTIVE).order_by(Event.id).first()[0]
+            window_event_ids = [
+                event_id for (event_id,) in db.query(Event.id).filter(
+                    Event.start_time >= squadron.window_start
+                ).order_by(Event.start_time, Event.id)
+            ]
+            job_id = job.id
+            evaluation_month = (squadron.history_end - timedelta(days=1)).date().replace(day=1).isoformat()
+
+            @staticmethod
+            def new_pilot_id():
+                return db.query(Pilot.id).filter(Pilot.call_sign == "BUDGET").scalar()
+
+        Ids.currency_csv = currency_csv
+        token = create_access_token({"sub": admin.username, "role": admin.role.value, "uid": admin.id})
+    finally:
+        db.close()
+
+    client = TestClient(api)
+    client.headers["Authorization"] = f"Bearer {token}"
+
+    for budget in BUDGETS:
+        url = budget.url(Ids)
+        kwargs = budget.kwargs(Ids)
+        user_cache.clear()
+        feed_cache.clear()
+        try:
+            with count_queries(engine) as log:
+                response = client.request(budget.method, url, **kwargs)
+        except AssertionError as e:
+            # A @query_budget service function went over inside the route
+            problems.append(f"{budget.method} {budget.route}: {e}")
+            continue
+        finally:
+            for value in kwargs.get("files", {}).values():
+                value[1].close()
+
+        label = f"{budget.method} {budget.route}"
+        if response.status_code >= 400:
+            problems.append(f"{label}: HTTP {response.status_code} {response.text[:200]}")
+            continue
+        max_queries = budget.limit(engine.dialect.name)
+        status = "ok  " if log.count <= max_queries else "FAIL"
+        print(f"{status}  {label}: {log.count}/{max_queries}")
+        if log.count > max_queries:
+            problems.append(f"{label} ran {log.count} statements, budget is {max_queries}:\n{log.format()}")
+        elif args.verbose:
+            print(log.format())
+
+    engine.dispose()
+    if problems:
+        print("\n".join(problems))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
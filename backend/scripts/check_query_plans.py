@@ -0,0 +1,163 @@
+"""
+Check that the hot lookups in the scheduler, calendar, CMR/BMC and
+currency services are served by indexes.
+
+Runs EXPLAIN on each query against the configured database and exits
+non-zero if any plan contains a sequential scan. On PostgreSQL sequential
+scans are disabled for the session first, so one only shows up when no
+index can serve the query, whatever the table sizes. On SQLite a plain
+"SCAN <table>" step counts as a sequential scan.
+
+Usage (from backend/):
+    python scripts/check_query_plans.py [--database-url URL] [--create-schema]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+import app.models  # noqa: F401  (register every table on Base.metadata)
+from app.models.currency import CurrencyRecord
+from app.models.event import Event, EventAssignment, EventStatus
+from app.models.training import PilotTrainingCounter
+from app.services.calendar import _pilot_events_query
+
+WINDOW_START = datetime(2026, 1, 1)
+WINDOW_END = WINDOW_START + timedelta(days=30)
+PILOT_IDS = [1, 2, 3]
+
+
+def _overlapping(statement):
+    return statement.where(Event.start_time < WINDOW_END, Event.end_time > WINDOW_START)
+
+
+def hot_queries(db):
+    """(name, statement) for each lookup that must stay on an index"""
+    return [
+        # scheduler.PilotAvailabilityIndex.build
+        ("pilot availability window", _overlapping(
+            select(EventAssignment.pilot_id, Event.start_time, Event.end_time)
+            .join(Event, Event.id == EventAssignment.event_id)
+            .where(EventAssignment.pilot_id.in_(PILOT_IDS))
+        )),
+        # scheduler.check_pilot_availability
+        ("pilot conflicts", _overlapping(
+            select(Event).join(EventAssignment).where(EventAssignment.pilot_id == PILOT_IDS[0])
+        )),
+        # scheduler.suggest_schedule resource bookings
+        ("resource bookings", _overlapping(
+            select(Event.aircraft_id, Event.start_time, Event.end_time)
+            .where(Event.aircraft_id.isnot(None), Event.status != EventStatus.CANCELLED)
+        )),
+        # calendar.iter_ics_for_pilot
+        ("pilot calendar", _pilot_events_query(db, PILOT_IDS[0], WINDOW_START, WINDOW_END).statement),
+        # Event.assignments selectin / cascade loads
+        ("event assignments", select(EventAssignment).where(EventAssignment.event_id.in_([1, 2, 3]))),
+        # training_counters.refresh_counters
+        ("counter refresh", (
+            select(EventAssignment.pilot_id, Event.event_type, Event.start_time, Event.end_time)
+            .join(Event, Event.id == EventAssignment.event_id)
+            .where(
+                Event.status == EventStatus.EFFECTIVE,
+                Event.start_time >= WINDOW_START,
+                Event.start_time < WINDOW_END,
+                EventAssignment.pilot_id.in_(PILOT_IDS)
+            )
+        )),
+        # cmr_bmc.count_effective_events
+        ("training counters", (
+            select(PilotTrainingCounter.pilot_id, PilotTrainingCounter.month, PilotTrainingCounter.event_count)
+            .where(
+                PilotTrainingCounter.pilot_id.in_(PILOT_IDS),
+                PilotTrainingCounter.month >= date(2025, 2, 1),
+                PilotTrainingCounter.month <= date(2026, 1, 1)
+            )
+        )),
+        # scheduler.get_pilots_needing_currency
+        ("currency needing", (
+            select(CurrencyRecord.pilot_id)
+            .where(CurrencyRecord.currency_type == "night", CurrencyRecord.expiration_date <= date(2026, 2, 1))
+        )),
+        # api/currency.get_expiring_currency, squadron-wide
+        ("currency expiring", (
+            select(CurrencyRecord.pilot_id, CurrencyRecord.currency_type, CurrencyRecord.expiration_date)
+            .where(CurrencyRecord.expiration_date >= date(2026, 1, 1), CurrencyRecord.expiration_date <= date(2026, 2, 1))
+            .order_by(CurrencyRecord.expiration_date)
+        )),
+    ]
+
+
+def _postgres_seq_scans(db, sql: str):
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node.get("Node Type") == "Seq Scan":
+            scans.append(node.get("Relation Name", "?"))
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+
+def _sqlite_seq_scans(db, sql: str):
+    scans = []
+    for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+        detail = row[-1]
+        if detail.startswith("SCAN ") and "INDEX" not in detail and "CONSTANT ROW" not in detail:
+            scans.append(detail[len("SCAN "):].split()[0])
+    return scans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL,
+                        help="Database to check (defaults to DATABASE_URL)")
+    parser.add_argument("--create-schema", action="store_true",
+                        help="Create missing tables from the models first, e.g. for a scratch SQLite file")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.create_schema:
+        Base.metadata.create_all(bind=engine)
+
+    if engine.dialect.name == "postgresql":
+        seq_scans = _postgres_seq_scans
+    elif engine.dialect.name == "sqlite":
+        seq_scans = _sqlite_seq_scans
+    else:
+        sys.exit(f"Unsupported database: {engine.dialect.name}")
+
+    db = sessionmaker(bind=engine)()
+    failures = 0
+    try:
+        for name, statement in hot_queries(db):
+            sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            scans = seq_scans(db, sql)
+            db.rollback()
+            if scans:
+                failures += 1
+                print(f"FAIL  {name}: sequential scan on {', '.join(scans)}")
+            else:
+                print(f"ok    {name}")
+    finally:
+        db.close()
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Rebuild the pilot_training_counters rollup from events.
+
+Usage (from backend/):
+    python scripts/rebuild_training_counters.py [--since YYYY-MM-DD]
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.training_counters import rebuild_counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", type=date.fromisoformat, default=None,
+                        help="Only rebuild months from this date onward")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        written = rebuild_counters(db, since=args.since)
+    finally:
+        db.close()
+    print(f"Wrote {written} counter rows")
+
+
+if __name__ == "__main__":
+    main()
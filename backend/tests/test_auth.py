@@ -0,0 +1,34 @@
+from app.core.dependencies import user_cache
+from app.core.security import LoginRateLimiter, create_access_token, decode_access_token
+
+
+def test_token_issued_just_before_a_change_is_rejected():
+    user_cache.clear()
+    before = decode_access_token(create_access_token({"sub": "viper"}))
+    user_cache.invalidate("viper")
+    after = decode_access_token(create_access_token({"sub": "viper"}))
+
+    # Typically all within the same second
+    assert user_cache.changed_since("viper", before["iat"])
+    assert not user_cache.changed_since("viper", after["iat"])
+
+
+def test_login_limiter_forgets_expired_and_excess_usernames(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.core.security.time.monotonic", lambda: clock[0])
+    limiter = LoginRateLimiter(max_failures=2, window_seconds=60, max_tracked=3)
+
+    for name in ("a", "b", "c", "d"):
+        limiter.record_failure(name)
+    assert list(limiter._failures) == ["b", "c", "d"]
+
+    clock[0] += 30
+    limiter.record_failure("b")
+    limiter.record_failure("b")
+    limiter.record_failure("b")
+    assert len(limiter._failures["b"]) == 2
+    assert limiter.retry_after("b") == 61
+
+    clock[0] += 45
+    limiter.record_failure("e")
+    assert list(limiter._failures) == ["b", "e"]
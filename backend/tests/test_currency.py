@@ -0,0 +1,57 @@
+from datetime import date
+
+import openpyxl
+import pytest
+
+from app.models.currency import CurrencyRecord, CurrencyRecordHistory
+from app.models.pilot import Pilot
+from app.services.currency import (
+    DEFAULT_COLUMN_MAPPING, content_hash, iter_currency_batches, prepare_currency_frame, upsert_currency_rows
+)
+
+
+def _rejected_rows(path, file_type, batch_size):
+    rows = []
+    for frame in iter_currency_batches(str(path), file_type, batch_size):
+        rows += [reject["row"] for reject in prepare_currency_frame(frame, {"VIPER": 1}, DEFAULT_COLUMN_MAPPING)[1]]
+    return rows
+
+
+@pytest.mark.parametrize("batch_size", [1, 100])
+def test_rejects_report_sheet_rows_after_blank_rows(tmp_path, batch_size):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    for values in (["call_sign", "currency_type"], ["VIPER", "night"], [None, None], ["GHOST", "night"]):
+        sheet.append(values)
+    workbook.save(tmp_path / "currency.xlsx")
+    (tmp_path / "currency.csv").write_text("call_sign,currency_type\nVIPER,night\n\nGHOST,night\n")
+
+    assert _rejected_rows(tmp_path / "currency.xlsx", "excel", batch_size) == [4]
+    assert _rejected_rows(tmp_path / "currency.csv", "csv", batch_size) == [4]
+
+
+def _currency_row(pilot_id, raw_data):
+    return {
+        "pilot_id": pilot_id,
+        "currency_type": "night",
+        "last_completed_date": date(2026, 1, 10),
+        "expiration_date": date(2026, 7, 10),
+        "status": "current",
+        "raw_data": raw_data,
+        "content_hash": content_hash(raw_data),
+    }
+
+
+def test_same_dates_refresh_stored_hash_without_history(db):
+    pilot = Pilot(call_sign="VIPER")
+    db.add(pilot)
+    db.flush()
+    upsert_currency_rows(db, [_currency_row(pilot.id, {"call_sign": "VIPER"})])
+
+    edited = _currency_row(pilot.id, {"call_sign": "VIPER", "notes": "checked"})
+    assert upsert_currency_rows(db, [edited]) == {"inserted": 0, "updated": 0, "unchanged": 1}
+
+    record = db.query(CurrencyRecord).one()
+    assert record.content_hash == edited["content_hash"]
+    assert record.raw_data == edited["raw_data"]
+    assert db.query(CurrencyRecordHistory).count() == 0
@@ -0,0 +1,65 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.models.aircraft import Aircraft
+from app.models.event import Event, EventType
+from app.models.pilot import Pilot
+from app.services.scheduler import optimize_schedule, suggest_schedule
+
+
+def _suggest(db, **constraints):
+    return suggest_schedule(db, date(2025, 3, 3), date(2025, 3, 3), EventType.LOCAL, constraints)
+
+
+def test_suggest_schedule_does_not_double_book_overlapping_slots(db):
+    db.add(Aircraft(tail_number="AF-001", aircraft_type="B-2"))
+    db.add_all([Pilot(call_sign=f"P{i}") for i in range(8)])
+    db.commit()
+
+    # 08:00-12:00 and 10:00-14:00 overlap; one aircraft can only fly one of them
+    suggestions = _suggest(db, start_hours=[8, 10], duration_hours=4, crew_size=2)
+
+    assert len(suggestions) == 1
+
+
+def test_suggest_schedule_books_each_resource_once_per_time(db):
+    db.add_all([Aircraft(tail_number=f"AF-00{i}", aircraft_type="B-2") for i in range(2)])
+    db.add_all([Pilot(call_sign=f"P{i}") for i in range(8)])
+    db.commit()
+
+    suggestions = _suggest(db, start_hours=[8, 9, 10, 11], duration_hours=4, crew_size=2)
+
+    by_aircraft = {}
+    for suggestion in suggestions:
+        by_aircraft.setdefault(suggestion["aircraft_id"], []).append(suggestion)
+    for booked in by_aircraft.values():
+        booked.sort(key=lambda s: s["start_time"])
+        for earlier, later in zip(booked, booked[1:]):
+            assert earlier["end_time"] <= later["start_time"]
+
+
+@pytest.mark.parametrize("start_hours", [[24], [-1], [8, 30], [], 8, [None], ["8"]])
+def test_suggest_schedule_rejects_bad_start_hours(db, start_hours):
+    with pytest.raises(ValueError):
+        _suggest(db, start_hours=start_hours)
+
+
+@pytest.mark.parametrize("duration_hours", [-4, 0, 25, "inf", 1e9, None])
+def test_suggest_schedule_rejects_bad_duration(db, duration_hours):
+    with pytest.raises(ValueError):
+        _suggest(db, duration_hours=duration_hours)
+
+
+@pytest.mark.parametrize("fairness_weight", [-1, "-0.5", "nan", "inf", None])
+def test_cp_optimizer_rejects_bad_fairness_weight(db, fairness_weight):
+    db.add(Pilot(call_sign="P0"))
+    event = Event(
+        event_type=EventType.LOCAL, title="Local",
+        start_time=datetime(2025, 3, 3, 8), end_time=datetime(2025, 3, 3, 12)
+    )
+    db.add(event)
+    db.commit()
+
+    with pytest.raises(ValueError):
+        optimize_schedule(db, [event], {"engine": "cp", "fairness_weight": fairness_weight})
@@ -0,0 +1,26 @@
+from datetime import date
+
+from app.models.pilot import Pilot
+from app.models.training import PilotStatusDirty, TrainingRequirement
+from app.services.cmr_bmc import evaluate_pilots
+from app.services.status_maintenance import mark_requirements_changed, process_dirty
+
+
+def test_requirement_change_requeues_stored_statuses(db):
+    pilots = [Pilot(call_sign=f"P{i}") for i in range(3)]
+    db.add_all(pilots)
+    db.commit()
+    pilot_ids = [pilot.id for pilot in pilots]
+    for month in (date(2025, 1, 1), date(2025, 2, 1)):
+        evaluate_pilots(db, pilot_ids, month)
+    db.commit()
+
+    db.add(TrainingRequirement(
+        requirement_name="Quarterly sorties", requirement_type="quarterly", event_type="flight", required_count=4
+    ))
+    mark_requirements_changed(db)
+    db.commit()
+
+    assert db.query(PilotStatusDirty).count() == 6
+    assert process_dirty(db) == 6
+    assert db.query(PilotStatusDirty).count() == 0